@@ -2,14 +2,14 @@
 ROS2 相关 API 端点
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Dict, Any, Optional
 import logging
 
 from ...core.config import get_settings
 from ...models.ros import (
-    TopicInfo, NodeInfo, SystemStatus, 
-    SystemTopology, NodeTopology, TopicConnection
+    TopicInfo, NodeInfo, SystemStatus, ConnectionInfo, TopicStatistics, RosSubscriptionInfo,
+    SystemTopology, NodeTopology, TopicConnection, GraphLayout
 )
 from ...services.rosbridge import RosbridgeService
 from ...services.topology_service import TopologyService
@@ -30,6 +30,29 @@ async def get_topics(
         logger.error(f"Failed to get topics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/topics/frequencies", response_model=Dict[str, float])
+async def get_topic_frequencies(
+    service: RosbridgeService = Depends(get_rosbridge_service)
+):
+    """获取主题的实测频率 (Hz)"""
+    try:
+        frequencies = await service.get_topic_frequencies()
+        return frequencies
+    except Exception as e:
+        logger.error(f"Failed to get topic frequencies: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/topics/statistics", response_model=Dict[str, TopicStatistics])
+async def get_topic_statistics(
+    service: RosbridgeService = Depends(get_rosbridge_service)
+):
+    """获取主题的实测统计（频率、带宽、抖动、延迟）"""
+    try:
+        return await service.get_topic_statistics()
+    except Exception as e:
+        logger.error(f"Failed to get topic statistics: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/topics/{topic_name}", response_model=TopicInfo)
 async def get_topic_info(
     topic_name: str,
@@ -45,18 +68,6 @@ async def get_topic_info(
         logger.error(f"Failed to get topic info for {topic_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/topics/frequencies", response_model=Dict[str, float])
-async def get_topic_frequencies(
-    service: RosbridgeService = Depends(get_rosbridge_service)
-):
-    """获取所有主题的频率信息"""
-    try:
-        frequencies = await service.get_topic_frequencies()
-        return frequencies
-    except Exception as e:
-        logger.error(f"Failed to get topic frequencies: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
 @router.post("/topics/{topic_name}/subscribe")
 async def subscribe_topic(
     topic_name: str,
@@ -136,19 +147,70 @@ async def get_system_status(
         logger.error(f"Failed to get system status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/connections", response_model=List[ConnectionInfo])
+async def get_connections(
+    service: RosbridgeService = Depends(get_rosbridge_service)
+):
+    """获取 WebSocket 客户端连接信息"""
+    try:
+        connections = await service.get_connections()
+        return connections
+    except Exception as e:
+        logger.error(f"Failed to get connections: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/subscriptions", response_model=List[RosSubscriptionInfo])
+async def get_subscriptions(
+    service: RosbridgeService = Depends(get_rosbridge_service)
+):
+    """获取当前 ROS 订阅及客户端引用计数"""
+    try:
+        return await service.get_subscriptions()
+    except Exception as e:
+        logger.error(f"Failed to get subscriptions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/topology", response_model=SystemTopology)
 async def get_system_topology(
     use_cache: bool = True,
+    namespace: Optional[str] = None,
+    root: Optional[str] = None,
+    depth: int = Query(default=1, ge=0),
+    exclude_infrastructure: bool = False,
     topology_service: TopologyService = Depends(get_topology_service)
 ):
-    """获取系统拓扑结构"""
+    """获取系统拓扑结构
+
+    指定 namespace（命名空间前缀）、root（节点或主题的 depth 跳邻域）或
+    exclude_infrastructure（排除 /rosout 等主题）时只返回对应的子图
+    """
     try:
+        if namespace or root or exclude_infrastructure:
+            topology = await topology_service.get_subgraph(namespace, root, depth, exclude_infrastructure)
+            if topology is None:
+                raise HTTPException(status_code=404, detail=f"Node or topic {root} not found")
+            return topology
         topology = await topology_service.get_system_topology(use_cache)
         return topology
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get system topology: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/topology/layout", response_model=GraphLayout)
+async def get_topology_layout(
+    algorithm: str = Query(default="force", pattern="^(layered|force)$"),
+    exclude_infrastructure: bool = True,
+    topology_service: TopologyService = Depends(get_topology_service)
+):
+    """获取服务端预计算的拓扑图布局坐标（按图版本号缓存）"""
+    try:
+        return await topology_service.get_layout(algorithm, exclude_infrastructure)
+    except Exception as e:
+        logger.error(f"Failed to compute topology layout: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/topology/nodes/{node_name}", response_model=NodeTopology)
 async def get_node_topology(
     node_name: str,
@@ -4,6 +4,7 @@
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
+from typing import Dict, List
 
 from functools import lru_cache
 
@@ -18,12 +19,26 @@ class Settings(BaseSettings):
     # ROS2 配置
     ros_domain_id: int = Field(default=0, description="ROS2 Domain ID")
     ros_discovery_server: str = Field(default="", description="ROS2 Discovery Server")
+    graph_poll_interval: float = Field(default=1.0, description="ROS 图变化检查间隔 (秒)")
+    graph_service_refresh_interval: float = Field(default=10.0, description="重新查询所有节点服务列表的间隔 (秒)")
+    ros_executor_threads: int = Field(default=2, description="ROS2 MultiThreadedExecutor 线程数")
+    topology_excluded_topics: List[str] = Field(default=["/rosout", "/parameter_events"], description="子图查询默认排除的基础设施主题")
     
     # Rosbridge 配置
     rosbridge_host: str = Field(default="0.0.0.0", description="Rosbridge 主机")
     rosbridge_port: int = Field(default=9090, description="Rosbridge 端口")
     max_connections: int = Field(default=100, description="最大连接数")
     message_buffer_size: int = Field(default=10000, description="消息缓冲区大小")
+    subscription_linger: float = Field(default=5.0, description="最后一个客户端取消订阅后保留 ROS 订阅的时间 (秒)，0 表示立即销毁")
+    client_send_queue_size: int = Field(default=100, description="每个客户端发送队列的最大帧数")
+    client_send_queue_policy: str = Field(default="drop_oldest", description="发送队列溢出策略 (drop_oldest, latest_per_topic)")
+    ingest_queue_size: int = Field(default=1000, description="ROS 消息接收队列容量（fifo 模式主题共享）")
+    ingest_default_mode: str = Field(default="fifo", description="主题默认接收缓存模式 (fifo, latest_only, ring(N))")
+    ingest_topic_modes: Dict[str, str] = Field(default_factory=dict, description="按主题指定的接收缓存模式，如 {\"/points\": \"latest_only\"}")
+    conversion_executor: str = Field(default="thread", description="消息转换执行方式 (inline, thread, process)")
+    conversion_workers: int = Field(default=4, description="消息转换工作线程/进程数")
+    topic_stats_window: int = Field(default=100, description="主题统计滑动窗口的消息数")
+    topic_stats_size_sample_interval: int = Field(default=20, ge=1, description="无大块 data 字段的消息每隔多少条序列化一次以测量大小")
     
     # 安全配置
     secret_key: str = Field(default="ros-web-viz-secret-key", description="JWT 密钥")
@@ -11,7 +11,7 @@ import os
 
 from .core.config import get_settings
 from .api.v1 import ros, viz
-from .services.dependencies import get_rosbridge_service
+from .services.dependencies import get_ros_context, get_rosbridge_service, get_topology_service
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -51,9 +51,15 @@ async def startup_event():
     """应用启动事件"""
     logger.info("Starting ROS2 Web Visualization System")
     
+    # 初始化共享 ROS2 上下文，各服务复用同一个节点与执行器
+    get_ros_context().start()
+
     # 初始化 Rosbridge 服务
     service = get_rosbridge_service()
     await service.start()
+
+    # 初始化拓扑服务
+    await get_topology_service().start()
     
     logger.info(f"Server started on port {settings.web_port}")
 
@@ -62,10 +68,14 @@ async def shutdown_event():
     """应用关闭事件"""
     logger.info("Shutting down ROS2 Web Visualization System")
     
-    # 清理 Rosbridge 服务
+    # 清理拓扑服务与 Rosbridge 服务
+    await get_topology_service().stop()
     service = get_rosbridge_service()
     await service.stop()
 
+    # 最后销毁共享节点
+    get_ros_context().stop()
+
 @app.get("/")
 async def root():
     """根路径"""
@@ -3,7 +3,7 @@ ROS2 数据模型
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, Tuple
 from datetime import datetime
 from enum import Enum
 
@@ -56,6 +56,24 @@ class TopicInfo(BaseModel):
             datetime: lambda v: v.isoformat()
         }
 
+class TopicStatistics(BaseModel):
+    """主题实测统计（滑动窗口）"""
+    frequency: float = Field(default=0.0, description="发布频率 (Hz)")
+    bytes_per_second: float = Field(default=0.0, description="带宽 (字节/秒)")
+    mean_interval_ms: Optional[float] = Field(None, description="平均到达间隔 (毫秒)")
+    jitter_ms: float = Field(default=0.0, description="到达间隔抖动（标准差，毫秒）")
+    latency_ms: Optional[float] = Field(None, description="header.stamp 到接收的平均延迟 (毫秒)")
+    mean_size: float = Field(default=0.0, description="平均消息大小 (字节)")
+    window: int = Field(default=0, description="窗口内消息数")
+    total_messages: int = Field(default=0, description="累计消息数")
+    total_bytes: int = Field(default=0, description="累计字节数")
+    last_message_time: Optional[datetime] = Field(None, description="最后消息时间")
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
 class NodeInfo(BaseModel):
     """ROS2 节点信息"""
     name: str = Field(..., description="节点名称")
@@ -66,18 +84,78 @@ class NodeInfo(BaseModel):
     actions: List[str] = Field(default_factory=list, description="提供的动作")
     parameters: Dict[str, Any] = Field(default_factory=dict, description="节点参数")
 
+class SubscriptionOptions(BaseModel):
+    """客户端订阅选项（对应 rosbridge subscribe 请求中的可选字段）"""
+    compression: str = Field(default="none", description="请求的压缩/编码方式 (none, cbor, msgpack)")
+    encoding: str = Field(default="json", description="实际使用的帧编码 (json, cbor, msgpack)")
+    voxel_size: Optional[float] = Field(None, description="点云体素滤波叶大小 (米)，为空则不做体素滤波")
+    fields: Optional[List[str]] = Field(None, description="点云字段投影列表，如 [x, y, z, intensity]")
+    point_dtype: str = Field(default="float32", description="点云降采样输出类型 (float32, float16)")
+    max_points: Optional[int] = Field(None, description="点云点数预算，为空则使用 RenderSettings.max_points")
+    quantize: bool = Field(default=False, description="点云使用量化差分紧凑格式 (xyz int16 + intensity uint8)")
+    point_compression: Optional[str] = Field(None, description="点云负载压缩方式 (zstd, lz4, zlib)")
+    image_format: str = Field(default="raw", description="图像传输格式 (raw, jpeg, png)")
+    image_quality: int = Field(default=80, ge=1, le=100, description="JPEG 质量 (1-100)")
+    image_max_width: Optional[int] = Field(None, description="图像最大宽度，为空则按 640x480 像素预算缩放")
+    image_max_height: Optional[int] = Field(None, description="图像最大高度，为空则按 640x480 像素预算缩放")
+    typed_arrays: bool = Field(default=False, description="数值数组字段以紧凑二进制块传输（附带 *_dtype），而非数字列表")
+    throttle_rate: int = Field(default=0, ge=0, description="两条消息之间的最小间隔 (毫秒)，0 表示不限速")
+    queue_length: int = Field(default=0, ge=0, description="该主题最多排队待发送的消息数，0 表示不限制")
+    fragment_size: Optional[int] = Field(None, ge=1, description="单帧最大长度，超过时按 fragment 分片发送")
+
+    def reduces_pointcloud(self) -> bool:
+        """是否请求了点云降维/体素滤波"""
+        return bool(self.voxel_size or self.fields or self.point_dtype != "float32"
+                    or self.quantize or self.point_compression)
+
+    def conversion_key(self) -> Optional[tuple]:
+        """影响消息转换结果的选项，相同 key 的订阅共享一次转换；None 表示默认转换"""
+        key = (
+            self.voxel_size,
+            tuple(self.fields) if self.fields else None,
+            self.point_dtype,
+            self.max_points,
+            self.quantize,
+            self.point_compression,
+            self.image_format,
+            self.image_quality if self.image_format == "jpeg" else None,
+            self.image_max_width,
+            self.image_max_height,
+            self.typed_arrays,
+        )
+        return None if key == (None, None, "float32", None, False, None, "raw", None, None, None, False) else key
+
 class ConnectionInfo(BaseModel):
     """连接信息"""
     client_id: str = Field(..., description="客户端ID")
     connected_at: datetime = Field(..., description="连接时间")
-    subscribed_topics: List[str] = Field(default_factory=list, description="订阅的主题")
+    subscribed_topics: Set[str] = Field(default_factory=set, description="订阅的主题")
     message_count: int = Field(default=0, description="消息计数")
+    encoding: str = Field(default="json", description="连接默认帧编码 (json, cbor, msgpack)")
+    subscription_options: Dict[str, SubscriptionOptions] = Field(default_factory=dict, description="每个订阅主题的选项")
+    queue_depth: int = Field(default=0, description="发送队列中待发送的帧数")
+    dropped_messages: int = Field(default=0, description="发送队列溢出丢弃的帧数")
     
     class Config:
         json_encoders = {
             datetime: lambda v: v.isoformat()
         }
 
+class RosSubscriptionInfo(BaseModel):
+    """ROS 订阅及其客户端引用计数"""
+    topic: str = Field(..., description="主题名称")
+    message_type: Optional[str] = Field(None, description="消息类型")
+    mode: str = Field(default="bridge", description="订阅模式 (bridge: 转换并推送, monitor: 只统计)")
+    ref_count: int = Field(default=0, description="引用该订阅的客户端数")
+    clients: List[str] = Field(default_factory=list, description="引用该订阅的客户端")
+    created_at: Optional[datetime] = Field(None, description="创建时间")
+    linger_remaining: Optional[float] = Field(None, description="无客户端引用时距离销毁的剩余时间 (秒)")
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
 class TopicConnection(BaseModel):
     """主题连接信息"""
     topic_name: str = Field(..., description="主题名称")
@@ -112,6 +190,15 @@ class SystemTopology(BaseModel):
             datetime: lambda v: v.isoformat()
         }
 
+class GraphLayout(BaseModel):
+    """预计算的拓扑图布局"""
+    version: Optional[int] = Field(default=None, description="对应的图版本号")
+    algorithm: str = Field(default="force", description="布局算法 (layered, force)")
+    nodes: Dict[str, Tuple[float, float]] = Field(default_factory=dict, description="节点坐标")
+    topics: Dict[str, Tuple[float, float]] = Field(default_factory=dict, description="主题坐标")
+    bounds: Dict[str, float] = Field(default_factory=dict, description="坐标范围 (min_x, min_y, max_x, max_y)")
+    laid_out: int = Field(default=0, description="本次重新计算坐标的顶点数")
+
 class SystemStatus(BaseModel):
     """系统状态"""
     ros_domain_id: int = Field(..., description="ROS2 Domain ID")
@@ -122,6 +209,8 @@ class SystemStatus(BaseModel):
     uptime: float = Field(..., description="运行时间 (秒)")
     memory_usage: float = Field(..., description="内存使用率")
     cpu_usage: float = Field(..., description="CPU 使用率")
+    event_loop_lag_ms: float = Field(default=0.0, description="事件循环平均延迟 (毫秒)")
+    event_loop_lag_max_ms: float = Field(default=0.0, description="事件循环最大延迟 (毫秒)")
     
     class Config:
         json_encoders = {
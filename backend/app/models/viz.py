@@ -49,7 +49,7 @@ class RenderSettings(BaseModel):
     lighting_enabled: bool = Field(default=True, description="光照启用")
     shadows_enabled: bool = Field(default=False, description="阴影启用")
     anti_aliasing: bool = Field(default=True, description="抗锯齿")
-    max_points: int = Field(default=100000, description="最大点数")
+    max_points: int = Field(default=100000, description="最大点数（点云传输的点数预算）")
     point_size: float = Field(default=1.0, description="点大小")
 
 class PointCloudData(BaseModel):
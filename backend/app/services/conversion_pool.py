@@ -0,0 +1,140 @@
+"""
+消息转换工作池
+将 CPU 密集的消息转换与帧编码移出 asyncio 事件循环，避免大消息阻塞 WebSocket 与 REST 处理
+
+执行模式:
+- inline: 在事件循环中直接执行（原行为）
+- thread: ThreadPoolExecutor，NumPy/zlib/Base64 等会释放 GIL，适合点云与图像
+- process: ProcessPoolExecutor，消息与转换器被序列化到子进程，完全绕开 GIL
+
+不同主题的消息并行转换，同一主题的消息按接收顺序发布
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..models.ros import SubscriptionOptions
+from .message_converter import MessageConverter
+from .message_frame import EncodedFrame
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ('inline', 'thread', 'process')
+
+# (订阅选项, 客户端 ID 列表, 需要的帧编码)
+SubscriberGroup = Tuple[Optional[SubscriptionOptions], List[str], Iterable[str]]
+
+
+def convert_message(converter: MessageConverter, topic: str, msg: Any,
+                    groups: List[SubscriberGroup]) -> Tuple[dict, List[Tuple[EncodedFrame, List[str]]]]:
+    """转换消息并为每个订阅组预先编码帧
+
+    返回 (默认转换结果, [(帧, 客户端 ID 列表), ...])；默认转换结果用于消息缓存
+    """
+    msg_dict = converter.message_to_dict(msg)
+    frames = []
+    for options, client_ids, encodings in groups:
+        variant_dict = msg_dict if options is None or options.conversion_key() is None \
+            else converter.message_to_dict(msg, options)
+        frame = EncodedFrame({
+            'op': 'publish',
+            'topic': topic,
+            'msg': variant_dict
+        })
+        for encoding in encodings:
+            frame.encode(encoding)
+        frames.append((frame, client_ids))
+    return msg_dict, frames
+
+
+class ConversionPool:
+    """消息转换工作池
+
+    submit 只在没有空闲转换槽位时等待，转换完成后按主题顺序调用回调
+    """
+
+    def __init__(self, mode: str = 'thread', max_workers: Optional[int] = None,
+                 max_pending: Optional[int] = None):
+        if mode not in EXECUTOR_MODES:
+            logger.warning(f"Invalid conversion executor '{mode}', using thread")
+            mode = 'thread'
+        self.mode = mode
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+        self._max_pending = max_pending or (max_workers or 4) * 2
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tails: Dict[str, asyncio.Task] = {}
+        self._in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        """创建执行器"""
+        if self.mode == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='msg-convert')
+        elif self.mode == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._slots = asyncio.Semaphore(1 if self.mode == 'inline' else self._max_pending)
+        logger.info(f"🧵 Conversion pool started (mode: {self.mode}, workers: {self.max_workers or 'auto'})")
+
+    async def stop(self):
+        """等待进行中的转换结束并关闭执行器"""
+        pending = list(self._tails.values())
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def pending(self) -> int:
+        """正在转换或等待发布的消息数"""
+        return self._in_flight
+
+    async def submit(self, topic: str, func: Callable[..., Any], args: tuple,
+                     on_done: Callable[[Any], Awaitable[None]]):
+        """提交转换任务
+
+        func(*args) 在执行器中运行，结果交给 on_done（在事件循环中调用）。
+        同一主题的 on_done 严格按提交顺序执行
+        """
+        if self._slots is None:
+            self.start()
+        await self._slots.acquire()
+        self._in_flight += 1
+
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            future = loop.create_future()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = loop.run_in_executor(self._executor, func, *args)
+
+        previous = self._tails.get(topic)
+        task = asyncio.create_task(self._complete(topic, previous, future, on_done))
+        self._tails[topic] = task
+
+    async def _complete(self, topic: str, previous: Optional[asyncio.Task], future: asyncio.Future,
+                        on_done: Callable[[Any], Awaitable[None]]):
+        try:
+            result = await future
+            # 等待同主题的上一条消息发布完成，保证顺序
+            if previous is not None and not previous.done():
+                await asyncio.wait([previous])
+            await on_done(result)
+            self.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"❌ Conversion failed for {topic}: {e}", exc_info=True)
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+            if self._tails.get(topic) is asyncio.current_task():
+                del self._tails[topic]
@@ -1,29 +1,47 @@
 """
 依赖注入服务
 管理应用中的全局服务实例，避免循环导入
+
+所有服务共享同一个 ROS2 上下文（rclpy 节点 + 执行器线程 + 图缓存）
 """
 
+from .ros_context import RosContext
 from .rosbridge import RosbridgeService
+from .ros2_service import ROS2Service, get_ros2_service as _get_ros2_service
 from .topology_service import TopologyService, get_topology_service as _get_topology_service
 from ..core.config import get_settings
 
+# 全局共享 ROS2 上下文
+_ros_context = None
+
 # 全局 Rosbridge 服务实例
 _rosbridge_service = None
 
+def get_ros_context() -> RosContext:
+    """获取共享的 ROS2 上下文"""
+    global _ros_context
+    if _ros_context is None:
+        _ros_context = RosContext(get_settings())
+    return _ros_context
+
 def get_rosbridge_service() -> RosbridgeService:
     """获取 Rosbridge 服务实例"""
     global _rosbridge_service
     if _rosbridge_service is None:
         settings = get_settings()
-        _rosbridge_service = RosbridgeService(settings)
+        _rosbridge_service = RosbridgeService(settings, get_ros_context())
     return _rosbridge_service
 
 def get_topology_service() -> TopologyService:
     """获取拓扑服务实例"""
     settings = get_settings()
-    return _get_topology_service(settings)
+    return _get_topology_service(settings, get_ros_context())
+
+def get_ros2_service() -> ROS2Service:
+    """获取 ROS2 核心服务实例"""
+    return _get_ros2_service(get_ros_context())
 
 def reset_rosbridge_service():
     """重置 Rosbridge 服务实例（主要用于测试）"""
     global _rosbridge_service
-    _rosbridge_service = None
\ No newline at end of file
+    _rosbridge_service = None
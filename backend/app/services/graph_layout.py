@@ -0,0 +1,251 @@
+"""
+ROS 图布局预计算
+基于 NumPy 为节点-主题二分图计算分层或力导向坐标，按图版本号缓存；
+图变化时保留已有坐标，只为新增的节点与主题计算位置
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..models.ros import SystemTopology
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_ALGORITHMS = ('layered', 'force')
+
+# 顶点键：('node', 节点名) 或 ('topic', 主题名)
+Vertex = Tuple[str, str]
+
+
+def _graph_edges(topology: SystemTopology) -> Tuple[List[Vertex], np.ndarray]:
+    """展开为顶点列表与有向边 (发布者 -> 主题 -> 订阅者)"""
+    vertices: List[Vertex] = [('node', node.node_name) for node in topology.nodes]
+    vertices += [('topic', conn.topic_name) for conn in topology.topic_connections]
+    index = {vertex: i for i, vertex in enumerate(vertices)}
+
+    edges = []
+    for conn in topology.topic_connections:
+        topic = index[('topic', conn.topic_name)]
+        for name in conn.publishers:
+            node = index.get(('node', name))
+            if node is not None:
+                edges.append((node, topic))
+        for name in conn.subscribers:
+            node = index.get(('node', name))
+            if node is not None:
+                edges.append((topic, node))
+    return vertices, np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+
+def assign_layers(count: int, edges: np.ndarray, fixed: Optional[Dict[int, int]] = None) -> np.ndarray:
+    """沿边的方向按 BFS 分层；环路中未访问的顶点从入度最小处重新开始
+
+    fixed 中的顶点保持给定层号，只为其余顶点分层
+    """
+    successors = [[] for _ in range(count)]
+    in_degree = np.zeros(count, dtype=np.int64)
+    for src, dst in edges:
+        successors[src].append(dst)
+        in_degree[dst] += 1
+
+    level = np.full(count, -1, dtype=np.int64)
+    queue = deque()
+    for vertex, vertex_level in (fixed or {}).items():
+        level[vertex] = vertex_level
+        queue.append(vertex)
+    for vertex in np.flatnonzero((in_degree == 0) & (level < 0)):
+        level[vertex] = 0
+        queue.append(vertex)
+
+    while True:
+        while queue:
+            vertex = queue.popleft()
+            for successor in successors[vertex]:
+                if level[successor] < 0:
+                    level[successor] = level[vertex] + 1
+                    queue.append(successor)
+        remaining = np.flatnonzero(level < 0)
+        if not len(remaining):
+            return level
+        start = remaining[np.argmin(in_degree[remaining])]
+        level[start] = 0
+        queue.append(start)
+
+
+def layered_positions(count: int, edges: np.ndarray, spacing: float = 120.0,
+                      level_spacing: float = 160.0) -> np.ndarray:
+    """分层布局：层内按上一层前驱的平均 x 坐标排序以减少交叉"""
+    level = assign_layers(count, edges)
+    positions = np.zeros((count, 2), dtype=np.float32)
+    positions[:, 1] = level * level_spacing
+
+    predecessor_sum = np.zeros(count, dtype=np.float64)
+    predecessor_count = np.zeros(count, dtype=np.int64)
+    for layer in range(int(level.max()) + 1 if count else 0):
+        members = np.flatnonzero(level == layer)
+        if layer == 0:
+            order = members
+        else:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                barycenter = predecessor_sum[members] / predecessor_count[members]
+            order = members[np.argsort(np.nan_to_num(barycenter, nan=0.0), kind='stable')]
+        positions[order, 0] = (np.arange(len(order)) - (len(order) - 1) / 2) * spacing
+
+        # 当前层的 x 坐标累加到下一层后继的重心
+        outgoing = edges[np.isin(edges[:, 0], members)]
+        np.add.at(predecessor_sum, outgoing[:, 1], positions[outgoing[:, 0], 0])
+        np.add.at(predecessor_count, outgoing[:, 1], 1)
+    return positions
+
+
+def force_iterations(positions: np.ndarray, edges: np.ndarray, movable: np.ndarray,
+                     k: float, iterations: int, temperature: float, chunk: int = 256) -> np.ndarray:
+    """Fruchterman-Reingold 力导向迭代，只移动 movable 顶点
+
+    斥力按行分块计算（内存 O(chunk * n)），引力只计算边，原地更新 positions
+    """
+    count = len(positions)
+    movable_index = np.flatnonzero(movable)
+    if not len(movable_index) or iterations <= 0:
+        return positions
+
+    cooling = temperature / iterations
+    for _ in range(iterations):
+        x, y = positions[:, 0], positions[:, 1]
+        displacement = np.zeros((len(movable_index), 2), dtype=np.float32)
+        for start in range(0, len(movable_index), chunk):
+            rows = movable_index[start:start + chunk]
+            dx = x[rows, None] - x[None, :]
+            dy = y[rows, None] - y[None, :]
+            weight = (k * k) / np.maximum(dx * dx + dy * dy, 0.01)
+            displacement[start:start + len(rows), 0] = (dx * weight).sum(axis=1)
+            displacement[start:start + len(rows), 1] = (dy * weight).sum(axis=1)
+
+        if len(edges):
+            delta = positions[edges[:, 0]] - positions[edges[:, 1]]
+            distance = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+            force = delta * (distance / k)[:, None]
+            attraction = np.zeros((count, 2), dtype=np.float32)
+            np.add.at(attraction, edges[:, 0], -force)
+            np.add.at(attraction, edges[:, 1], force)
+            displacement += attraction[movable_index]
+
+        length = np.sqrt(np.einsum('ij,ij->i', displacement, displacement))
+        scale = np.minimum(length, temperature) / np.maximum(length, 1e-6)
+        positions[movable_index] += displacement * scale[:, None]
+        temperature = max(temperature - cooling, 1e-3)
+    return positions
+
+
+class GraphLayoutEngine:
+    """按图版本号缓存的布局计算器
+
+    图版本号不变时直接返回缓存；图变化时已有顶点保持位置，
+    新顶点放在已布局邻居的重心附近，再只对新顶点做力导向迭代
+    """
+
+    def __init__(self, algorithm: str = 'force', spacing: float = 120.0,
+                 level_spacing: float = 160.0, iterations: int = 50, seed: int = 0):
+        if algorithm not in LAYOUT_ALGORITHMS:
+            raise ValueError(f"Unsupported layout algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.spacing = spacing
+        self.level_spacing = level_spacing
+        self.iterations = iterations
+        self.positions: Dict[Vertex, Tuple[float, float]] = {}
+        self.levels: Dict[Vertex, int] = {}
+        self.version: Optional[int] = None
+        self.layout: Optional[dict] = None
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def update(self, topology: SystemTopology, version: Optional[int]) -> dict:
+        """返回拓扑的布局结果（版本号未变化时直接返回缓存）"""
+        with self._lock:
+            if self.layout is not None and version is not None and version == self.version:
+                return self.layout
+
+            vertices, edges = _graph_edges(topology)
+            placed = np.array([vertex in self.positions for vertex in vertices], dtype=bool)
+            if self.algorithm == 'layered':
+                positions = self._layered(vertices, edges, placed)
+            else:
+                positions = self._force(vertices, edges, placed)
+
+            self.positions = {vertex: (float(x), float(y)) for vertex, (x, y) in zip(vertices, positions)}
+            self.version = version
+            self.layout = self._layout_message(vertices, positions, int((~placed).sum()))
+            logger.debug(f"Graph layout ({self.algorithm}) version {version}: "
+                         f"{int((~placed).sum())}/{len(vertices)} vertices laid out")
+            return self.layout
+
+    def _layered(self, vertices: List[Vertex], edges: np.ndarray, placed: np.ndarray) -> np.ndarray:
+        if not placed.any():
+            positions = layered_positions(len(vertices), edges, self.spacing, self.level_spacing)
+            self.levels = {vertex: int(round(y / self.level_spacing)) for vertex, (_, y) in zip(vertices, positions)}
+            return positions
+
+        # 新顶点沿边接在已有层之后，追加到所在层的最右侧
+        fixed = {i: self.levels[vertex] for i, vertex in enumerate(vertices) if placed[i] and vertex in self.levels}
+        level = assign_layers(len(vertices), edges, fixed)
+        positions = np.array([self.positions.get(vertex, (0.0, 0.0)) for vertex in vertices], dtype=np.float32)
+        right_edge: Dict[int, float] = {}
+        for i in np.flatnonzero(placed):
+            right_edge[level[i]] = max(right_edge.get(level[i], -np.inf), positions[i, 0])
+        for i in np.flatnonzero(~placed):
+            x = right_edge.get(level[i], -self.spacing) + self.spacing
+            right_edge[level[i]] = x
+            positions[i] = (x, level[i] * self.level_spacing)
+        self.levels = {vertex: int(level[i]) for i, vertex in enumerate(vertices)}
+        return positions
+
+    def _force(self, vertices: List[Vertex], edges: np.ndarray, placed: np.ndarray) -> np.ndarray:
+        k = self.spacing
+        if not placed.any():
+            # 以分层布局为初始位置，收敛更快且结果稳定
+            positions = layered_positions(len(vertices), edges, self.spacing, self.level_spacing)
+            return force_iterations(positions, edges, np.ones(len(vertices), dtype=bool),
+                                    k, self.iterations, k * np.sqrt(max(len(vertices), 1)) / 4)
+
+        positions = np.array([self.positions.get(vertex, (0.0, 0.0)) for vertex in vertices], dtype=np.float32)
+        new = np.flatnonzero(~placed)
+        if not len(new):
+            return positions
+
+        # 新顶点初始位置：已布局邻居的重心，没有邻居时放在现有范围内的随机位置
+        neighbor_sum = np.zeros((len(vertices), 2), dtype=np.float64)
+        neighbor_count = np.zeros(len(vertices), dtype=np.int64)
+        for a, b in ((0, 1), (1, 0)):
+            known = edges[placed[edges[:, b]]]
+            np.add.at(neighbor_sum, known[:, a], positions[known[:, b]])
+            np.add.at(neighbor_count, known[:, a], 1)
+        low, high = positions[placed].min(axis=0), positions[placed].max(axis=0)
+        for i in new:
+            if neighbor_count[i]:
+                positions[i] = neighbor_sum[i] / neighbor_count[i] + self._rng.normal(0, k / 2, 2)
+            else:
+                positions[i] = self._rng.uniform(low, high + 1.0)
+        return force_iterations(positions, edges, ~placed, k, max(self.iterations // 2, 1), k)
+
+    def _layout_message(self, vertices: List[Vertex], positions: np.ndarray, laid_out: int) -> dict:
+        nodes, topics = {}, {}
+        for (kind, name), (x, y) in zip(vertices, positions):
+            (nodes if kind == 'node' else topics)[name] = (round(float(x), 1), round(float(y), 1))
+        if len(positions):
+            low, high = positions.min(axis=0), positions.max(axis=0)
+            bounds = {'min_x': float(low[0]), 'min_y': float(low[1]),
+                      'max_x': float(high[0]), 'max_y': float(high[1])}
+        else:
+            bounds = {'min_x': 0.0, 'min_y': 0.0, 'max_x': 0.0, 'max_y': 0.0}
+        return {
+            'version': self.version,
+            'algorithm': self.algorithm,
+            'nodes': nodes,
+            'topics': topics,
+            'bounds': bounds,
+            'laid_out': laid_out,
+        }
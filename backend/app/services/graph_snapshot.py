@@ -0,0 +1,353 @@
+"""
+ROS 图快照与增量缓存
+一次遍历查询所有主题的发布者/订阅者，并反向建立 节点 -> 主题 索引
+
+查询次数为 O(主题数)，而不是逐节点重复遍历全部主题的 O(节点数 × 主题数)。
+GraphCache 在此基础上只重新查询发生变化的主题，并维护单调递增的图版本号，
+图未变化时所有查询都是字典读取。
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _unique(items) -> List[str]:
+    """去重并保持顺序（同一节点可能在一个主题上有多个发布者/订阅者）"""
+    return list(dict.fromkeys(items))
+
+
+class GraphSnapshot:
+    """某一版本的 ROS 图（创建后不再修改，可在线程间共享）
+
+    - topic_types: 主题 -> 消息类型
+    - topic_publishers / topic_subscribers: 主题 -> 节点名列表
+    - node_namespaces: 节点名 -> 命名空间
+    - node_publishers / node_subscribers: 节点名 -> 主题列表
+    - node_services: 节点名 -> 提供的服务列表
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.created_at = time.monotonic()
+        self.topic_types: Dict[str, str] = {}
+        self.topic_publishers: Dict[str, List[str]] = {}
+        self.topic_subscribers: Dict[str, List[str]] = {}
+        self.node_namespaces: Dict[str, str] = {}
+        self.node_publishers: Dict[str, List[str]] = {}
+        self.node_subscribers: Dict[str, List[str]] = {}
+        self.node_services: Dict[str, List[str]] = {}
+
+    @property
+    def age(self) -> float:
+        """快照存在的时长 (秒)"""
+        return time.monotonic() - self.created_at
+
+    def copy(self, version: int) -> 'GraphSnapshot':
+        """浅拷贝为新版本（列表在修改前单独复制）"""
+        snapshot = GraphSnapshot(version)
+        snapshot.topic_types = dict(self.topic_types)
+        snapshot.topic_publishers = dict(self.topic_publishers)
+        snapshot.topic_subscribers = dict(self.topic_subscribers)
+        snapshot.node_namespaces = dict(self.node_namespaces)
+        snapshot.node_publishers = dict(self.node_publishers)
+        snapshot.node_subscribers = dict(self.node_subscribers)
+        snapshot.node_services = dict(self.node_services)
+        return snapshot
+
+    def add_topic(self, topic: str, message_type: str, publishers: List[str], subscribers: List[str]):
+        """加入一个主题及其端点，同时更新节点索引"""
+        self.add_topics([(topic, message_type, publishers, subscribers)])
+
+    def add_topics(self, entries: Iterable[Tuple[str, str, List[str], List[str]]]):
+        """批量加入主题 (主题, 类型, 发布者, 订阅者)
+
+        先按节点汇总新增的主题，每个节点的主题列表只复制一次（列表可能与旧版本快照共享）
+        """
+        published: Dict[str, List[str]] = {}
+        subscribed: Dict[str, List[str]] = {}
+        for topic, message_type, publishers, subscribers in entries:
+            self.topic_types[topic] = message_type
+            self.topic_publishers[topic] = _unique(publishers)
+            self.topic_subscribers[topic] = _unique(subscribers)
+            for node_name in self.topic_publishers[topic]:
+                published.setdefault(node_name, []).append(topic)
+            for node_name in self.topic_subscribers[topic]:
+                subscribed.setdefault(node_name, []).append(topic)
+        for index, additions in ((self.node_publishers, published), (self.node_subscribers, subscribed)):
+            for node_name, topics in additions.items():
+                index[node_name] = index.get(node_name, []) + topics
+
+    def remove_topic(self, topic: str):
+        """移除一个主题，同时从节点索引中删除"""
+        self.remove_topics([topic])
+
+    def remove_topics(self, topics: Iterable[str]):
+        """批量移除主题，每个受影响节点的主题列表只重建一次"""
+        unpublished: Dict[str, set] = {}
+        unsubscribed: Dict[str, set] = {}
+        for topic in topics:
+            self.topic_types.pop(topic, None)
+            for node_name in self.topic_publishers.pop(topic, []):
+                unpublished.setdefault(node_name, set()).add(topic)
+            for node_name in self.topic_subscribers.pop(topic, []):
+                unsubscribed.setdefault(node_name, set()).add(topic)
+        for index, removals in ((self.node_publishers, unpublished), (self.node_subscribers, unsubscribed)):
+            for node_name, removed in removals.items():
+                remaining = [name for name in index.get(node_name, []) if name not in removed]
+                if remaining:
+                    index[node_name] = remaining
+                else:
+                    index.pop(node_name, None)
+
+
+def _query_endpoints(node, topic: str) -> Tuple[List[str], List[str]]:
+    """查询主题的发布者与订阅者节点名，失败时返回空列表"""
+    try:
+        publishers = [info.node_name for info in node.get_publishers_info_by_topic(topic)]
+        subscribers = [info.node_name for info in node.get_subscriptions_info_by_topic(topic)]
+        return publishers, subscribers
+    except Exception as e:
+        logger.debug(f"Could not get endpoint info for topic {topic}: {e}")
+        return [], []
+
+
+def _query_services(node, name: str, namespace: str) -> List[str]:
+    """查询节点提供的服务，失败时返回空列表"""
+    try:
+        return [service for service, _ in node.get_service_names_and_types_by_node(name, namespace)]
+    except Exception as e:
+        logger.debug(f"Could not get services for node {namespace} {name}: {e}")
+        return []
+
+
+class GraphCache:
+    """增量 ROS 图缓存
+
+    refresh() 只做廉价的检查：节点名集合、主题名与类型、每个主题的端点数量。
+    只有新增/消失/类型或端点数量变化的主题（以及涉及增删节点的主题）才会重新查询端点信息；
+    节点提供的服务在节点出现、命名空间变化或其主题端点变化时查询，
+    并每隔 service_refresh_interval 秒对所有节点重新查询一次（服务变化不影响主题端点计数）。
+    图发生变化时生成新版本的不可变快照，读取方始终拿到一致的快照。
+    可被多个服务共享：刷新串行执行，变化通过监听器通知
+    """
+
+    def __init__(self, node, service_refresh_interval: float = 10.0):
+        self.node = node
+        self.snapshot = GraphSnapshot()
+        self.last_refresh: Optional[float] = None
+        self.service_refresh_interval = service_refresh_interval
+        self._last_service_refresh: Optional[float] = None
+        self._endpoint_counts: Dict[str, Tuple[int, int]] = {}
+        self._listeners: List[Callable[[GraphSnapshot, GraphSnapshot, Dict[str, List[str]]], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[GraphSnapshot, GraphSnapshot, Dict[str, List[str]]], None]):
+        """注册图变化监听器 listener(旧快照, 新快照, 变化内容)，在执行刷新的线程中调用"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    def refresh_if_stale(self, min_interval: float) -> Optional[Dict[str, List[str]]]:
+        """距上次检查超过 min_interval 秒时刷新"""
+        if self.last_refresh is not None and time.monotonic() - self.last_refresh < min_interval:
+            return None
+        return self.refresh()
+
+    def refresh(self) -> Optional[Dict[str, List[str]]]:
+        """检查 ROS 图变化并增量更新缓存
+
+        图有变化时版本号加一并返回变化内容
+        {nodes_added, nodes_removed, nodes_updated, topics_added, topics_removed, topics_updated}，否则返回 None；
+        nodes_updated 为服务列表发生变化的已有节点
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> Optional[Dict[str, List[str]]]:
+        self.last_refresh = time.monotonic()
+        current = self.snapshot
+        node = self.node
+
+        node_namespaces: Dict[str, str] = {}
+        for name, namespace in node.get_node_names_and_namespaces():
+            node_namespaces.setdefault(name, namespace)
+        topic_types = {topic: (types[0] if types else "unknown")
+                       for topic, types in node.get_topic_names_and_types()}
+
+        endpoint_counts: Dict[str, Tuple[int, int]] = {}
+        for topic in topic_types:
+            try:
+                endpoint_counts[topic] = (node.count_publishers(topic), node.count_subscribers(topic))
+            except Exception as e:
+                logger.debug(f"Could not count endpoints for topic {topic}: {e}")
+                endpoint_counts[topic] = (-1, -1)
+
+        nodes_added = [name for name in node_namespaces if name not in current.node_namespaces]
+        nodes_removed = [name for name in current.node_namespaces if name not in node_namespaces]
+        topics_added = [topic for topic in topic_types if topic not in current.topic_types]
+        topics_removed = [topic for topic in current.topic_types if topic not in topic_types]
+
+        # 端点数量或类型变化的主题，以及增删节点曾经/可能涉及的主题需要重新查询
+        changed_nodes = set(nodes_added) | set(nodes_removed)
+        topics_updated = []
+        for topic, message_type in topic_types.items():
+            if topic not in current.topic_types:
+                continue
+            if (current.topic_types[topic] != message_type
+                    or self._endpoint_counts.get(topic) != endpoint_counts[topic]
+                    or any(name in changed_nodes for name in current.topic_publishers.get(topic, ()))
+                    or any(name in changed_nodes for name in current.topic_subscribers.get(topic, ()))):
+                topics_updated.append(topic)
+
+        self._endpoint_counts = endpoint_counts
+        endpoints = {topic: _query_endpoints(node, topic) for topic in topics_added + topics_updated}
+
+        # 需要重新查询服务的节点：新增/命名空间变化、主题端点变化涉及的节点，定期为全部节点
+        now = self.last_refresh
+        if (self._last_service_refresh is None
+                or now - self._last_service_refresh >= self.service_refresh_interval):
+            self._last_service_refresh = now
+            service_nodes = set(node_namespaces)
+        else:
+            service_nodes = {name for name, namespace in node_namespaces.items()
+                             if current.node_namespaces.get(name) != namespace}
+            for topic in topics_removed + topics_updated:
+                service_nodes.update(current.topic_publishers.get(topic, ()))
+                service_nodes.update(current.topic_subscribers.get(topic, ()))
+            for publishers, subscribers in endpoints.values():
+                service_nodes.update(publishers)
+                service_nodes.update(subscribers)
+        node_services = {name: _query_services(node, name, node_namespaces[name])
+                         for name in service_nodes if name in node_namespaces}
+        nodes_updated = [name for name, services in node_services.items()
+                         if name in current.node_namespaces and current.node_services.get(name) != services]
+
+        if not (nodes_added or nodes_removed or nodes_updated or topics_added or topics_removed
+                or topics_updated or node_namespaces != current.node_namespaces):
+            return None
+
+        snapshot = current.copy(current.version + 1)
+        snapshot.node_namespaces = node_namespaces
+        for name in nodes_removed:
+            snapshot.node_services.pop(name, None)
+        snapshot.node_services.update(node_services)
+        snapshot.remove_topics(topics_removed + topics_updated)
+        snapshot.add_topics(
+            (topic, topic_types[topic]) + endpoints[topic]
+            for topic in topics_added + topics_updated
+        )
+        self.snapshot = snapshot
+
+        changes = {
+            'nodes_added': nodes_added,
+            'nodes_removed': nodes_removed,
+            'nodes_updated': nodes_updated,
+            'topics_added': topics_added,
+            'topics_removed': topics_removed,
+            'topics_updated': topics_updated,
+        }
+        logger.debug(f"Graph version {snapshot.version}: "
+                     f"+{len(nodes_added)}/-{len(nodes_removed)}/~{len(nodes_updated)} nodes, "
+                     f"+{len(topics_added)}/-{len(topics_removed)}/~{len(topics_updated)} topics")
+        for listener in list(self._listeners):
+            try:
+                listener(current, snapshot, changes)
+            except Exception as e:
+                logger.error(f"Error in graph change listener: {e}")
+        return changes
+
+
+def _node_entry(snapshot: GraphSnapshot, name: str) -> Dict:
+    return {
+        'name': name,
+        'namespace': snapshot.node_namespaces.get(name, '/'),
+        'publishers': snapshot.node_publishers.get(name, []),
+        'subscribers': snapshot.node_subscribers.get(name, []),
+        'services': snapshot.node_services.get(name, []),
+    }
+
+
+def _topic_entry(snapshot: GraphSnapshot, topic: str) -> Dict:
+    return {
+        'name': topic,
+        'message_type': snapshot.topic_types[topic],
+        'publishers': snapshot.topic_publishers.get(topic, []),
+        'subscribers': snapshot.topic_subscribers.get(topic, []),
+    }
+
+
+def _topic_edges(snapshot: GraphSnapshot, topic: str) -> set:
+    """主题的边集合：(节点, 主题, publish/subscribe)"""
+    edges = {(name, topic, 'publish') for name in snapshot.topic_publishers.get(topic, ())}
+    edges.update((name, topic, 'subscribe') for name in snapshot.topic_subscribers.get(topic, ()))
+    return edges
+
+
+def _edge_entries(edges) -> List[Dict]:
+    return [{'node': node, 'topic': topic, 'direction': direction}
+            for node, topic, direction in sorted(edges)]
+
+
+def snapshot_message(snapshot: GraphSnapshot) -> Dict:
+    """完整图快照消息（subscribe_graph 的首条消息）"""
+    edges = set()
+    for topic in snapshot.topic_types:
+        edges |= _topic_edges(snapshot, topic)
+    return {
+        'op': 'graph_snapshot',
+        'version': snapshot.version,
+        'nodes': [_node_entry(snapshot, name) for name in snapshot.node_namespaces],
+        'topics': [_topic_entry(snapshot, topic) for topic in snapshot.topic_types],
+        'edges': _edge_entries(edges),
+    }
+
+
+def delta_message(previous: GraphSnapshot, current: GraphSnapshot, changes: Dict[str, List[str]]) -> Dict:
+    """两个相邻版本之间的增量消息
+
+    只包含新增/删除/变化的节点、主题与边；客户端发现 previous_version 与本地版本不一致时应重新订阅
+    """
+    changed_topics = changes['topics_added'] + changes['topics_removed'] + changes['topics_updated']
+    edges_before, edges_after = set(), set()
+    for topic in changed_topics:
+        edges_before |= _topic_edges(previous, topic)
+        edges_after |= _topic_edges(current, topic)
+
+    # 端点变化涉及的已有节点需要更新其发布/订阅列表，服务列表变化的节点同样需要更新
+    node_changes = set(changes['nodes_added']) | set(changes['nodes_removed'])
+    touched_nodes = {node for node, _, _ in edges_before ^ edges_after}
+    touched_nodes.update(changes.get('nodes_updated', ()))
+    updated_nodes = [name for name in current.node_namespaces
+                     if name not in node_changes
+                     and (name in touched_nodes
+                          or previous.node_namespaces.get(name) != current.node_namespaces[name])]
+
+    return {
+        'op': 'graph_delta',
+        'version': current.version,
+        'previous_version': previous.version,
+        'nodes': {
+            'added': [_node_entry(current, name) for name in changes['nodes_added']],
+            'removed': changes['nodes_removed'],
+            'updated': [_node_entry(current, name) for name in updated_nodes],
+        },
+        'topics': {
+            'added': [_topic_entry(current, topic) for topic in changes['topics_added']],
+            'removed': changes['topics_removed'],
+            'updated': [_topic_entry(current, topic) for topic in changes['topics_updated']],
+        },
+        'edges': {
+            'added': _edge_entries(edges_after - edges_before),
+            'removed': _edge_entries(edges_before - edges_after),
+        },
+    }
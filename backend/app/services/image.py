@@ -0,0 +1,219 @@
+"""
+图像数据处理
+基于 NumPy 的 sensor_msgs/Image 零拷贝视图、区域平均缩放与 JPEG/PNG 转码
+"""
+
+import io
+import logging
+import struct
+import zlib
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from PIL import Image as PILImage
+except ImportError:  # 可选依赖
+    PILImage = None
+
+logger = logging.getLogger(__name__)
+
+# sensor_msgs/Image 编码到 (NumPy 类型, 通道数) 的映射
+IMAGE_ENCODINGS = {
+    'rgb8': ('u1', 3),
+    'bgr8': ('u1', 3),
+    'rgba8': ('u1', 4),
+    'bgra8': ('u1', 4),
+    'mono8': ('u1', 1),
+    'mono16': ('u2', 1),
+    '8UC1': ('u1', 1),
+    '8UC3': ('u1', 3),
+    '8UC4': ('u1', 4),
+    '16UC1': ('u2', 1),
+    '32FC1': ('f4', 1),
+}
+
+IMAGE_FORMATS = ('raw', 'jpeg', 'png')
+
+# 未指定最大分辨率时的像素预算
+DEFAULT_MAX_PIXELS = 640 * 480
+
+# BGR 类编码转码前需要交换通道，转码后统一为 RGB 顺序
+_BGR_ENCODINGS = ('bgr8', 'bgra8')
+
+
+def image_view(data, height: int, width: int, step: int, encoding: str,
+               is_bigendian: bool = False) -> Optional[np.ndarray]:
+    """将 Image.data 映射为 (height, width, channels) 数组视图（零拷贝）
+
+    行尾填充 (step > width * 像素字节数) 会被跳过；不支持的编码返回 None
+    """
+    layout = IMAGE_ENCODINGS.get(encoding)
+    if layout is None:
+        return None
+    type_code, channels = layout
+    dtype = np.dtype(('>' if is_bigendian else '<') + type_code)
+    row_bytes = width * channels * dtype.itemsize
+    if step < row_bytes or height * step > len(data):
+        raise ValueError(f"Image buffer too small for {width}x{height} {encoding} (step {step})")
+
+    rows = np.frombuffer(data, dtype=np.uint8, count=height * step).reshape(height, step)
+    return rows[:, :row_bytes].view(dtype).reshape(height, width, channels)
+
+
+def scale_factor(width: int, height: int, max_width: Optional[int] = None,
+                 max_height: Optional[int] = None) -> int:
+    """计算整数缩放因子，使缩放后的图像不超过最大分辨率（未指定时使用像素预算）"""
+    if max_width or max_height:
+        factor = 1
+        if max_width:
+            factor = max(factor, -(-width // max_width))
+        if max_height:
+            factor = max(factor, -(-height // max_height))
+        return factor
+
+    factor = 1
+    while (width // factor) * (height // factor) > DEFAULT_MAX_PIXELS:
+        factor += 1
+    return factor
+
+
+def downscale_area(image: np.ndarray, factor: int) -> np.ndarray:
+    """区域平均缩放：每 factor x factor 个像素取平均，宽高不能整除的边缘被裁掉
+
+    按块内偏移逐个累加步长切片，比 reshape 后沿多个轴求平均快数倍
+    """
+    if factor <= 1:
+        return image
+    height, width, _ = image.shape
+    rows, cols = height // factor * factor, width // factor * factor
+    accumulate_dtype = np.float32 if image.dtype.kind == 'f' else np.uint32
+    total = image[0:rows:factor, 0:cols:factor].astype(accumulate_dtype)
+    for i in range(factor):
+        for j in range(factor):
+            if i or j:
+                np.add(total, image[i:rows:factor, j:cols:factor], out=total, casting='unsafe')
+
+    area = factor * factor
+    if image.dtype.kind == 'f':
+        total /= area
+    else:
+        total += area // 2
+        total //= area
+    return total.astype(image.dtype.newbyteorder('='))
+
+
+def _png_chunk(chunk_type: bytes, payload: bytes) -> bytes:
+    return (struct.pack('>I', len(payload)) + chunk_type + payload
+            + struct.pack('>I', zlib.crc32(chunk_type + payload) & 0xffffffff))
+
+
+def _encode_png_zlib(image: np.ndarray) -> bytes:
+    """标准库实现的 PNG 编码（Pillow 未安装时使用）"""
+    height, width, channels = image.shape
+    bit_depth = image.dtype.itemsize * 8
+    color_type = {1: 0, 3: 2, 4: 6}[channels]
+    pixels = image.astype(image.dtype.newbyteorder('>'), copy=False).reshape(height, -1).view(np.uint8)
+    # 每行前加 0 (无过滤) 字节
+    raw = np.empty((height, pixels.shape[1] + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = pixels
+    header = struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(raw.tobytes(), 1)) + _png_chunk(b'IEND', b''))
+
+
+def _encode_pil(image: np.ndarray, image_format: str, quality: int) -> bytes:
+    """使用 Pillow 编码 8 位图像"""
+    if image.shape[2] == 1:
+        pil_image = PILImage.fromarray(np.ascontiguousarray(image[:, :, 0]), 'L')
+    else:
+        pil_image = PILImage.fromarray(np.ascontiguousarray(image))
+
+    buffer = io.BytesIO()
+    if image_format == 'jpeg':
+        pil_image.save(buffer, format='JPEG', quality=quality)
+    else:
+        pil_image.save(buffer, format='PNG', compress_level=1)
+    return buffer.getvalue()
+
+
+def encode_image(image: np.ndarray, encoding: str, image_format: str,
+                 quality: int = 80) -> Tuple[bytes, str, str]:
+    """将图像数组编码为 JPEG/PNG，返回 (数据, 实际格式, 像素编码)
+
+    - BGR 类编码转为 RGB；JPEG 丢弃 alpha 通道，16 位图像取高 8 位
+    - JPEG 需要 Pillow，未安装时回退到 PNG；PNG 在没有 Pillow 时使用标准库编码
+    - 浮点图像无法转码，调用方应发送原始数据
+    """
+    if image.dtype.kind == 'f':
+        raise ValueError(f"Cannot transcode floating point image ({encoding})")
+    if image_format == 'jpeg' and PILImage is None:
+        logger.warning("Pillow is not installed, falling back to png")
+        image_format = 'png'
+
+    if encoding in _BGR_ENCODINGS:
+        image = image[:, :, [2, 1, 0, 3][:image.shape[2]]]
+    channels = image.shape[2]
+    if channels == 1:
+        pixel_encoding = 'mono16' if image.dtype.itemsize == 2 else 'mono8'
+    else:
+        pixel_encoding = 'rgba8' if channels == 4 else 'rgb8'
+
+    if image_format == 'jpeg':
+        if channels == 4:
+            image = image[:, :, :3]
+            pixel_encoding = 'rgb8'
+        if image.dtype.itemsize == 2:
+            image = (image >> 8).astype(np.uint8)
+            pixel_encoding = 'mono8'
+        return _encode_pil(image, 'jpeg', quality), 'jpeg', pixel_encoding
+
+    if PILImage is not None and image.dtype.itemsize == 1:
+        return _encode_pil(image, 'png', quality), 'png', pixel_encoding
+    return _encode_png_zlib(image), 'png', pixel_encoding
+
+
+def process_image(data, height: int, width: int, step: int, encoding: str,
+                  is_bigendian: bool = False, image_format: str = 'raw', quality: int = 80,
+                  max_width: Optional[int] = None, max_height: Optional[int] = None) -> Dict:
+    """缩放并按需转码图像，返回可直接发送的消息字段
+
+    不支持的编码（Bayer、YUV 等）保持原始数据不变
+    """
+    view = image_view(data, height, width, step, encoding, is_bigendian)
+    if view is None:
+        return {
+            'height': height, 'width': width, 'encoding': encoding,
+            'is_bigendian': is_bigendian, 'step': step,
+            'format': 'raw', 'data': bytes(data), 'scaled': False,
+        }
+
+    factor = scale_factor(width, height, max_width, max_height)
+    scaled = downscale_area(view, factor)
+    result = {
+        'height': int(scaled.shape[0]),
+        'width': int(scaled.shape[1]),
+        'scaled': factor > 1,
+    }
+    if factor > 1:
+        result['original_width'] = width
+        result['original_height'] = height
+
+    if image_format in ('jpeg', 'png') and scaled.dtype.kind != 'f':
+        payload, used_format, pixel_encoding = encode_image(scaled, encoding, image_format, quality)
+        result.update({'encoding': pixel_encoding, 'is_bigendian': False, 'step': 0,
+                       'format': used_format, 'data': payload})
+        if used_format == 'jpeg':
+            result['quality'] = quality
+        return result
+
+    if factor > 1:
+        payload = np.ascontiguousarray(scaled).tobytes()
+        result.update({'encoding': encoding, 'is_bigendian': False,
+                       'step': int(scaled.shape[1] * scaled.shape[2] * scaled.dtype.itemsize)})
+    else:
+        payload = bytes(data)
+        result.update({'encoding': encoding, 'is_bigendian': is_bigendian, 'step': step})
+    result.update({'format': 'raw', 'data': payload})
+    return result
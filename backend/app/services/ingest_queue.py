@@ -0,0 +1,121 @@
+"""
+ROS 消息接收队列
+按主题分桶缓存待处理消息，支持每个主题独立的缓存模式，避免高频主题挤占低频主题
+
+缓存模式:
+- fifo: 按顺序保留所有消息，受全局容量限制，满时丢弃新消息
+- latest_only: 只保留最新一条，新消息替换该主题尚未处理的旧消息
+- ring(N): 保留最新的 N 条，溢出时丢弃该主题最早的消息
+"""
+
+import asyncio
+import logging
+import re
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_RING_PATTERN = re.compile(r'^ring\((\d+)\)$')
+
+
+def parse_ingest_mode(mode: str) -> Tuple[str, Optional[int]]:
+    """解析缓存模式字符串，返回 (模式, 容量)；无法解析时回退为 fifo"""
+    normalized = (mode or 'fifo').strip().lower()
+    if normalized == 'fifo':
+        return 'fifo', None
+    if normalized == 'latest_only':
+        return 'latest_only', 1
+    match = _RING_PATTERN.match(normalized)
+    if match and int(match.group(1)) > 0:
+        return 'ring', int(match.group(1))
+    logger.warning(f"Invalid ingest mode '{mode}', using fifo")
+    return 'fifo', None
+
+
+class IngestQueue:
+    """按主题分桶的消息接收队列
+
+    各主题轮流出队，保证同一主题内消息有序，且任何主题都不会被其他高频主题饿死
+    """
+
+    def __init__(self, maxsize: int = 1000, default_mode: str = 'fifo',
+                 topic_modes: Optional[Dict[str, str]] = None):
+        self.maxsize = maxsize
+        self.default_mode = parse_ingest_mode(default_mode)
+        self.topic_modes = {topic: parse_ingest_mode(mode) for topic, mode in (topic_modes or {}).items()}
+        self.dropped: Dict[str, int] = {}
+        self._buffers: Dict[str, Deque[Any]] = {}
+        self._ready: Deque[str] = deque()
+        self._fifo_size = 0
+        self._size = 0
+        self._not_empty = asyncio.Event()
+
+    def mode_for(self, topic: str) -> Tuple[str, Optional[int]]:
+        """获取主题的缓存模式"""
+        return self.topic_modes.get(topic, self.default_mode)
+
+    def qsize(self) -> int:
+        return self._size
+
+    def put_nowait(self, topic: str, item: Any):
+        """放入消息（非阻塞）
+
+        fifo 主题在全局容量已满时抛出 asyncio.QueueFull；
+        latest_only/ring 主题从不阻塞，溢出时替换该主题最早的消息
+        """
+        mode, capacity = self.mode_for(topic)
+        buffer = self._buffers.get(topic)
+        if buffer is None:
+            buffer = deque()
+            self._buffers[topic] = buffer
+        was_pending = bool(buffer)
+
+        if mode == 'fifo':
+            if self._fifo_size >= self.maxsize:
+                self.dropped[topic] = self.dropped.get(topic, 0) + 1
+                raise asyncio.QueueFull()
+            self._fifo_size += 1
+        elif len(buffer) >= capacity:
+            buffer.popleft()
+            self._size -= 1
+            self.dropped[topic] = self.dropped.get(topic, 0) + 1
+
+        if not was_pending:
+            self._ready.append(topic)
+        buffer.append(item)
+        self._size += 1
+        self._not_empty.set()
+
+    async def get(self) -> Tuple[str, Any]:
+        """按主题轮转取出下一条消息，队列为空时等待"""
+        while not self._ready:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        topic = self._ready.popleft()
+        buffer = self._buffers[topic]
+        item = buffer.popleft()
+        self._size -= 1
+        if self.mode_for(topic)[0] == 'fifo':
+            self._fifo_size -= 1
+        if buffer:
+            self._ready.append(topic)
+        return topic, item
+
+    def discard(self, topic: str) -> int:
+        """丢弃主题的全部待处理消息并移除其缓冲区（订阅销毁时调用），返回丢弃的消息数"""
+        buffer = self._buffers.pop(topic, None)
+        self.dropped.pop(topic, None)
+        if not buffer:
+            return 0
+        count = len(buffer)
+        self._size -= count
+        if self.mode_for(topic)[0] == 'fifo':
+            self._fifo_size -= count
+        self._ready.remove(topic)
+        return count
+
+    def task_done(self):
+        """与 asyncio.Queue 接口保持一致"""
+        pass
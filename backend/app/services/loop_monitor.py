@@ -0,0 +1,61 @@
+"""
+事件循环延迟监控
+周期性地休眠固定间隔，实际唤醒时间与预期的差值即事件循环被阻塞的时长
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopLagMonitor:
+    """事件循环延迟监控器"""
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        self.interval = interval
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.max_lag = 0.0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self._samples.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    def reset(self):
+        """清空统计"""
+        self._samples.clear()
+        self.max_lag = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """返回窗口内的延迟统计 (毫秒)"""
+        samples = sorted(self._samples)
+        if not samples:
+            return {'current_ms': 0.0, 'mean_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        return {
+            'current_ms': self._samples[-1] * 1000,
+            'mean_ms': sum(samples) / len(samples) * 1000,
+            'p99_ms': p99 * 1000,
+            'max_ms': self.max_lag * 1000,
+        }
@@ -0,0 +1,481 @@
+"""
+ROS 消息转换
+将 ROS 消息转换为可编码的字典，点云与图像按订阅选项降采样/转码
+
+转换器只依赖自身的配置，可以被序列化后在线程池或进程池中执行
+"""
+
+import array
+import functools
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from ..models.ros import SubscriptionOptions
+from .image import process_image
+from .pointcloud import stride_sample, reduce_pointcloud, quantize_pointcloud, compress_payload
+
+logger = logging.getLogger(__name__)
+
+# 不超过该大小的点云/原始图像数据以整数列表传输（data_encoding 为 array，与原 JSON 格式一致），
+# 更大的数据保留原始字节，由帧编码决定传输方式
+_INLINE_DATA_BYTES = 10000
+
+
+class MessageConverter:
+    """ROS 消息到字典的转换器"""
+
+    def __init__(self, max_points: int = 50000):
+        # 点云默认点数预算（与 RenderSettings.max_points 同步）
+        self.max_points = max_points
+
+    def _process_pointcloud_data(self, pointcloud_msg, options: Optional[SubscriptionOptions] = None) -> dict:
+        """处理点云数据，进行压缩和采样优化
+
+        options 请求了体素滤波/字段投影时输出紧凑的 float32/float16 点数据，
+        否则按点数预算做步长采样并保留原始点格式
+        """
+        try:
+            # 解析点云字段
+            fields = []
+            for field in pointcloud_msg.fields:
+                fields.append({
+                    'name': field.name,
+                    'offset': field.offset,
+                    'datatype': field.datatype,
+                    'count': field.count
+                })
+            
+            # 基本信息
+            result = {
+                'header': self.message_to_dict(pointcloud_msg.header),
+                'height': pointcloud_msg.height,
+                'width': pointcloud_msg.width,
+                'fields': fields,
+                'is_bigendian': pointcloud_msg.is_bigendian,
+                'point_step': pointcloud_msg.point_step,
+                'row_step': pointcloud_msg.row_step,
+                'is_dense': pointcloud_msg.is_dense
+            }
+            
+            # 处理点云数据
+            if len(pointcloud_msg.data) > 0:
+                logger.debug(f"Processing pointcloud data - Total bytes: {len(pointcloud_msg.data)}, Point step: {pointcloud_msg.point_step}")
+                
+                # 点数预算：订阅选项优先，否则使用渲染设置中的最大点数
+                total_points = pointcloud_msg.width * pointcloud_msg.height
+                if options and options.max_points:
+                    max_points = options.max_points
+                else:
+                    max_points = self.max_points
+                
+                logger.debug(f"Pointcloud info - Width: {pointcloud_msg.width}, Height: {pointcloud_msg.height}, Total points: {total_points}")
+                
+                if options and options.quantize:
+                    # 量化 + 差分 + 压缩的紧凑格式，解码参数放在 quantization 中
+                    data, quantization, point_count, reduction = quantize_pointcloud(
+                        pointcloud_msg.data,
+                        fields,
+                        pointcloud_msg.point_step,
+                        total_points,
+                        is_bigendian=pointcloud_msg.is_bigendian,
+                        voxel_size=options.voxel_size,
+                        max_points=max_points,
+                        compression=options.point_compression or 'zstd'
+                    )
+                    result.update({
+                        'data': data,
+                        'data_encoding': 'base64',
+                        'point_format': 'quantized',
+                        'quantization': quantization,
+                        'fields': [],
+                        'width': point_count,
+                        'height': 1,
+                        'point_step': 0,
+                        'row_step': 0,
+                        'is_bigendian': False,
+                        'is_dense': True,
+                        'sampled': point_count < total_points,
+                        'original_points': total_points,
+                        'reduction': reduction
+                    })
+                    logger.debug(f"Quantized pointcloud {total_points} -> {point_count} points, {len(data)} bytes ({quantization['compression']})")
+                elif options and options.reduces_pointcloud():
+                    # 字段投影 + 体素滤波，输出紧凑的浮点点数据
+                    data, reduced_fields, point_count, reduction = reduce_pointcloud(
+                        pointcloud_msg.data,
+                        fields,
+                        pointcloud_msg.point_step,
+                        total_points,
+                        is_bigendian=pointcloud_msg.is_bigendian,
+                        field_names=options.fields,
+                        voxel_size=options.voxel_size,
+                        max_points=max_points,
+                        output_dtype=options.point_dtype
+                    )
+                    point_step = reduction['point_step']
+                    data, used_compression = compress_payload(data, options.point_compression)
+                    result.update({
+                        'data': data,
+                        'data_compression': used_compression,
+                        'data_encoding': 'base64',
+                        'fields': reduced_fields,
+                        'width': point_count,
+                        'height': 1,
+                        'point_step': point_step,
+                        'row_step': point_step * point_count,
+                        'is_bigendian': False,
+                        'is_dense': True,
+                        'sampled': point_count < total_points,
+                        'original_points': total_points,
+                        'reduction': reduction
+                    })
+                    logger.debug(f"Reduced pointcloud {total_points} -> {point_count} points, {len(data)} bytes ({reduction})")
+                elif total_points > max_points and total_points > 0:
+                    # 采样数据 - 修复采样逻辑
+                    sample_step = max(1, total_points // max_points)
+                    logger.info(f"Sampling pointcloud: {total_points} -> ~{total_points//sample_step} points (step: {sample_step})")
+                    
+                    point_step = pointcloud_msg.point_step
+                    
+                    # 按照点为单位进行采样（NumPy 视图步长切片，避免逐点循环）
+                    sampled_data = stride_sample(pointcloud_msg.data, point_step, total_points, sample_step)
+                    
+                    # 保留原始字节，由帧编码决定传输方式（JSON 为 Base64，CBOR/MessagePack 为原始字节串）
+                    result['data'] = sampled_data
+                    result['data_encoding'] = 'base64'
+                    result['width'] = len(sampled_data) // point_step
+                    result['height'] = 1
+                    result['sampled'] = True
+                    result['original_points'] = total_points
+                    result['sample_step'] = sample_step
+
+                    logger.info(f"Sampled pointcloud - New size: {len(sampled_data)} bytes, Points: {result['width']}")
+                elif len(pointcloud_msg.data) > _INLINE_DATA_BYTES:
+                    # 直接传输原始字节
+                    result['data'] = bytes(pointcloud_msg.data)
+                    result['data_encoding'] = 'base64'
+                    logger.debug(f"Direct pointcloud transmission - {len(pointcloud_msg.data)} bytes, {total_points} points")
+
+                    result['sampled'] = False
+                else:
+                    result['data'] = list(pointcloud_msg.data)
+                    result['data_encoding'] = 'array'
+                    logger.debug(f"Direct pointcloud transmission - {len(pointcloud_msg.data)} bytes, {total_points} points, as array")
+
+                    result['sampled'] = False
+            else:
+                result['data'] = []
+                result['data_encoding'] = 'array'
+                result['sampled'] = False
+                logger.warning("Pointcloud data is empty")
+                
+            return result
+            
+        except Exception as e:
+            logger.error(f"Failed to process pointcloud data: {e}")
+            return {
+                'header': self.message_to_dict(pointcloud_msg.header),
+                'error': str(e),
+                'data': []
+            }
+
+    def _process_image_data(self, image_msg, options: Optional[SubscriptionOptions] = None) -> dict:
+        """处理图像数据：超过最大分辨率时区域平均缩放，并按订阅选项转码为 JPEG/PNG"""
+        try:
+            options = options or SubscriptionOptions()
+            result = {'header': self.message_to_dict(image_msg.header)}
+            result.update(process_image(
+                image_msg.data, image_msg.height, image_msg.width, image_msg.step,
+                image_msg.encoding, bool(image_msg.is_bigendian),
+                image_format=options.image_format,
+                quality=options.image_quality,
+                max_width=options.image_max_width,
+                max_height=options.image_max_height
+            ))
+            if result['format'] == 'raw' and len(result['data']) <= _INLINE_DATA_BYTES:
+                result['data'] = list(result['data'])
+                result['data_encoding'] = 'array'
+            else:
+                result['data_encoding'] = 'base64'
+
+            if result['scaled']:
+                logger.debug(f"Scaled image: {image_msg.width}x{image_msg.height} -> "
+                             f"{result['width']}x{result['height']} ({result['format']})")
+
+            return result
+            
+        except Exception as e:
+            logger.error(f"Failed to process image data: {e}")
+            return {
+                'header': self.message_to_dict(image_msg.header),
+                'error': str(e),
+                'data': []
+            }
+
+    def message_to_dict(self, msg, options: Optional[SubscriptionOptions] = None) -> dict:
+        """将 ROS 消息转换为字典
+
+        options 为订阅选项，用于点云等需要按订阅定制的转换；
+        每种消息类型首次出现时按 get_fields_and_field_types() 编译专用转换函数，之后直接复用。
+        options.typed_arrays 为真时数值数组字段输出为紧凑二进制块（见 pack_array）
+        """
+        try:
+            typed_arrays = bool(options and options.typed_arrays)
+            return converter_for(type(msg), typed_arrays)(self, msg, options)
+        except Exception as e:
+            logger.error(f"Failed to convert message to dict: {e}")
+            return {"error": str(e), "message_type": type(msg).__name__}
+
+    def _process_compressed_image(self, msg, options: Optional[SubscriptionOptions] = None) -> dict:
+        """CompressedImage 已是压缩格式，原样转发"""
+        return {
+            'header': self.message_to_dict(msg.header),
+            'format': msg.format,
+            'data': bytes(msg.data),
+            'data_encoding': 'base64'
+        }
+
+
+# 整条消息特殊处理的类型（点云降采样、图像转码）
+_MESSAGE_HANDLERS = {
+    'sensor_msgs/PointCloud2': MessageConverter._process_pointcloud_data,
+    'sensor_msgs/Image': MessageConverter._process_image_data,
+    'sensor_msgs/CompressedImage': MessageConverter._process_compressed_image,
+}
+
+_FLOAT_TYPES = frozenset(('float', 'double', 'float32', 'float64'))
+_INT_TYPES = frozenset(('boolean', 'int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32', 'int64', 'uint64'))
+# rosidl 中以 numpy 数组 / array.array 表示的数值数组元素类型
+_NUMERIC_ARRAY_TYPES = (_FLOAT_TYPES | _INT_TYPES) - {'boolean'}
+
+# (消息类, 是否打包数值数组) -> 编译后的转换函数 convert(converter, msg, options)，每个进程各自缓存
+_converters: Dict[Tuple[type, bool], Callable] = {}
+
+
+def pack_array(value) -> Tuple[bytes, str]:
+    """将 numpy 数组或 array.array 打包为小端序原始字节，返回 (字节, dtype 名称)
+
+    不创建逐元素的 Python 对象；客户端按 dtype 直接构造 TypedArray
+    """
+    data = np.frombuffer(value, dtype=value.typecode) if isinstance(value, array.array) else value
+    data = np.ascontiguousarray(data, dtype=data.dtype.newbyteorder('<'))
+    return data.tobytes(), data.dtype.name
+
+
+def _pack_array_into(converter, result: dict, slot: str, value):
+    """数值数组字段输出为 {slot: 字节, slot_encoding: base64, slot_dtype: dtype}
+
+    与其他二进制字段一致，JSON 帧中为 Base64 字符串，二进制帧中为原始字节（slot_encoding 为 binary）
+    """
+    if isinstance(value, (np.ndarray, array.array)):
+        result[slot], result[f"{slot}_dtype"] = pack_array(value)
+        result[f"{slot}_encoding"] = "base64"
+    else:
+        _convert_value_into(converter, result, slot, value, True)
+
+
+def _time_to_dict(converter, value) -> dict:
+    return {'sec': int(value.sec), 'nanosec': int(value.nanosec)}
+
+
+def _header_to_dict(converter, value) -> dict:
+    return {
+        'stamp': {'sec': int(value.stamp.sec), 'nanosec': int(value.stamp.nanosec)},
+        'frame_id': str(value.frame_id)
+    }
+
+
+def _point_to_dict(converter, value) -> dict:
+    return {'x': float(value.x), 'y': float(value.y), 'z': float(value.z)}
+
+
+def _quaternion_to_dict(converter, value) -> dict:
+    return {'x': float(value.x), 'y': float(value.y), 'z': float(value.z), 'w': float(value.w)}
+
+
+def _pose_to_dict(converter, value) -> dict:
+    return {
+        'position': _point_to_dict(converter, value.position),
+        'orientation': _quaternion_to_dict(converter, value.orientation)
+    }
+
+
+def _pose_with_covariance_to_dict(converter, value) -> dict:
+    return {
+        'pose': _pose_to_dict(converter, value.pose),
+        'covariance': [float(c) for c in value.covariance]
+    }
+
+
+def _packed_pose_with_covariance_to_dict(converter, value) -> dict:
+    result = {'pose': _pose_to_dict(converter, value.pose)}
+    _pack_array_into(converter, result, 'covariance', value.covariance)
+    return result
+
+
+# 作为字段出现时使用扁平字段名输出的常用类型
+_FIELD_HANDLERS = {
+    'builtin_interfaces/Time': _time_to_dict,
+    'builtin_interfaces/Duration': _time_to_dict,
+    'std_msgs/Header': _header_to_dict,
+    'geometry_msgs/Point': _point_to_dict,
+    'geometry_msgs/Quaternion': _quaternion_to_dict,
+    'geometry_msgs/Pose': _pose_to_dict,
+    'geometry_msgs/PoseWithCovariance': _pose_with_covariance_to_dict,
+}
+
+
+# 打包数值数组时替换的字段处理函数
+_PACKED_FIELD_HANDLERS = dict(_FIELD_HANDLERS, **{
+    'geometry_msgs/PoseWithCovariance': _packed_pose_with_covariance_to_dict,
+})
+
+
+def _type_name(msg_class: type) -> str:
+    """消息类的 'pkg/Type' 名称"""
+    return f"{msg_class.__module__.split('.')[0]}/{msg_class.__name__}"
+
+
+def _convert_float(converter, value):
+    return float(value)
+
+
+def _convert_int(converter, value):
+    return int(value)
+
+
+def _convert_string(converter, value):
+    return str(value) if value is not None else None
+
+
+def _convert_nested(converter, value, typed_arrays: bool = False) -> dict:
+    return converter_for(type(value), typed_arrays)(converter, value, None)
+
+
+def _convert_message_list(converter, value, typed_arrays: bool = False) -> list:
+    if not value:
+        return []
+    convert = converter_for(type(value[0]), typed_arrays)
+    return [convert(converter, item, None) for item in value]
+
+
+def _convert_value_into(converter, result: dict, slot: str, value, typed_arrays: bool = False):
+    """按值的运行时类型转换单个字段（用于数组等无法在编译时确定表示的字段）"""
+    if typed_arrays and isinstance(value, (np.ndarray, array.array)):
+        _pack_array_into(converter, result, slot, value)
+    # 处理numpy数组
+    elif isinstance(value, np.ndarray):
+        if value.dtype == np.uint8:
+            result[slot] = value.tolist()
+        else:
+            result[slot] = value.astype(float).tolist()
+    # 处理bytes类型和8位整型数组（OccupancyGrid.data 等）
+    elif isinstance(value, bytes) or (isinstance(value, array.array) and value.typecode in ('b', 'B')):
+        # 大型数据保留原始字节，由帧编码决定传输方式（JSON 为 Base64）
+        if len(value) > 1000:
+            result[slot] = value.tobytes() if isinstance(value, array.array) else value
+            result[f"{slot}_encoding"] = "base64"
+            if isinstance(value, array.array):
+                # 有符号数据（OccupancyGrid 的 -1 未知栅格）需要 dtype 才能还原
+                result[f"{slot}_dtype"] = 'int8' if value.typecode == 'b' else 'uint8'
+        else:
+            result[slot] = list(value)  # 小数据直接转换为数组
+    elif isinstance(value, array.array):
+        result[slot] = value.tolist()
+    # 处理嵌套消息
+    elif hasattr(value, '__slots__'):
+        result[slot] = _convert_nested(converter, value, typed_arrays)
+    # 处理列表
+    elif isinstance(value, list):
+        result[slot] = [
+            _convert_nested(converter, item, typed_arrays) if hasattr(item, '__slots__') else
+            float(item) if isinstance(item, (int, float, np.number)) else
+            item
+            for item in value
+        ]
+    # 处理基本数值类型
+    elif isinstance(value, (int, float, np.number)):
+        result[slot] = float(value) if isinstance(value, (float, np.floating)) else int(value)
+    # 处理字符串和其他类型
+    else:
+        result[slot] = str(value) if value is not None else None
+
+
+def _bind_typed(func: Callable, typed_arrays: bool) -> Callable:
+    """打包数值数组时将标志绑定到递归转换函数，默认转换直接使用原函数"""
+    return functools.partial(func, typed_arrays=True) if typed_arrays else func
+
+
+def _field_converter(field_type: str, typed_arrays: bool = False) -> Tuple[Callable, bool]:
+    """按字段类型字符串选择转换函数
+
+    返回 (函数, 是否直接写入结果)：前者为 fn(converter, value) -> 值，
+    后者为 fn(converter, result, slot, value)，用于需要附加 *_encoding 等字段或按运行时类型转换的字段
+    """
+    field_type = field_type.replace('/msg/', '/')
+    handler = (_PACKED_FIELD_HANDLERS if typed_arrays else _FIELD_HANDLERS).get(field_type)
+    if handler is not None:
+        return handler, False
+    if field_type in _FLOAT_TYPES:
+        return _convert_float, False
+    if field_type in _INT_TYPES:
+        return _convert_int, False
+    if field_type.startswith(('string', 'wstring')):
+        return _convert_string, False
+    if field_type.startswith('sequence<') or field_type.endswith(']'):
+        element = field_type[9:-1].split(',')[0] if field_type.startswith('sequence<') \
+            else field_type[:field_type.index('[')]
+        if '/' in element:
+            return _bind_typed(_convert_message_list, typed_arrays), False
+        if typed_arrays and element in _NUMERIC_ARRAY_TYPES:
+            return _pack_array_into, True
+    elif '/' in field_type:
+        return _bind_typed(_convert_nested, typed_arrays), False
+    return _bind_typed(_convert_value_into, typed_arrays), True
+
+
+def _compile_converter(msg_class: type, typed_arrays: bool = False) -> Callable:
+    """为消息类生成转换函数
+
+    字段列表与每个字段的转换函数在编译时确定，转换时只按顺序读取字段，
+    不再逐个值做 isinstance 判断
+    """
+    handler = _MESSAGE_HANDLERS.get(_type_name(msg_class))
+    if handler is not None:
+        return handler
+
+    slots = getattr(msg_class, '__slots__', None)
+    if not slots:
+        return lambda converter, msg, options=None: {"data": str(msg)}
+
+    get_fields = getattr(msg_class, 'get_fields_and_field_types', None)
+    if get_fields is None:
+        # 非 rosidl 生成的类，全部字段按运行时类型转换
+        fields = [(slot,) + _field_converter('', typed_arrays) for slot in slots]
+    else:
+        # 按字段名对应 '_' + name 槽位；__slots__ 中的其他槽位（如 Iron 起的 _check_fields）不是消息字段
+        slot_names = set(slots)
+        fields = [('_' + name,) + _field_converter(field_type, typed_arrays)
+                  for name, field_type in get_fields().items() if '_' + name in slot_names]
+
+    def convert(converter, msg, options=None) -> dict:
+        result = {}
+        for slot, field_converter, writes_into in fields:
+            if writes_into:
+                field_converter(converter, result, slot, getattr(msg, slot))
+            else:
+                result[slot] = field_converter(converter, getattr(msg, slot))
+        return result
+
+    return convert
+
+
+def converter_for(msg_class: type, typed_arrays: bool = False) -> Callable:
+    """获取消息类的转换函数（首次使用时编译并缓存）"""
+    key = (msg_class, typed_arrays)
+    convert = _converters.get(key)
+    if convert is None:
+        convert = _converters[key] = _compile_converter(msg_class, typed_arrays)
+    return convert
@@ -0,0 +1,163 @@
+"""
+消息帧编码缓存
+同一条消息只编码一次，所有接收该消息的客户端共享同一个编码结果
+
+支持的帧编码:
+- json: 文本帧（默认），二进制字段以 Base64 字符串传输
+- cbor / msgpack: 二进制帧，二进制字段直接以原始字节串传输（需要安装对应的可选依赖）
+"""
+
+import base64
+import itertools
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import cbor2
+except ImportError:  # 可选依赖
+    cbor2 = None
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# 未携带 id 的帧分片时使用的序号
+_fragment_ids = itertools.count(1)
+
+# rosbridge 协议中 compression 字段到帧编码的映射
+COMPRESSION_ENCODINGS = {
+    'none': 'json',
+    'json': 'json',
+    'cbor': 'cbor',
+    'msgpack': 'msgpack',
+}
+
+
+def is_encoding_available(encoding: str) -> bool:
+    """检查帧编码所需的依赖是否可用"""
+    if encoding == 'json':
+        return True
+    if encoding == 'cbor':
+        return cbor2 is not None
+    if encoding == 'msgpack':
+        return msgpack is not None
+    return False
+
+
+def resolve_encoding(compression: Optional[str], default: str = 'json') -> str:
+    """将客户端请求的 compression 解析为可用的帧编码，不可用时回退到 JSON"""
+    if not compression:
+        return default
+
+    encoding = COMPRESSION_ENCODINGS.get(str(compression).lower())
+    if encoding is None:
+        logger.warning(f"Unsupported compression '{compression}', falling back to json")
+        return 'json'
+    if not is_encoding_available(encoding):
+        logger.warning(f"Compression '{compression}' requested but its library is not installed, falling back to json")
+        return 'json'
+    return encoding
+
+
+def _json_default(value: Any):
+    """JSON 模式下二进制字段转为 Base64 字符串"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode('ascii')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _binary_payload(value: Any) -> Any:
+    """为二进制编码准备消息：原始字节保持不变，对应的 *_encoding 标记改为 binary"""
+    if isinstance(value, dict):
+        result = {key: _binary_payload(item) for key, item in value.items()}
+        for key, item in value.items():
+            if isinstance(item, (bytes, bytearray, memoryview)):
+                encoding_key = f"{key}_encoding"
+                if encoding_key in result:
+                    result[encoding_key] = 'binary'
+                if not isinstance(item, bytes):
+                    result[key] = bytes(item)
+        return result
+    if isinstance(value, list):
+        # 纯数值列表无需逐个遍历
+        if value and not isinstance(value[0], (dict, list)):
+            return value
+        return [_binary_payload(item) for item in value]
+    return value
+
+
+class EncodedFrame:
+    """已编码的消息帧
+
+    每个 (topic, message) 对应一个帧对象。首次按某种编码发送时编码并缓存，
+    之后无论经由 broadcast 还是 send_to_client，所有客户端都复用同一个
+    不可变的 str/bytes 结果，编码开销与订阅者数量无关。
+    """
+
+    __slots__ = ('message', 'op', 'topic', '_encoded', '_fragments')
+
+    def __init__(self, message: dict):
+        self.message = message
+        self.op: Optional[str] = message.get('op')
+        self.topic: Optional[str] = message.get('topic')
+        self._encoded: Dict[str, Union[str, bytes]] = {}
+        self._fragments: Optional[Dict[Tuple[str, int], List[Union[str, bytes]]]] = None
+
+    def encode(self, encoding: str = 'json') -> Union[str, bytes]:
+        """按指定编码返回帧内容（带缓存），JSON 返回 str，二进制编码返回 bytes"""
+        encoded = self._encoded.get(encoding)
+        if encoded is None:
+            if encoding == 'json':
+                encoded = json.dumps(self.message, default=_json_default)
+            elif encoding == 'cbor' and cbor2 is not None:
+                encoded = cbor2.dumps(_binary_payload(self.message))
+            elif encoding == 'msgpack' and msgpack is not None:
+                encoded = msgpack.packb(_binary_payload(self.message), use_bin_type=True)
+            else:
+                raise ValueError(f"Unsupported frame encoding: {encoding}")
+            self._encoded[encoding] = encoded
+        return encoded
+
+    def fragments(self, encoding: str, fragment_size: int) -> List[Union[str, bytes]]:
+        """按 rosbridge fragment 协议切分编码结果（带缓存）
+
+        每个分片为 {"op": "fragment", "id", "data", "num", "total"}，以同一编码发送；
+        JSON 的 data 为文本片段，二进制编码的 data 为原始字节片段。
+        客户端按 num 顺序拼接 data 后再解码出原始帧
+        """
+        key = (encoding, fragment_size)
+        if self._fragments is None:
+            self._fragments = {}
+        fragments = self._fragments.get(key)
+        if fragments is None:
+            payload = self.encode(encoding)
+            fragment_id = self.message.get('id') or f"{self.topic or self.op}:{next(_fragment_ids)}"
+            total = max(1, -(-len(payload) // fragment_size))
+            fragments = [
+                EncodedFrame({
+                    'op': 'fragment',
+                    'id': fragment_id,
+                    'data': payload[num * fragment_size:(num + 1) * fragment_size],
+                    'num': num,
+                    'total': total,
+                }).encode(encoding)
+                for num in range(total)
+            ]
+            self._fragments[key] = fragments
+        return fragments
+
+    @property
+    def text(self) -> str:
+        """JSON 文本帧"""
+        return self.encode('json')
+
+    @classmethod
+    def wrap(cls, message: Union[dict, 'EncodedFrame']) -> 'EncodedFrame':
+        """将字典消息包装为帧，已是帧则原样返回"""
+        if isinstance(message, EncodedFrame):
+            return message
+        return cls(message)
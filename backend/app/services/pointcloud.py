@@ -0,0 +1,319 @@
+"""
+点云数据处理
+基于 NumPy 的 PointCloud2 原始数据采样与压缩，避免逐点的 Python 循环
+"""
+
+import logging
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # 可选依赖
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+# sensor_msgs/msg/PointField 数据类型到 NumPy 类型的映射
+POINTFIELD_DTYPES = {
+    1: 'i1',  # INT8
+    2: 'u1',  # UINT8
+    3: 'i2',  # INT16
+    4: 'u2',  # UINT16
+    5: 'i4',  # INT32
+    6: 'u4',  # UINT32
+    7: 'f4',  # FLOAT32
+    8: 'f8',  # FLOAT64
+}
+
+FLOAT32_DATATYPE = 7
+# PointField 没有 float16 类型，输出字段通过 dtype 字段标明实际类型
+FLOAT16_DATATYPE = 0
+
+OUTPUT_DTYPES = {
+    'float32': (np.dtype('<f4'), FLOAT32_DATATYPE),
+    'float16': (np.dtype('<f2'), FLOAT16_DATATYPE),
+}
+
+# 降采样时默认保留的字段（3D 视图只用到坐标与强度/颜色）
+DEFAULT_REDUCED_FIELDS = ('x', 'y', 'z', 'intensity', 'rgb', 'rgba')
+# 颜色为打包整数，体素内取代表点而不是求平均
+_PACKED_COLOR_FIELDS = ('rgb', 'rgba')
+
+
+def point_view(data, point_step: int, total_points: int) -> np.ndarray:
+    """将 PointCloud2.data 映射为 (N, point_step) 的 uint8 视图（零拷贝）
+
+    末尾不完整的点会被忽略
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    point_count = min(total_points, len(buffer) // point_step)
+    return buffer[:point_count * point_step].reshape(point_count, point_step)
+
+
+def stride_sample(data, point_step: int, total_points: int, sample_step: int) -> bytes:
+    """按固定步长采样点云，每 sample_step 个点保留一个
+
+    采样本身是 NumPy 视图切片，仅在生成最终 bytes 时拷贝一次
+    """
+    points = point_view(data, point_step, total_points)
+    return points[::max(1, sample_step)].tobytes()
+
+
+def structured_view(data, fields: List[Dict], point_step: int, total_points: int,
+                    is_bigendian: bool = False, names: Optional[List[str]] = None) -> np.ndarray:
+    """按 PointField 描述将点云数据映射为结构化数组视图（零拷贝）
+
+    只映射 count == 1 且类型已知的字段；names 指定时只映射其中列出的字段
+    """
+    byte_order = '>' if is_bigendian else '<'
+    field_map = {field['name']: field for field in fields}
+    selected = names if names is not None else [field['name'] for field in fields]
+
+    dtype_names, dtype_formats, dtype_offsets = [], [], []
+    for name in selected:
+        field = field_map.get(name)
+        if field is None:
+            continue
+        base = POINTFIELD_DTYPES.get(field['datatype'])
+        if base is None or field.get('count', 1) != 1:
+            logger.debug(f"Skipping pointcloud field {name}: unsupported datatype/count")
+            continue
+        dtype_names.append(name)
+        dtype_formats.append(byte_order + base)
+        dtype_offsets.append(field['offset'])
+
+    dtype = np.dtype({
+        'names': dtype_names,
+        'formats': dtype_formats,
+        'offsets': dtype_offsets,
+        'itemsize': point_step,
+    })
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    point_count = min(total_points, len(buffer) // point_step)
+    return np.frombuffer(buffer[:point_count * point_step], dtype=dtype)
+
+
+def voxel_filter(points: np.ndarray, names: List[str], leaf_size: float) -> np.ndarray:
+    """体素网格滤波：每个体素输出一个点
+
+    points 为 (N, K) 数组，前 3 列为 x, y, z。坐标与数值字段取体素内均值，
+    打包颜色字段取体素内第一个点的值
+    """
+    if len(points) == 0 or leaf_size <= 0:
+        return points
+
+    cells = [np.floor((points[:, axis] - points[:, axis].min()) / leaf_size).astype(np.int64) for axis in range(3)]
+    dims = [int(cell.max()) + 1 for cell in cells]
+    keys = (cells[0] * dims[1] + cells[1]) * dims[2] + cells[2]
+
+    cell_count = dims[0] * dims[1] * dims[2]
+    if cell_count <= 4 * len(keys):
+        # 体素网格较稠密时直接计数，避免排序
+        counts_all = np.bincount(keys, minlength=cell_count)
+        occupied = np.flatnonzero(counts_all)
+        remap = np.empty(cell_count, dtype=np.int64)
+        remap[occupied] = np.arange(len(occupied))
+        inverse = remap[keys]
+        counts = counts_all[occupied]
+    else:
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    voxel_count = len(counts)
+
+    result = np.empty((voxel_count, points.shape[1]), dtype=np.float64)
+    first_index = None
+    for column, name in enumerate(names):
+        if name in _PACKED_COLOR_FIELDS:
+            if first_index is None:
+                # 倒序赋值，保留每个体素中最先出现的点
+                first_index = np.empty(voxel_count, dtype=np.int64)
+                first_index[inverse[::-1]] = np.arange(len(inverse) - 1, -1, -1)
+            result[:, column] = points[first_index, column]
+        else:
+            sums = np.bincount(inverse, weights=points[:, column], minlength=voxel_count)
+            result[:, column] = sums / counts
+    return result
+
+
+def _reduced_values(data, fields: List[Dict], point_step: int, total_points: int,
+                    is_bigendian: bool, field_names: Optional[List[str]],
+                    voxel_size: Optional[float], max_points: Optional[int],
+                    keep_packed_colors: bool = True) -> Tuple[np.ndarray, List[str], Dict]:
+    """字段投影 + 体素滤波 + 点数预算，返回 (N, K) float64 数组、字段名和处理信息"""
+    available = {field['name'] for field in fields}
+    names = list(field_names) if field_names else [name for name in DEFAULT_REDUCED_FIELDS if name in available]
+    names = [name for name in names if name in available]
+    if not all(axis in names for axis in ('x', 'y', 'z')):
+        raise ValueError("Pointcloud reduction requires x, y and z fields")
+    # 坐标固定放在前 3 列，便于体素计算
+    names = ['x', 'y', 'z'] + [name for name in names if name not in ('x', 'y', 'z')]
+    if not keep_packed_colors:
+        names = [name for name in names if name not in _PACKED_COLOR_FIELDS]
+
+    view = structured_view(data, fields, point_step, total_points, is_bigendian, names)
+    names = [name for name in names if name in view.dtype.names]
+    info = {'fields': names, 'input_points': int(len(view))}
+
+    # 不做体素滤波时先按预算步长采样，只转换需要输出的点
+    if not (voxel_size and voxel_size > 0) and max_points and len(view) > max_points:
+        sample_step = -(-len(view) // max_points)
+        view = view[::sample_step]
+        info['sample_step'] = sample_step
+
+    # 列优先存储，按字段的计算与归约都在连续内存上进行
+    values = np.empty((len(view), len(names)), dtype=np.float64, order='F')
+    for column, name in enumerate(names):
+        if name in _PACKED_COLOR_FIELDS and view.dtype[name].kind == 'f':
+            # rgb 通常以 float32 位模式打包，按位转换为整数避免丢失颜色
+            values[:, column] = view[name].astype(np.float32).view(np.uint32)
+        else:
+            values[:, column] = view[name]
+
+    # 去除无效点
+    finite = np.isfinite(values[:, 0]) & np.isfinite(values[:, 1]) & np.isfinite(values[:, 2])
+    if not finite.all():
+        values = values[finite]
+
+    if voxel_size and voxel_size > 0:
+        values = voxel_filter(values, names, voxel_size)
+        info['voxel_size'] = voxel_size
+        info['voxel_points'] = int(len(values))
+
+    if max_points and len(values) > max_points:
+        sample_step = -(-len(values) // max_points)
+        values = values[::sample_step]
+        info['sample_step'] = sample_step
+
+    return values, names, info
+
+
+def reduce_pointcloud(data, fields: List[Dict], point_step: int, total_points: int,
+                      is_bigendian: bool = False, field_names: Optional[List[str]] = None,
+                      voxel_size: Optional[float] = None, max_points: Optional[int] = None,
+                      output_dtype: str = 'float32') -> Tuple[bytes, List[Dict], int, Dict]:
+    """点云降维/降采样
+
+    1. 字段投影：只保留 field_names（默认 x, y, z 以及存在时的 intensity/rgb）
+    2. 体素滤波：voxel_size > 0 时每个体素保留一个点
+    3. 点数预算：结果仍超过 max_points 时按步长采样
+    输出为紧凑排列的 float32/float16 点数据
+
+    返回 (数据, 输出字段描述, 点数, 处理信息)，处理信息中包含输出的 point_step
+    """
+    if output_dtype not in OUTPUT_DTYPES:
+        logger.warning(f"Unsupported pointcloud output dtype '{output_dtype}', using float32")
+        output_dtype = 'float32'
+    dtype, datatype = OUTPUT_DTYPES[output_dtype]
+
+    # 打包颜色需要 32 位，float16 输出中不保留
+    values, names, info = _reduced_values(
+        data, fields, point_step, total_points, is_bigendian, field_names,
+        voxel_size, max_points, keep_packed_colors=(output_dtype != 'float16')
+    )
+
+    info['point_step'] = len(names) * dtype.itemsize
+    packed = np.empty((len(values), len(names)), dtype=dtype)
+    out_fields = []
+    for column, name in enumerate(names):
+        if name in _PACKED_COLOR_FIELDS:
+            packed[:, column] = values[:, column].astype(np.uint32).view(np.float32)
+        else:
+            packed[:, column] = values[:, column]
+        out_fields.append({
+            'name': name,
+            'offset': column * dtype.itemsize,
+            'datatype': datatype,
+            'count': 1,
+            'dtype': output_dtype,
+        })
+
+    return packed.tobytes(), out_fields, int(len(values)), info
+
+
+def compress_payload(payload: bytes, compression: Optional[str]) -> Tuple[bytes, str]:
+    """压缩点云负载，返回 (数据, 实际使用的压缩方式)
+
+    zstd / lz4 为可选依赖，未安装时回退到标准库 zlib
+    """
+    if not compression or compression == 'none':
+        return payload, 'none'
+    if compression == 'zstd':
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=1).compress(payload), 'zstd'
+        logger.warning("zstandard is not installed, falling back to zlib")
+    elif compression == 'lz4':
+        if lz4_frame is not None:
+            return lz4_frame.compress(payload), 'lz4'
+        logger.warning("lz4 is not installed, falling back to zlib")
+    elif compression != 'zlib':
+        logger.warning(f"Unsupported pointcloud compression '{compression}', falling back to zlib")
+    return zlib.compress(payload, 1), 'zlib'
+
+
+def quantize_pointcloud(data, fields: List[Dict], point_step: int, total_points: int,
+                        is_bigendian: bool = False, voxel_size: Optional[float] = None,
+                        max_points: Optional[int] = None,
+                        compression: Optional[str] = 'zstd') -> Tuple[bytes, Dict, int, Dict]:
+    """量化 + 差分 + 压缩的紧凑点云格式
+
+    - x/y/z 相对包围盒中心量化为 int16: value = q * scale + offset
+    - intensity（存在时）量化为 uint8: value = q * intensity_scale + intensity_offset
+    - 数据按字段平面排列 (x[N], y[N], z[N], intensity[N])，
+      坐标平面做 uint16 回绕差分，解码时累加并对 65536 取模后按 int16 解释
+    - 最后整体使用 zstd/lz4/zlib 压缩
+
+    返回 (数据, 量化参数头, 点数, 处理信息)
+    """
+    names = ['x', 'y', 'z'] + (['intensity'] if any(field['name'] == 'intensity' for field in fields) else [])
+    values, names, info = _reduced_values(
+        data, fields, point_step, total_points, is_bigendian, names, voxel_size, max_points
+    )
+    point_count = len(values)
+
+    if point_count:
+        lower = np.array([values[:, axis].min() for axis in range(3)])
+        upper = np.array([values[:, axis].max() for axis in range(3)])
+    else:
+        lower = upper = np.zeros(3)
+    offset = (lower + upper) / 2.0
+    scale = np.maximum((upper - lower) / 2.0 / 32767.0, 1e-9)
+
+    planes = []
+    for axis in range(3):
+        quantized = np.rint((values[:, axis] - offset[axis]) / scale[axis]).astype(np.int16)
+        # uint16 回绕差分，相邻点坐标接近时差值集中在 0 附近，利于压缩
+        planes.append(np.diff(quantized.view(np.uint16), prepend=np.uint16(0)).tobytes())
+
+    header = {
+        'format': 'quantized',
+        'layout': 'planar',
+        'fields': names,
+        'xyz_dtype': 'int16',
+        'scale': scale.tolist(),
+        'offset': offset.tolist(),
+        'delta': True,
+    }
+
+    if 'intensity' in names:
+        intensity = values[:, names.index('intensity')]
+        intensity_min = float(intensity.min()) if point_count else 0.0
+        intensity_max = float(intensity.max()) if point_count else 0.0
+        intensity_scale = max((intensity_max - intensity_min) / 255.0, 1e-9)
+        planes.append(np.rint((intensity - intensity_min) / intensity_scale).astype(np.uint8).tobytes())
+        header.update({
+            'intensity_dtype': 'uint8',
+            'intensity_scale': intensity_scale,
+            'intensity_offset': intensity_min,
+        })
+
+    payload, used_compression = compress_payload(b''.join(planes), compression)
+    header['compression'] = used_compression
+    info['encoded_bytes'] = len(payload)
+    return payload, header, point_count, info
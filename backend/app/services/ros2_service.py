@@ -1,7 +1,6 @@
 """
 ROS2 核心服务
 """
-import rclpy
 from rclpy.node import Node
 from rclpy.qos import QoSProfile, ReliabilityPolicy, DurabilityPolicy
 import json
@@ -17,14 +16,20 @@ from geometry_msgs.msg import Pose, Twist, Transform
 from visualization_msgs.msg import Marker, MarkerArray
 from std_msgs.msg import String
 
+from .ros_context import RosContext
+
 logger = logging.getLogger(__name__)
 
 
-class ROS2Service(Node):
-    """ROS2 核心服务类"""
+class ROS2Service:
+    """ROS2 核心服务类
+
+    使用共享 RosContext 的节点与执行器，不再单独创建节点和 spin 线程
+    """
     
-    def __init__(self):
-        super().__init__('ros_web_viz_node')
+    def __init__(self, ros_context: RosContext):
+        self.ros_context = ros_context
+        self.node: Optional[Node] = None
         self.subscribers: Dict[str, Any] = {}
         self.publishers: Dict[str, Any] = {}
         self.message_callbacks: Dict[str, List[Callable]] = {}
@@ -43,44 +48,30 @@ class ROS2Service(Node):
     
     def start(self):
         """启动 ROS2 服务"""
-        if not rclpy.ok():
-            rclpy.init()
-        
+        self.node = self.ros_context.start()
         self.is_running = True
-        self.spin_thread = threading.Thread(target=self._spin_node)
-        self.spin_thread.daemon = True
-        self.spin_thread.start()
         
         logger.info("ROS2Service started")
     
     def stop(self):
         """停止 ROS2 服务"""
         self.is_running = False
-        if hasattr(self, 'spin_thread'):
-            self.spin_thread.join(timeout=1.0)
         
-        # 清理订阅者和发布者
+        # 清理订阅者和发布者（节点由共享上下文负责销毁）
         with self._lock:
             for sub in self.subscribers.values():
                 if sub:
-                    self.destroy_subscription(sub)
+                    self.node.destroy_subscription(sub)
             for pub in self.publishers.values():
                 if pub:
-                    self.destroy_publisher(pub)
+                    self.node.destroy_publisher(pub)
             
             self.subscribers.clear()
             self.publishers.clear()
         
         logger.info("ROS2Service stopped")
     
-    def _spin_node(self):
-        """在单独线程中运行节点"""
-        while self.is_running and rclpy.ok():
-            try:
-                rclpy.spin_once(self, timeout_sec=0.1)
-            except Exception as e:
-                logger.error(f"Error in spin_node: {e}")
-                break    
+
     def subscribe_topic(self, topic_name: str, message_type: str, callback: Callable = None) -> bool:
         """订阅 ROS2 主题"""
         try:
@@ -120,7 +111,7 @@ class ROS2Service(Node):
                         logger.error(f"Error processing message for {topic_name}: {e}")
                 
                 # 创建订阅者
-                subscriber = self.create_subscription(
+                subscriber = self.node.create_subscription(
                     msg_class,
                     topic_name,
                     topic_callback,
@@ -140,7 +131,7 @@ class ROS2Service(Node):
         try:
             with self._lock:
                 if topic_name in self.subscribers:
-                    self.destroy_subscription(self.subscribers[topic_name])
+                    self.node.destroy_subscription(self.subscribers[topic_name])
                     del self.subscribers[topic_name]
                     
                     # 清理相关数据
@@ -168,7 +159,7 @@ class ROS2Service(Node):
     def get_topic_list(self) -> List[str]:
         """获取可用主题列表"""
         try:
-            topic_names_and_types = self.get_topic_names_and_types()
+            topic_names_and_types = self.node.get_topic_names_and_types()
             return [name for name, _ in topic_names_and_types]
         except Exception as e:
             logger.error(f"Failed to get topic list: {e}")
@@ -177,7 +168,7 @@ class ROS2Service(Node):
     def get_node_list(self) -> List[str]:
         """获取节点列表"""
         try:
-            return self.get_node_names()
+            return self.node.get_node_names()
         except Exception as e:
             logger.error(f"Failed to get node list: {e}")
             return []
@@ -231,9 +222,9 @@ class ROS2Service(Node):
 _ros2_service: Optional[ROS2Service] = None
 
 
-def get_ros2_service() -> ROS2Service:
+def get_ros2_service(ros_context: RosContext) -> ROS2Service:
     """获取 ROS2 服务实例（单例模式）"""
     global _ros2_service
     if _ros2_service is None:
-        _ros2_service = ROS2Service()
+        _ros2_service = ROS2Service(ros_context)
     return _ros2_service
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+共享 ROS2 上下文
+整个进程只创建一个 rclpy 节点与一个 MultiThreadedExecutor，由所有服务共享，
+避免每个服务各自创建节点带来的 DDS 发现流量、内存占用与额外的图参与者
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import rclpy
+from rclpy.executors import MultiThreadedExecutor
+from rclpy.node import Node
+
+from ..core.config import Settings
+from .graph_snapshot import GraphCache
+
+logger = logging.getLogger(__name__)
+
+
+class RosContext:
+    """共享的 rclpy 节点、执行器线程与 ROS 图缓存
+
+    start() 可重复调用，只有第一次会初始化；各服务只使用节点，不负责关闭它
+    """
+
+    def __init__(self, settings: Settings, node_name: str = 'ros_web_viz_bridge'):
+        self.settings = settings
+        self.node_name = node_name
+        self.node: Optional[Node] = None
+        self.executor: Optional[MultiThreadedExecutor] = None
+        self.executor_thread: Optional[threading.Thread] = None
+        self.graph_cache: Optional[GraphCache] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self.node is not None
+
+    def start(self) -> Node:
+        """初始化 rclpy、创建共享节点并在独立线程中启动执行器"""
+        with self._lock:
+            if self.node is not None:
+                return self.node
+
+            if not rclpy.ok():
+                rclpy.init()
+
+            self.node = Node(self.node_name)
+            self.graph_cache = GraphCache(self.node, self.settings.graph_service_refresh_interval)
+
+            # 🔥 在独立线程中启动ROS2执行器，回调通过 call_soon_threadsafe 交给事件循环
+            self.executor = MultiThreadedExecutor(num_threads=self.settings.ros_executor_threads)
+            self.executor.add_node(self.node)
+            self.executor_thread = threading.Thread(target=self._spin, name='ros-executor', daemon=True)
+            self.executor_thread.start()
+
+            logger.info(f"ROS2 node '{self.node_name}' initialized")
+            return self.node
+
+    def _spin(self):
+        """ROS2执行器线程 - 阻塞等待并分发ROS回调，空闲时不占用CPU"""
+        logger.info(f"🔥 Starting ROS2 executor thread ({self.settings.ros_executor_threads} threads)")
+
+        try:
+            self.executor.spin()
+        except Exception as e:
+            if rclpy.ok():
+                logger.error(f"Fatal error in ROS2 executor thread: {e}", exc_info=True)
+        finally:
+            logger.info("ROS2 executor thread stopped")
+
+    def stop(self):
+        """停止执行器并销毁共享节点"""
+        with self._lock:
+            if self.executor:
+                self.executor.shutdown(timeout_sec=1.0)
+            if self.executor_thread:
+                self.executor_thread.join(timeout=1.0)
+            if self.node:
+                self.node.destroy_node()
+            if rclpy.ok():
+                rclpy.shutdown()
+            self.node = None
+            self.executor = None
+            self.executor_thread = None
+            logger.info("ROS2 context stopped")
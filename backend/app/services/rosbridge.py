@@ -6,33 +6,157 @@ Rosbridge 服务
 import asyncio
 import json
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple, Union
 from collections import defaultdict, deque
 import time
 from datetime import datetime
 
 from fastapi import WebSocket, WebSocketDisconnect
-import rclpy
+from pydantic import ValidationError
 from rclpy.node import Node
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
 from rclpy.qos import QoSProfile, QoSReliabilityPolicy, QoSDurabilityPolicy, QoSHistoryPolicy
 from std_msgs.msg import String
 
 from ..core.config import Settings
-from ..models.ros import TopicInfo, NodeInfo, SystemStatus, ConnectionInfo
+from ..models.ros import (
+    TopicInfo, NodeInfo, SystemStatus, ConnectionInfo, SubscriptionOptions, TopicStatistics, RosSubscriptionInfo
+)
 from ..models.viz import VisualizationState, PluginInfo, CameraSettings, RenderSettings
+from .message_frame import EncodedFrame, resolve_encoding
+from .ingest_queue import IngestQueue
+from .message_converter import MessageConverter
+from .conversion_pool import ConversionPool, convert_message
+from .loop_monitor import EventLoopLagMonitor
+from .graph_snapshot import GraphCache, GraphSnapshot, delta_message, snapshot_message
+from .ros_context import RosContext
+from .topic_stats import TopicStatsEngine
+from .topic_monitor import TopicMonitor, import_message_class
 
 logger = logging.getLogger(__name__)
 
+class ClientSendQueue:
+    """客户端有界发送队列
+
+    溢出策略:
+    - drop_oldest: 队列满时丢弃最早的待发送帧
+    - latest_per_topic: 同一主题只保留最新一帧（新帧原位替换未发送的旧帧），
+      队列仍满时再丢弃最早的帧
+
+    订阅指定了 queue_length 时，该主题最多保留 queue_length 帧待发送，
+    超出时丢弃该主题最早的帧（对应 rosbridge subscribe 的 queue_length）
+    """
+
+    POLICIES = ('drop_oldest', 'latest_per_topic')
+
+    def __init__(self, maxsize: int = 100, policy: str = 'drop_oldest'):
+        if policy not in self.POLICIES:
+            logger.warning(f"Unknown send queue policy '{policy}', using drop_oldest")
+            policy = 'drop_oldest'
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.dropped = 0
+        # 元素为 [topic, frame, encoding]，frame 为 None 表示已被丢弃（出队时跳过）
+        self._items: deque = deque()
+        self._size = 0
+        # 主题 -> 该主题按入队顺序排列的待发送元素
+        self._pending_topics: Dict[str, deque] = {}
+        self._not_empty = asyncio.Event()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def put(self, frame: EncodedFrame, encoding: str, queue_length: int = 0):
+        """放入待发送帧（非阻塞，溢出时按策略丢弃）"""
+        topic = frame.topic if frame.op == 'publish' else None
+        track = topic is not None and (queue_length > 0 or self.policy == 'latest_per_topic')
+
+        if track:
+            pending = self._pending_topics.get(topic)
+            if pending and not queue_length:
+                entry = pending[-1]
+                entry[1] = frame
+                entry[2] = encoding
+                self.dropped += 1
+                return
+            while pending and len(pending) >= queue_length:
+                self._drop(pending.popleft())
+
+        if self._size >= self.maxsize:
+            while self._items:
+                oldest = self._items.popleft()
+                if oldest[1] is not None:
+                    self._forget(oldest)
+                    self._drop(oldest)
+                    break
+
+        entry = [topic, frame, encoding]
+        self._items.append(entry)
+        self._size += 1
+        if track:
+            self._pending_topics.setdefault(topic, deque()).append(entry)
+        self._not_empty.set()
+
+    async def get(self):
+        """取出下一帧，队列为空时等待"""
+        while True:
+            while not self._items:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            entry = self._items.popleft()
+            if entry[1] is not None:
+                break
+        self._size -= 1
+        self._forget(entry)
+        return entry[1], entry[2]
+
+    def _drop(self, entry: list):
+        """标记元素已丢弃，实际出队在 get/溢出处理时跳过
+
+        已丢弃元素超过 maxsize 时压缩 _items，写任务停滞时队列占用仍然有界
+        """
+        entry[1] = None
+        self._size -= 1
+        self.dropped += 1
+        if len(self._items) - self._size > self.maxsize:
+            self._items = deque(item for item in self._items if item[1] is not None)
+
+    def _forget(self, entry: list):
+        # 出队的总是该主题最早的待发送元素
+        topic = entry[0]
+        pending = self._pending_topics.get(topic) if topic is not None else None
+        if pending and pending[0] is entry:
+            pending.popleft()
+            if not pending:
+                del self._pending_topics[topic]
+
+
 class ConnectionManager:
-    """WebSocket 连接管理器"""
+    """WebSocket 连接管理器
+
+    每个连接拥有独立的有界发送队列和写任务，慢客户端只会积压/丢弃自己的帧，
+    不会阻塞消息处理循环和其他客户端
+    """
     
-    def __init__(self, max_connections: int = 100):
+    def __init__(self, max_connections: int = 100, send_queue_size: int = 100,
+                 send_queue_policy: str = 'drop_oldest'):
         self.max_connections = max_connections
+        self.send_queue_size = send_queue_size
+        self.send_queue_policy = send_queue_policy
         self.active_connections: Dict[str, WebSocket] = {}
         self.connection_info: Dict[str, ConnectionInfo] = {}
+        self.send_queues: Dict[str, ClientSendQueue] = {}
+        self.writer_tasks: Dict[str, asyncio.Task] = {}
+        # 主题 -> 订阅客户端的反向索引，消息分发只访问实际订阅者
+        self.topic_subscribers: Dict[str, Set[str]] = {}
+        # (客户端, 主题) -> 上次放行消息的时间，用于按订阅的 throttle_rate 限速
+        self._last_published: Dict[Tuple[str, str], float] = {}
         
-    async def connect(self, websocket: WebSocket, client_id: str) -> bool:
-        """连接客户端"""
+    async def connect(self, websocket: WebSocket, client_id: str, encoding: str = 'json') -> bool:
+        """连接客户端
+
+        encoding 为连接建立时协商的默认帧编码，未协商时使用 JSON 文本帧
+        """
         if len(self.active_connections) >= self.max_connections:
             await websocket.close(code=1008, reason="Max connections reached")
             return False
@@ -42,91 +166,228 @@ class ConnectionManager:
         self.connection_info[client_id] = ConnectionInfo(
             client_id=client_id,
             connected_at=datetime.now(),
-            subscribed_topics=[],
-            message_count=0
+            subscribed_topics=set(),
+            message_count=0,
+            encoding=encoding
         )
-        logger.info(f"Client {client_id} connected")
+        queue = ClientSendQueue(self.send_queue_size, self.send_queue_policy)
+        self.send_queues[client_id] = queue
+        self.writer_tasks[client_id] = asyncio.create_task(self._client_writer(client_id, websocket, queue))
+        logger.info(f"Client {client_id} connected (encoding: {encoding})")
         return True
         
     def disconnect(self, client_id: str):
         """断开客户端"""
         if client_id in self.active_connections:
             del self.active_connections[client_id]
-        if client_id in self.connection_info:
-            del self.connection_info[client_id]
+        info = self.connection_info.pop(client_id, None)
+        if info:
+            for topic in info.subscribed_topics:
+                self._discard_subscriber(topic, client_id)
+                self._last_published.pop((client_id, topic), None)
+        self.send_queues.pop(client_id, None)
+        writer_task = self.writer_tasks.pop(client_id, None)
+        if writer_task and writer_task is not asyncio.current_task():
+            writer_task.cancel()
         logger.info(f"Client {client_id} disconnected")
+
+    async def _client_writer(self, client_id: str, websocket: WebSocket, queue: ClientSendQueue):
+        """客户端写任务 - 按顺序发送该客户端队列中的帧"""
+        try:
+            while True:
+                frame, encoding = await queue.get()
+                client_info = self.connection_info.get(client_id)
+                if client_info:
+                    client_info.queue_depth = len(queue)
+                fragment_size = None
+                if client_info and frame.op == 'publish' and frame.topic:
+                    options = client_info.subscription_options.get(frame.topic)
+                    fragment_size = options.fragment_size if options else None
+                await self._send_frame(websocket, frame, encoding, fragment_size)
+                if client_info:
+                    client_info.message_count += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to send message to {client_id}: {e}")
+            self.disconnect(client_id)
+
+    def add_subscription(self, client_id: str, topic: str) -> bool:
+        """记录客户端订阅主题，返回是否为新订阅"""
+        info = self.connection_info.get(client_id)
+        if info is None or topic in info.subscribed_topics:
+            return False
+        info.subscribed_topics.add(topic)
+        self.topic_subscribers.setdefault(topic, set()).add(client_id)
+        return True
+
+    def remove_subscription(self, client_id: str, topic: str) -> bool:
+        """移除客户端的主题订阅，返回是否存在该订阅"""
+        info = self.connection_info.get(client_id)
+        if info is None or topic not in info.subscribed_topics:
+            return False
+        info.subscribed_topics.discard(topic)
+        info.subscription_options.pop(topic, None)
+        self._discard_subscriber(topic, client_id)
+        self._last_published.pop((client_id, topic), None)
+        return True
+
+    def _discard_subscriber(self, topic: str, client_id: str):
+        clients = self.topic_subscribers.get(topic)
+        if clients is not None:
+            clients.discard(client_id)
+            if not clients:
+                del self.topic_subscribers[topic]
+
+    def subscribers(self, topic: str) -> Set[str]:
+        """订阅了主题的客户端（只读）"""
+        return self.topic_subscribers.get(topic, set())
+
+    def allow_publish(self, client_id: str, topic: str, throttle_rate: int, now: float) -> bool:
+        """按 throttle_rate（毫秒）判断是否放行该客户端的下一条主题消息
+
+        距上次放行不足 throttle_rate 的消息直接丢弃，同一 ROS 订阅的不同客户端可以获得不同的频率
+        """
+        if throttle_rate <= 0:
+            return True
+        key = (client_id, topic)
+        last = self._last_published.get(key)
+        if last is not None and now - last < throttle_rate / 1000.0:
+            return False
+        self._last_published[key] = now
+        return True
+
+    def _enqueue(self, client_id: str, frame: EncodedFrame, encoding: str) -> bool:
+        """将帧放入客户端发送队列，并更新队列深度与丢弃计数"""
+        queue = self.send_queues.get(client_id)
+        if queue is None:
+            return False
+        client_info = self.connection_info.get(client_id)
+        queue_length = 0
+        if client_info and frame.op == 'publish' and frame.topic:
+            options = client_info.subscription_options.get(frame.topic)
+            queue_length = options.queue_length if options else 0
+        queue.put(frame, encoding, queue_length)
+        if client_info:
+            client_info.queue_depth = len(queue)
+            client_info.dropped_messages = queue.dropped
+        return True
         
-    async def send_to_client(self, client_id: str, message: dict):
-        """发送消息给指定客户端"""
+    @staticmethod
+    async def _send_frame(websocket: WebSocket, frame: EncodedFrame, encoding: str,
+                          fragment_size: Optional[int] = None):
+        """按编码发送帧：JSON 走文本帧，二进制编码走 send_bytes
+
+        编码结果超过 fragment_size 时按 rosbridge fragment 协议分片依次发送
+        """
+        payload = frame.encode(encoding)
+        if fragment_size and len(payload) > fragment_size:
+            payloads = frame.fragments(encoding, fragment_size)
+        else:
+            payloads = (payload,)
+        for payload in payloads:
+            if isinstance(payload, bytes):
+                await websocket.send_bytes(payload)
+            else:
+                await websocket.send_text(payload)
+
+    @staticmethod
+    def _topic_encoding(client_info: ConnectionInfo, topic: str) -> str:
+        """获取客户端某个订阅主题使用的帧编码"""
+        options = client_info.subscription_options.get(topic)
+        return options.encoding if options else client_info.encoding
+
+    async def send_to_client(self, client_id: str, message: Union[dict, EncodedFrame]):
+        """发送消息给指定客户端（放入该客户端的发送队列）"""
         if client_id in self.active_connections:
-            try:
-                await self.active_connections[client_id].send_text(json.dumps(message))
-                self.connection_info[client_id].message_count += 1
-            except Exception as e:
-                logger.error(f"Failed to send message to {client_id}: {e}")
-                self.disconnect(client_id)
+            frame = EncodedFrame.wrap(message)
+            client_info = self.connection_info[client_id]
+            if frame.op == 'publish' and frame.topic:
+                encoding = self._topic_encoding(client_info, frame.topic)
+            else:
+                encoding = client_info.encoding
+            self._enqueue(client_id, frame, encoding)
                 
-    async def broadcast(self, message: dict):
-        """广播消息给所有客户端"""
+    async def broadcast(self, message: Union[dict, EncodedFrame], client_ids: Optional[List[str]] = None):
+        """广播消息给所有客户端
+
+        消息只在第一次发送时编码一次，所有客户端共享同一个编码帧；
+        这里只负责入队，实际发送由各客户端的写任务完成。
+        client_ids 不为空时只发送给其中列出的客户端
+        """
         if not self.active_connections:
             logger.debug("📭 No active connections for broadcast")
             return False
             
-        message_text = json.dumps(message)
-        disconnected_clients = []
+        frame = EncodedFrame.wrap(message)
         sent_count = 0
         
         # 如果是主题消息，只发送给订阅了该主题的客户端
-        if message.get('op') == 'publish' and 'topic' in message:
-            topic = message['topic']
-            for client_id, websocket in self.active_connections.items():
-                if client_id in self.connection_info:
-                    client_info = self.connection_info[client_id]
-                    if topic in client_info.subscribed_topics:
-                        try:
-                            await websocket.send_text(message_text)
-                            client_info.message_count += 1
-                            sent_count += 1
-                            logger.debug(f"📤 Sent message to {client_id} for topic {topic}")
-                        except Exception as e:
-                            logger.error(f"Failed to send to {client_id}: {e}")
-                            disconnected_clients.append(client_id)
+        if frame.op == 'publish' and frame.topic:
+            topic = frame.topic
+            for client_id in (client_ids if client_ids is not None else list(self.subscribers(topic))):
+                client_info = self.connection_info.get(client_id)
+                if client_info and topic in client_info.subscribed_topics:
+                    if self._enqueue(client_id, frame, self._topic_encoding(client_info, topic)):
+                        sent_count += 1
+                        logger.debug(f"📤 Queued message to {client_id} for topic {topic}")
         else:
-            # 非主题消息广播给所有客户端
-            for client_id, websocket in self.active_connections.items():
-                try:
-                    await websocket.send_text(message_text)
-                    self.connection_info[client_id].message_count += 1
+            # 非主题消息广播给所有客户端（或指定的客户端）
+            for client_id in (client_ids if client_ids is not None else self.active_connections):
+                client_info = self.connection_info.get(client_id)
+                if client_info and self._enqueue(client_id, frame, client_info.encoding):
                     sent_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to broadcast to {client_id}: {e}")
-                    disconnected_clients.append(client_id)
-                
-        # 清理断开的连接
-        for client_id in disconnected_clients:
-            self.disconnect(client_id)
             
-        logger.debug(f"📊 Broadcast sent to {sent_count} clients, {len(disconnected_clients)} disconnected")
+        logger.debug(f"📊 Broadcast queued for {sent_count} clients")
         return sent_count > 0
 
 class RosbridgeService:
     """Rosbridge 核心服务"""
     
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, ros_context: Optional[RosContext] = None):
         self.settings = settings
-        self.connection_manager = ConnectionManager(settings.max_connections)
+        # 共享的 ROS2 节点与执行器（未注入时单独创建）
+        self.ros_context = ros_context or RosContext(settings)
+        self.connection_manager = ConnectionManager(
+            settings.max_connections,
+            settings.client_send_queue_size,
+            settings.client_send_queue_policy
+        )
         self.node: Optional[Node] = None
         self.subscribers = {}
         self.publishers = {}
+        # 订阅的消息类型、创建时间，以及无客户端引用后等待销毁的定时器
+        self._subscription_types: Dict[str, str] = {}
+        self._subscription_created: Dict[str, datetime] = {}
+        self._linger_handles: Dict[str, asyncio.TimerHandle] = {}
         self.message_cache = deque(maxlen=settings.message_buffer_size)
         self.start_time = time.time()
         self.topic_info_cache = {}
         self.node_info_cache = {}
 
+        # 增量 ROS 图缓存（与其他服务共享），由后台任务在图变化时更新
+        self.graph_cache: Optional[GraphCache] = None
+        self._graph_refresh_task: Optional[asyncio.Future] = None
+        # subscribe_graph 客户端与最近的图增量（用于客户端按版本号补发）
+        self.graph_subscribers = set()
+        self._graph_deltas = deque(maxlen=100)
+
         # 异步消息处理队列
         self.message_queue = None
         self.message_processor_task = None
         self._loop = None
+
+        # ROS2 执行器在共享上下文的独立线程中运行，回调通过 call_soon_threadsafe 交给事件循环
+        self._first_message_logged = set()
+
+        # CPU 密集的消息转换在工作池中执行，事件循环只负责收发
+        self.conversion_pool = ConversionPool(settings.conversion_executor, settings.conversion_workers)
+        self.loop_monitor = EventLoopLagMonitor()
+        # 主题实测统计（频率、带宽、抖动、延迟），在消息进入接收队列前记录
+        self.topic_stats = TopicStatsEngine(settings.topic_stats_window,
+                                            size_sample_interval=settings.topic_stats_size_sample_interval)
+        # 只统计频率/带宽的原始监控订阅（不反序列化）
+        self.topic_monitor: Optional[TopicMonitor] = None
         
         # 可视化状态
         self._cache_warning_counts = {}  # 缓存警告计数
@@ -137,6 +398,7 @@ class RosbridgeService:
             ),
             render_settings=RenderSettings()
         )
+        self.converter = MessageConverter(self.visualization_state.render_settings.max_points)
         
     async def start(self):
         """启动服务"""
@@ -144,25 +406,31 @@ class RosbridgeService:
             # 获取当前事件循环
             self._loop = asyncio.get_event_loop()
 
-            # 初始化异步消息队列
-            self.message_queue = asyncio.Queue(maxsize=1000)
+            # 初始化异步消息队列（按主题配置 fifo / latest_only / ring(N) 缓存模式）
+            self.message_queue = IngestQueue(
+                maxsize=self.settings.ingest_queue_size,
+                default_mode=self.settings.ingest_default_mode,
+                topic_modes=self.settings.ingest_topic_modes
+            )
 
-            # 初始化 ROS2
-            if not rclpy.ok():
-                rclpy.init()
+            # 获取共享的 ROS2 节点（首次调用时初始化 rclpy 并启动执行器线程）
+            self.node = self.ros_context.start()
+            self.graph_cache = self.ros_context.graph_cache
+            # 任意服务刷新共享图缓存时都推送增量
+            self.graph_cache.add_listener(self._on_graph_changed)
+            # 已有完整订阅的主题由消息接收路径统计，监控订阅不重复记录
+            self.topic_monitor = TopicMonitor(self.node, self.topic_stats,
+                                              skip=lambda topic: topic in self.subscribers)
 
-            self.node = Node('ros_web_viz_bridge')
-            logger.info("ROS2 node initialized")
+            # 启动转换工作池与事件循环延迟监控
+            self.conversion_pool.start()
+            self.loop_monitor.start()
 
             # 启动消息处理任务
             self.message_processor_task = asyncio.create_task(self._message_processor_loop())
 
-            # 🔥 启动ROS2事件循环 - 这是关键！
-            self.ros_spin_task = asyncio.create_task(self._ros_spin_loop())
-
             # 启动后台任务
-            asyncio.create_task(self._update_topic_info())
-            asyncio.create_task(self._update_node_info())
+            asyncio.create_task(self._update_graph_cache())
 
         except Exception as e:
             logger.error(f"Failed to start Rosbridge service: {e}")
@@ -179,18 +447,24 @@ class RosbridgeService:
                 except asyncio.CancelledError:
                     pass
 
-            # 停止ROS spin任务
-            if hasattr(self, 'ros_spin_task') and self.ros_spin_task and not self.ros_spin_task.done():
-                self.ros_spin_task.cancel()
-                try:
-                    await self.ros_spin_task
-                except asyncio.CancelledError:
-                    pass
+            await self.conversion_pool.stop()
+            await self.loop_monitor.stop()
 
+            # 节点由共享上下文负责销毁，这里只释放本服务创建的订阅与发布者
+            for handle in self._linger_handles.values():
+                handle.cancel()
+            self._linger_handles.clear()
+            if self.topic_monitor:
+                self.topic_monitor.stop()
             if self.node:
-                self.node.destroy_node()
-            if rclpy.ok():
-                rclpy.shutdown()
+                for subscriber in self.subscribers.values():
+                    self.node.destroy_subscription(subscriber)
+                for record in self.publishers.values():
+                    self.node.destroy_publisher(record['publisher'])
+                self.subscribers.clear()
+                self.publishers.clear()
+            if self.graph_cache:
+                self.graph_cache.remove_listener(self._on_graph_changed)
             logger.info("Rosbridge service stopped")
         except Exception as e:
             logger.error(f"Error stopping Rosbridge service: {e}")
@@ -198,8 +472,11 @@ class RosbridgeService:
     async def handle_websocket(self, websocket: WebSocket):
         """处理 WebSocket 连接"""
         client_id = f"client_{int(time.time() * 1000)}"
+
+        # 连接时可通过 ?compression=cbor 协商默认的二进制帧编码
+        encoding = resolve_encoding(websocket.query_params.get('compression'))
         
-        if not await self.connection_manager.connect(websocket, client_id):
+        if not await self.connection_manager.connect(websocket, client_id, encoding):
             return
             
         try:
@@ -212,7 +489,14 @@ class RosbridgeService:
         except Exception as e:
             logger.error(f"WebSocket error for {client_id}: {e}")
         finally:
+            self.graph_subscribers.discard(client_id)
+            if self.topic_monitor:
+                self.topic_monitor.release_client(client_id)
+            info = self.connection_manager.connection_info.get(client_id)
+            topics = list(info.subscribed_topics) if info else []
             self.connection_manager.disconnect(client_id)
+            for topic in topics:
+                self._release_subscription(topic)
             
     async def _handle_message(self, client_id: str, message: dict):
         """处理收到的消息"""
@@ -244,6 +528,12 @@ class RosbridgeService:
                 await self._handle_get_service_types(client_id, request_id)
             elif op == 'get_params':
                 await self._handle_get_params(client_id, request_id)
+            elif op == 'get_subscriptions':
+                await self._handle_get_subscriptions(client_id, message)
+            elif op == 'subscribe_graph':
+                await self._handle_subscribe_graph(client_id, message)
+            elif op == 'unsubscribe_graph':
+                self.graph_subscribers.discard(client_id)
             else:
                 logger.warning(f"Unknown operation: {op}")
                 # 发送错误响应
@@ -267,29 +557,71 @@ class RosbridgeService:
             
     async def _handle_subscribe(self, client_id: str, message: dict):
         """处理订阅请求"""
+        if message.get('mode') == 'monitor':
+            await self._handle_monitor(client_id, message)
+            return
+
         topic = message.get('topic')
         msg_type = message.get('type')
+        compression = message.get('compression')
 
-        logger.info(f"🔔 Received subscription request from {client_id}: topic={topic}, type={msg_type}")
+        logger.info(f"🔔 Received subscription request from {client_id}: topic={topic}, type={msg_type}, compression={compression}")
 
         if not topic or not msg_type:
             logger.error(f"❌ Invalid subscription request from {client_id}: missing topic or type")
             return
 
-        # 添加到客户端订阅列表
         info = self.connection_manager.connection_info.get(client_id)
-        if info:
-            if topic not in info.subscribed_topics:
-                info.subscribed_topics.append(topic)
-                logger.info(f"✅ Added {topic} to client {client_id} subscription list")
-                logger.info(f"🔍 Updated subscription list for {client_id}: {info.subscribed_topics}")
-            else:
-                logger.info(f"📝 Client {client_id} already subscribed to {topic}")
-        else:
+        if not info:
             logger.error(f"❌ Client {client_id} connection info not found")
             logger.error(f"🔍 Available connections: {list(self.connection_manager.connection_info.keys())}")
             return
 
+        # 先校验订阅选项，非法选项不修改客户端的订阅状态。
+        # compression 决定该主题的帧编码（默认沿用连接编码），其余选项控制点云/图像与数值数组的转换，
+        # 以及 rosbridge 的限速、排队长度与分片
+        try:
+            options = SubscriptionOptions(
+                compression=compression or 'none',
+                encoding=resolve_encoding(compression, default=info.encoding),
+                voxel_size=message.get('voxel_size'),
+                fields=message.get('fields'),
+                point_dtype=message.get('point_dtype') or 'float32',
+                max_points=message.get('max_points'),
+                quantize=bool(message.get('quantize', False)),
+                point_compression=message.get('point_compression'),
+                image_format=message.get('image_format') or 'raw',
+                image_quality=message.get('image_quality') or 80,
+                image_max_width=message.get('image_max_width'),
+                image_max_height=message.get('image_max_height'),
+                typed_arrays=bool(message.get('typed_arrays', False)),
+                throttle_rate=message.get('throttle_rate') or 0,
+                queue_length=message.get('queue_length') or 0,
+                fragment_size=message.get('fragment_size')
+            )
+        except ValidationError as e:
+            logger.error(f"❌ Invalid subscription options from {client_id} for {topic}: {e}")
+            response = {
+                'op': 'status',
+                'level': 'error',
+                'msg': f"Invalid subscription options for {topic}: {e}"
+            }
+            if message.get('id'):
+                response['id'] = message['id']
+            await self.connection_manager.send_to_client(client_id, response)
+            return
+
+        # 添加到客户端订阅列表
+        if self.connection_manager.add_subscription(client_id, topic):
+            logger.info(f"✅ Added {topic} to client {client_id} subscription list")
+            logger.info(f"🔍 Updated subscription list for {client_id}: {info.subscribed_topics}")
+        else:
+            logger.info(f"📝 Client {client_id} already subscribed to {topic}")
+        info.subscription_options[topic] = options
+
+        # 有客户端重新引用时取消待执行的销毁
+        self._cancel_linger(topic)
+
         # 创建 ROS2 订阅者（如果不存在）
         if topic not in self.subscribers:
             logger.info(f"🔄 Creating new ROS2 subscriber for {topic}")
@@ -305,6 +637,43 @@ class RosbridgeService:
         for cid, cinfo in self.connection_manager.connection_info.items():
             logger.info(f"   - {cid}: {cinfo.subscribed_topics}")
             
+    async def _handle_monitor(self, client_id: str, message: dict):
+        """处理监控订阅：{"op": "subscribe", "mode": "monitor", "topic": ... 或 "topics": [...]}
+
+        只统计频率与带宽，不推送消息；未指定 type 时从 ROS 图中查询
+        """
+        topics = message.get('topics') or ([message['topic']] if message.get('topic') else [])
+        if not topics or not self.topic_monitor:
+            return
+
+        snapshot = await self._get_graph_snapshot()
+        monitored, failed = [], []
+        for topic in topics:
+            msg_type = message.get('type') if len(topics) == 1 and message.get('type') \
+                else snapshot.topic_types.get(topic)
+            msg_class = msg_type and (self._get_message_class(msg_type) or import_message_class(msg_type))
+            if not msg_class:
+                failed.append(topic)
+                continue
+            try:
+                self.topic_monitor.add(topic, msg_class, client_id)
+                monitored.append(topic)
+            except Exception as e:
+                logger.error(f"❌ Failed to monitor {topic}: {e}")
+                failed.append(topic)
+
+        logger.info(f"📈 Client {client_id} monitoring {len(monitored)} topics "
+                    f"({len(self.topic_monitor.subscriptions)} raw subscriptions)")
+        if failed:
+            logger.warning(f"⚠️ Could not monitor topics (unknown type): {failed}")
+        if message.get('id'):
+            await self.connection_manager.send_to_client(client_id, {
+                'op': 'monitor_status',
+                'id': message['id'],
+                'topics': monitored,
+                'failed': failed
+            })
+
     def _get_message_class(self, msg_type: str):
         """获取消息类型对应的类"""
         # 消息类型注册表
@@ -497,14 +866,18 @@ class RosbridgeService:
 
             # 创建订阅者 - 使用简化的单一配置
             try:
+                # 每个订阅独立的互斥回调组：不同主题可在执行器线程中并行，同一主题保持顺序
                 subscriber = self.node.create_subscription(
                     msg_class,
                     topic,
                     callback,
-                    qos_profile
+                    qos_profile,
+                    callback_group=MutuallyExclusiveCallbackGroup()
                 )
 
                 self.subscribers[topic] = subscriber
+                self._subscription_types[topic] = msg_type
+                self._subscription_created[topic] = datetime.now()
                 logger.info(f"✅ Successfully created subscriber for {topic}")
                 logger.info(f"🎯 QoS: RELIABLE + VOLATILE + KEEP_LAST + depth=10")
 
@@ -548,28 +921,35 @@ class RosbridgeService:
         try:
             if self._loop and self.message_queue:
                 # 记录第一次接收到消息
-                if not hasattr(self, '_first_message_logged'):
-                    self._first_message_logged = set()
-
                 if topic not in self._first_message_logged:
                     logger.info(f"🚀 First ROS2 callback received for topic {topic}, type: {type(msg).__name__}")
                     self._first_message_logged.add(topic)
 
+                # 接收时间与消息大小在回调线程中计算，不占用事件循环
+                received_at = time.time()
+                size = self.topic_stats.estimate_size(topic, msg)
+
                 # 使用call_soon_threadsafe将消息传递到异步循环
-                self._loop.call_soon_threadsafe(self._enqueue_message, topic, msg)
+                self._loop.call_soon_threadsafe(self._enqueue_message, topic, msg, received_at, size)
             else:
                 logger.error(f"❌ Message loop or queue not initialized for topic {topic}")
                 logger.error(f"   Loop: {self._loop is not None}, Queue: {self.message_queue is not None}")
         except Exception as e:
             logger.error(f"❌ Error in sync message handler for {topic}: {e}", exc_info=True)
 
-    def _enqueue_message(self, topic: str, msg):
+    def _enqueue_message(self, topic: str, msg, received_at: Optional[float] = None, size: Optional[int] = None):
         """将消息放入异步队列 - 在事件循环中调用"""
         try:
+            if topic not in self.subscribers:
+                # 订阅已销毁，丢弃销毁前已经交给事件循环的回调
+                return
+            received_at = time.time() if received_at is None else received_at
+            # 在入队前统计：latest_only / ring 模式会合并消息，处理循环看到的频率低于实际发布频率
+            self.topic_stats.record_message(topic, msg, received_at, size)
             if self.message_queue:
                 try:
                     # 非阻塞方式放入队列
-                    self.message_queue.put_nowait((topic, msg, time.time()))
+                    self.message_queue.put_nowait(topic, (msg, received_at))
                     logger.debug(f"📥 Enqueued message for {topic}, queue size: {self.message_queue.qsize()}")
                 except asyncio.QueueFull:
                     logger.warning(f"⚠️ Message queue full (size: {self.message_queue.maxsize}), dropping message for {topic}")
@@ -591,7 +971,7 @@ class RosbridgeService:
             while True:
                 try:
                     # 从队列中获取消息
-                    topic, msg, timestamp = await self.message_queue.get()
+                    topic, (msg, timestamp) = await self.message_queue.get()
 
                     # 记录消息接收
                     if topic not in self._message_counts:
@@ -623,367 +1003,206 @@ class RosbridgeService:
         finally:
             logger.info("Message processor loop stopped")
 
-    async def _ros_spin_loop(self):
-        """异步ROS2事件循环 - 处理ROS回调"""
-        logger.info("🔥 Starting ROS2 spin loop - THIS IS CRITICAL FOR MESSAGE RECEPTION!")
-
-        try:
-            while True:
-                # 非阻塞spin，处理ROS2回调
-                if self.node:
-                    rclpy.spin_once(self.node, timeout_sec=0.01)
-
-                # 让出控制权给其他协程
-                await asyncio.sleep(0.001)  # 1ms间隔，保持高响应性
-
-        except asyncio.CancelledError:
-            logger.info("ROS2 spin loop cancelled")
-        except Exception as e:
-            logger.error(f"Fatal error in ROS2 spin loop: {e}", exc_info=True)
-        finally:
-            logger.info("ROS2 spin loop stopped")
-
     async def _on_message_received(self, topic: str, msg):
-        """处理接收到的 ROS 消息"""
+        """处理接收到的 ROS 消息：提交到转换工作池，转换完成后按主题顺序广播"""
         try:
             logger.debug(f"📨 Processing message on topic {topic}, type: {type(msg).__name__}")
 
-            # 转换消息为字典格式
-            msg_dict = self._message_to_dict(msg)
-
-            # 记录消息大小信息
-            if 'data' in msg_dict:
-                if isinstance(msg_dict['data'], str) and msg_dict.get('data_encoding') == 'base64':
-                    logger.debug(f"📝 Converted {topic} to dict with Base64 data (original size estimation)")
-                elif isinstance(msg_dict['data'], list):
-                    logger.debug(f"📝 Converted {topic} to dict with {len(msg_dict['data'])} data points")
-                else:
-                    logger.debug(f"📝 Converted {topic} to dict, keys: {list(msg_dict.keys())}")
-            else:
-                logger.debug(f"📝 Converted {topic} to dict, keys: {list(msg_dict.keys())}")
+            # 按转换选项对订阅者分组，选项相同的客户端共享一次转换
+            subscriber_groups = list(self._subscriber_groups(topic).values())
+            if not subscriber_groups and self.connection_manager.subscribers(topic):
+                # 所有订阅者都被限速，跳过转换
+                return
 
-            # 构造 rosbridge 消息
-            rosbridge_msg = {
-                'op': 'publish',
-                'topic': topic,
-                'msg': msg_dict
-            }
+            await self.conversion_pool.submit(
+                topic,
+                convert_message,
+                (self.converter, topic, msg, subscriber_groups),
+                lambda result: self._publish_converted(topic, result)
+            )
 
-            # 检查是否有客户端订阅这个主题
-            active_subscribers = sum(1 for info in self.connection_manager.connection_info.values()
-                                   if topic in info.subscribed_topics)
+        except Exception as e:
+            logger.error(f"❌ Error processing message from {topic}: {e}", exc_info=True)
 
-            # 🔍 调试：详细打印连接信息
-            logger.debug(f"🔍 Debug subscription check for {topic}:")
-            logger.debug(f"   - Total active connections: {len(self.connection_manager.connection_info)}")
-            for client_id, info in self.connection_manager.connection_info.items():
-                logger.debug(f"   - Client {client_id}: subscribed to {info.subscribed_topics}")
-            logger.debug(f"   - Active subscribers for {topic}: {active_subscribers}")
+    async def _publish_converted(self, topic: str, result: tuple):
+        """广播转换完成的帧并缓存消息（在事件循环中执行）"""
+        msg_dict, frames = result
+        logger.debug(f"📝 Converted {topic} to dict, keys: {list(msg_dict.keys())}")
 
-            if active_subscribers > 0:
-                logger.debug(f"🔔 Broadcasting message for {topic} to {active_subscribers} subscribers")
+        active_subscribers = sum(len(client_ids) for _, client_ids in frames)
+        if active_subscribers > 0:
+            logger.debug(f"🔔 Broadcasting message for {topic} to {active_subscribers} subscribers")
 
-                # 广播给所有订阅该主题的客户端
-                broadcast_result = await self.connection_manager.broadcast(rosbridge_msg)
+            # 每组一个共享帧（每条消息每组只编码一次）
+            broadcast_result = False
+            for frame, client_ids in frames:
+                if await self.connection_manager.broadcast(frame, client_ids):
+                    broadcast_result = True
 
-                if broadcast_result:
-                    logger.debug(f"📤 Successfully broadcast {topic} to {active_subscribers} clients")
-                else:
-                    logger.warning(f"⚠️ Failed to broadcast {topic} to clients")
+            if broadcast_result:
+                logger.debug(f"📤 Successfully broadcast {topic} to {active_subscribers} clients")
             else:
-                # 减少缓存消息的日志输出频率
-                if topic not in self._cache_warning_counts:
-                    self._cache_warning_counts[topic] = 0
-
-                self._cache_warning_counts[topic] += 1
-
-                # 只在第一次和每100次时输出警告
-                if self._cache_warning_counts[topic] == 1 or self._cache_warning_counts[topic] % 100 == 0:
-                    logger.warning(f"📭 No active subscribers for {topic}, message cached only ({self._cache_warning_counts[topic]} times)")
-                    if self._cache_warning_counts[topic] == 1:
-                        logger.warning(f"💡 Tip: Frontend needs to subscribe to {topic} to receive messages")
-
-            # 缓存消息
-            self.message_cache.append({
-                'topic': topic,
-                'message': msg_dict,
-                'timestamp': time.time()
+                logger.warning(f"⚠️ Failed to broadcast {topic} to clients")
+        else:
+            # 减少缓存消息的日志输出频率
+            if topic not in self._cache_warning_counts:
+                self._cache_warning_counts[topic] = 0
+
+            self._cache_warning_counts[topic] += 1
+
+            # 只在第一次和每100次时输出警告
+            if self._cache_warning_counts[topic] == 1 or self._cache_warning_counts[topic] % 100 == 0:
+                logger.warning(f"📭 No active subscribers for {topic}, message cached only ({self._cache_warning_counts[topic]} times)")
+                if self._cache_warning_counts[topic] == 1:
+                    logger.warning(f"💡 Tip: Frontend needs to subscribe to {topic} to receive messages")
+
+        # 缓存消息
+        self.message_cache.append({
+            'topic': topic,
+            'message': msg_dict,
+            'timestamp': time.time()
+        })
+
+    def _subscriber_groups(self, topic: str) -> Dict[Optional[tuple], tuple]:
+        """按订阅选项的转换 key 对主题订阅者分组
+
+        返回 {conversion_key: (SubscriptionOptions, [client_id, ...], {帧编码, ...})}，
+        本条消息被 throttle_rate 限速的客户端不在结果中
+        """
+        groups: Dict[Optional[tuple], tuple] = {}
+        connection_manager = self.connection_manager
+        connection_info = connection_manager.connection_info
+        now = time.monotonic()
+        for client_id in connection_manager.subscribers(topic):
+            info = connection_info[client_id]
+            options = info.subscription_options.get(topic)
+            # 被 throttle_rate 限速的客户端不参与本条消息的转换
+            if options and options.throttle_rate and not connection_manager.allow_publish(
+                    client_id, topic, options.throttle_rate, now):
+                continue
+            key = options.conversion_key() if options else None
+            if key not in groups:
+                groups[key] = (options, [], set())
+            groups[key][1].append(client_id)
+            groups[key][2].add(ConnectionManager._topic_encoding(info, topic))
+        return groups
+
+    def _message_to_dict(self, msg, options: Optional[SubscriptionOptions] = None) -> dict:
+        """将 ROS 消息转换为字典（见 MessageConverter.message_to_dict）"""
+        return self.converter.message_to_dict(msg, options)
+
+    # API 方法实现
+    async def _refresh_graph_cache(self) -> Optional[Dict[str, List[str]]]:
+        """在线程中检查 ROS 图变化，并发调用共享同一次检查"""
+        if self._graph_refresh_task is None or self._graph_refresh_task.done():
+            self._graph_refresh_task = asyncio.ensure_future(self._run_graph_refresh())
+        return await asyncio.shield(self._graph_refresh_task)
+
+    async def _run_graph_refresh(self) -> Optional[Dict[str, List[str]]]:
+        # 增量由 _on_graph_changed 监听器推送
+        return await asyncio.to_thread(self.graph_cache.refresh)
+
+    def _on_graph_changed(self, previous: GraphSnapshot, current: GraphSnapshot,
+                          changes: Dict[str, List[str]]):
+        """图缓存监听器，可能在任意线程中被调用，转交事件循环推送增量"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(
+                lambda: asyncio.ensure_future(self._publish_graph_delta(previous, current, changes)))
+
+    async def _publish_graph_delta(self, previous: GraphSnapshot, current: GraphSnapshot,
+                                   changes: Dict[str, List[str]]):
+        """生成图增量并推送给 subscribe_graph 客户端（增量只编码一次）"""
+        frame = EncodedFrame(delta_message(previous, current, changes))
+        self._graph_deltas.append(frame)
+        if self.graph_subscribers:
+            await self.connection_manager.broadcast(frame, list(self.graph_subscribers))
+
+    async def _handle_subscribe_graph(self, client_id: str, message: dict):
+        """处理图订阅：先发送完整快照，之后推送带版本号的增量
+
+        客户端携带 version 重新订阅时，若服务端仍保留该版本之后的全部增量则只补发增量
+        """
+        if not self.node:
+            await self.connection_manager.send_to_client(client_id, {
+                'op': 'error',
+                'id': message.get('id'),
+                'error': 'ROS node not initialized'
             })
+            return
 
-        except Exception as e:
-            logger.error(f"❌ Error processing message from {topic}: {e}", exc_info=True)
-            
-    def _process_pointcloud_data(self, pointcloud_msg) -> dict:
-        """处理点云数据，进行压缩和采样优化"""
-        try:
-            import struct
-            import numpy as np
-            from sensor_msgs.msg import PointField
-            
-            # 解析点云字段
-            fields = []
-            for field in pointcloud_msg.fields:
-                fields.append({
-                    'name': field.name,
-                    'offset': field.offset,
-                    'datatype': field.datatype,
-                    'count': field.count
-                })
-            
-            # 基本信息
-            result = {
-                'header': self._message_to_dict(pointcloud_msg.header),
-                'height': pointcloud_msg.height,
-                'width': pointcloud_msg.width,
-                'fields': fields,
-                'is_bigendian': pointcloud_msg.is_bigendian,
-                'point_step': pointcloud_msg.point_step,
-                'row_step': pointcloud_msg.row_step,
-                'is_dense': pointcloud_msg.is_dense
-            }
-            
-            # 处理点云数据
-            if len(pointcloud_msg.data) > 0:
-                logger.debug(f"Processing pointcloud data - Total bytes: {len(pointcloud_msg.data)}, Point step: {pointcloud_msg.point_step}")
-                
-                # 检查是否需要采样（如果点数过多）
-                total_points = pointcloud_msg.width * pointcloud_msg.height
-                max_points = 50000  # 增加最大传输点数
-                
-                logger.debug(f"Pointcloud info - Width: {pointcloud_msg.width}, Height: {pointcloud_msg.height}, Total points: {total_points}")
-                
-                if total_points > max_points and total_points > 0:
-                    # 采样数据 - 修复采样逻辑
-                    sample_step = max(1, total_points // max_points)
-                    logger.info(f"Sampling pointcloud: {total_points} -> ~{total_points//sample_step} points (step: {sample_step})")
-                    
-                    sampled_data = []
-                    point_step = pointcloud_msg.point_step
-                    
-                    # 按照点为单位进行采样
-                    for i in range(0, total_points, sample_step):
-                        byte_start = i * point_step
-                        byte_end = byte_start + point_step
-                        if byte_end <= len(pointcloud_msg.data):
-                            sampled_data.extend(pointcloud_msg.data[byte_start:byte_end])
-                    
-                    # 使用Base64编码传输采样后的数据
-                    import base64
-                    result['data'] = base64.b64encode(bytes(sampled_data)).decode('ascii')
-                    result['data_encoding'] = 'base64'
-                    result['width'] = len(sampled_data) // point_step
-                    result['height'] = 1
-                    result['sampled'] = True
-                    result['original_points'] = total_points
-                    result['sample_step'] = sample_step
-
-                    logger.info(f"Sampled pointcloud - New size: {len(sampled_data)} bytes, Points: {result['width']}, Base64 encoded")
-                else:
-                    # 对于大型数据使用Base64编码，小型数据直接传输
-                    if len(pointcloud_msg.data) > 10000:  # 大于10KB使用Base64
-                        import base64
-                        result['data'] = base64.b64encode(pointcloud_msg.data).decode('ascii')
-                        result['data_encoding'] = 'base64'
-                        logger.debug(f"Direct pointcloud transmission - {len(pointcloud_msg.data)} bytes, {total_points} points, Base64 encoded")
-                    else:
-                        result['data'] = list(pointcloud_msg.data)
-                        result['data_encoding'] = 'array'
-                        logger.debug(f"Direct pointcloud transmission - {len(pointcloud_msg.data)} bytes, {total_points} points, as array")
-
-                    result['sampled'] = False
-            else:
-                result['data'] = []
-                result['data_encoding'] = 'array'
-                result['sampled'] = False
-                logger.warning("Pointcloud data is empty")
-                
-            return result
-            
-        except Exception as e:
-            logger.error(f"Failed to process pointcloud data: {e}")
-            return {
-                'header': self._message_to_dict(pointcloud_msg.header),
-                'error': str(e),
-                'data': []
-            }
+        snapshot = await self._get_graph_snapshot()
+        self.graph_subscribers.add(client_id)
 
-    def _process_image_data(self, image_msg) -> dict:
-        """处理图像数据，进行压缩优化"""
-        try:
-            result = {
-                'header': self._message_to_dict(image_msg.header),
-                'height': image_msg.height,
-                'width': image_msg.width,
-                'encoding': image_msg.encoding,
-                'is_bigendian': image_msg.is_bigendian,
-                'step': image_msg.step
-            }
-            
-            # 检查图像大小，如果太大则进行缩放
-            max_pixels = 640 * 480  # 最大像素数
-            current_pixels = image_msg.height * image_msg.width
-            
-            if current_pixels > max_pixels:
-                # 计算缩放比例
-                scale_factor = (max_pixels / current_pixels) ** 0.5
-                new_height = int(image_msg.height * scale_factor)
-                new_width = int(image_msg.width * scale_factor)
-                
-                logger.info(f"Scaling image: {image_msg.width}x{image_msg.height} -> {new_width}x{new_height}")
-                
-                result['scaled'] = True
-                result['original_width'] = image_msg.width
-                result['original_height'] = image_msg.height
-                result['width'] = new_width
-                result['height'] = new_height
-                
-                # 这里可以添加实际的图像缩放逻辑
-                # 为了简化，我们暂时只记录元数据
-                result['data'] = []  # 实际实现中需要缩放后的图像数据
-            else:
-                result['data'] = list(image_msg.data)
-                result['scaled'] = False
-                
-            return result
-            
-        except Exception as e:
-            logger.error(f"Failed to process image data: {e}")
-            return {
-                'header': self._message_to_dict(image_msg.header),
-                'error': str(e),
-                'data': []
-            }
+        since = message.get('version')
+        if since is not None:
+            pending = [frame for frame in self._graph_deltas if frame.message['version'] > since]
+            if since == snapshot.version or (pending and pending[0].message['previous_version'] == since):
+                for frame in pending:
+                    await self.connection_manager.send_to_client(client_id, frame)
+                logger.info(f"🕸️ Client {client_id} resumed graph subscription from version {since} ({len(pending)} deltas)")
+                return
+
+        response = snapshot_message(snapshot)
+        if message.get('id'):
+            response['id'] = message['id']
+        await self.connection_manager.send_to_client(client_id, response)
+        logger.info(f"🕸️ Client {client_id} subscribed to graph (version {snapshot.version}, "
+                    f"{len(snapshot.node_namespaces)} nodes, {len(snapshot.topic_types)} topics)")
+
+    async def _get_graph_snapshot(self) -> GraphSnapshot:
+        """获取当前版本的 ROS 图快照（首次调用时构建，之后由后台任务增量更新）"""
+        if self.graph_cache is None:
+            self.graph_cache = GraphCache(self.node)
+        if self.graph_cache.last_refresh is None:
+            await self._refresh_graph_cache()
+        return self.graph_cache.snapshot
+
+    def _topic_info_from_snapshot(self, snapshot: GraphSnapshot, name: str) -> TopicInfo:
+        stats = self.topic_stats.get(name)
+        return TopicInfo(
+            name=name,
+            message_type=snapshot.topic_types[name],
+            publishers=snapshot.topic_publishers.get(name, []),
+            subscribers=snapshot.topic_subscribers.get(name, []),
+            frequency=stats['frequency'] if stats else None,
+            last_message_time=datetime.fromtimestamp(stats['last_message_time']) if stats else None
+        )
+
+    @staticmethod
+    def _node_info_from_snapshot(snapshot: GraphSnapshot, name: str) -> NodeInfo:
+        return NodeInfo(
+            name=name,
+            namespace=snapshot.node_namespaces.get(name, "/"),
+            publishers=snapshot.node_publishers.get(name, []),
+            subscribers=snapshot.node_subscribers.get(name, []),
+            services=snapshot.node_services.get(name, []),
+            actions=[],
+            parameters={}
+        )
 
-    def _message_to_dict(self, msg) -> dict:
-        """将 ROS 消息转换为字典"""
-        try:
-            import numpy as np
-            from builtin_interfaces.msg import Time, Duration
-            from geometry_msgs.msg import Point, Quaternion, Pose, PoseStamped, PoseWithCovariance, PoseWithCovarianceStamped, Transform, TransformStamped
-            from nav_msgs.msg import Odometry
-            from std_msgs.msg import Header
-            from sensor_msgs.msg import PointCloud2, Image, CompressedImage
-            
-            # 特殊处理点云数据
-            if isinstance(msg, PointCloud2):
-                return self._process_pointcloud_data(msg)
-            
-            # 特殊处理图像数据
-            if isinstance(msg, (Image, CompressedImage)):
-                return self._process_image_data(msg)
-            
-            if hasattr(msg, '__slots__'):
-                result = {}
-                for slot in msg.__slots__:
-                    value = getattr(msg, slot)
-                    
-                    # 处理时间类型
-                    if isinstance(value, Time):
-                        result[slot] = {
-                            'sec': int(value.sec),
-                            'nanosec': int(value.nanosec)
-                        }
-                    elif isinstance(value, Duration):
-                        result[slot] = {
-                            'sec': int(value.sec),
-                            'nanosec': int(value.nanosec)
-                        }
-                    # 处理Header
-                    elif isinstance(value, Header):
-                        result[slot] = {
-                            'stamp': {
-                                'sec': int(value.stamp.sec),
-                                'nanosec': int(value.stamp.nanosec)
-                            },
-                            'frame_id': str(value.frame_id)
-                        }
-                    # 处理几何类型
-                    elif isinstance(value, Point):
-                        result[slot] = {'x': float(value.x), 'y': float(value.y), 'z': float(value.z)}
-                    elif isinstance(value, Quaternion):
-                        result[slot] = {'x': float(value.x), 'y': float(value.y), 'z': float(value.z), 'w': float(value.w)}
-                    elif isinstance(value, Pose):
-                        result[slot] = {
-                            'position': {'x': float(value.position.x), 'y': float(value.position.y), 'z': float(value.position.z)},
-                            'orientation': {'x': float(value.orientation.x), 'y': float(value.orientation.y), 'z': float(value.orientation.z), 'w': float(value.orientation.w)}
-                        }
-                    elif isinstance(value, PoseWithCovariance):
-                        result[slot] = {
-                            'pose': {
-                                'position': {'x': float(value.pose.position.x), 'y': float(value.pose.position.y), 'z': float(value.pose.position.z)},
-                                'orientation': {'x': float(value.pose.orientation.x), 'y': float(value.pose.orientation.y), 'z': float(value.pose.orientation.z), 'w': float(value.pose.orientation.w)}
-                            },
-                            'covariance': [float(c) for c in value.covariance] if hasattr(value, 'covariance') else []
-                        }
-                    # 处理numpy数组
-                    elif isinstance(value, np.ndarray):
-                        if value.dtype == np.uint8:
-                            result[slot] = value.tolist()
-                        else:
-                            result[slot] = value.astype(float).tolist()
-                    # 处理bytes类型（点云数据等）
-                    elif isinstance(value, bytes):
-                        # 对于大型bytes数据，使用Base64编码
-                        if len(value) > 1000:
-                            import base64
-                            result[slot] = base64.b64encode(value).decode('ascii')
-                            result[f"{slot}_encoding"] = "base64"
-                        else:
-                            result[slot] = list(value)  # 小数据直接转换为数组
-                    # 处理嵌套消息
-                    elif hasattr(value, '__slots__'):
-                        result[slot] = self._message_to_dict(value)
-                    # 处理列表
-                    elif isinstance(value, list):
-                        result[slot] = [
-                            self._message_to_dict(item) if hasattr(item, '__slots__') else 
-                            float(item) if isinstance(item, (int, float, np.number)) else 
-                            item
-                            for item in value
-                        ]
-                    # 处理基本数值类型
-                    elif isinstance(value, (int, float, np.number)):
-                        result[slot] = float(value) if isinstance(value, (float, np.floating)) else int(value)
-                    # 处理字符串和其他类型
-                    else:
-                        result[slot] = str(value) if value is not None else None
-                        
-                return result
-            else:
-                return {"data": str(msg)}
-        except Exception as e:
-            logger.error(f"Failed to convert message to dict: {e}")
-            return {"error": str(e), "message_type": type(msg).__name__}
-    
-    # API 方法实现
     async def get_topics(self) -> List[TopicInfo]:
         """获取主题列表"""
         if not self.node:
             return []
             
         try:
-            topic_names_and_types = self.node.get_topic_names_and_types()
-            topics = []
-            
-            for name, types in topic_names_and_types:
-                topics.append(TopicInfo(
-                    name=name,
-                    message_type=types[0] if types else "unknown",
-                    publishers=[],
-                    subscribers=[]
-                ))
-                
-            return topics
+            snapshot = await self._get_graph_snapshot()
+            return [self._topic_info_from_snapshot(snapshot, name) for name in snapshot.topic_types]
         except Exception as e:
             logger.error(f"Failed to get topics: {e}")
             return []
     
     async def get_topic_info(self, topic_name: str) -> Optional[TopicInfo]:
         """获取主题信息"""
-        topics = await self.get_topics()
-        for topic in topics:
-            if topic.name == topic_name:
-                return topic
+        if not self.node:
+            return None
+
+        try:
+            snapshot = await self._get_graph_snapshot()
+            if topic_name in snapshot.topic_types:
+                return self._topic_info_from_snapshot(snapshot, topic_name)
+        except Exception as e:
+            logger.error(f"Failed to get topic info for {topic_name}: {e}")
         return None
     
     async def subscribe_topic(self, topic_name: str) -> bool:
@@ -1014,55 +1233,14 @@ class RosbridgeService:
             return False
     
     async def get_nodes(self) -> List[NodeInfo]:
-        """获取节点列表"""
+        """获取节点列表（基于 ROS 图快照，每个主题只查询一次）"""
         if not self.node:
             return []
             
         try:
-            node_names = self.node.get_node_names()
-            nodes = []
-            
-            for name in node_names:
-                # 获取节点的发布和订阅主题
-                publishers = []
-                subscribers = []
-                
-                try:
-                    # ROS2中获取节点发布和订阅信息的方法
-                    # 获取所有主题的发布者和订阅者信息
-                    all_topics_and_types = self.node.get_topic_names_and_types()
-                    
-                    for topic_name, topic_types in all_topics_and_types:
-                        try:
-                            # 获取该主题的发布者信息
-                            publishers_info = self.node.get_publishers_info_by_topic(topic_name)
-                            for pub_info in publishers_info:
-                                if pub_info.node_name == name:
-                                    publishers.append(topic_name)
-                            
-                            # 获取该主题的订阅者信息
-                            subscriptions_info = self.node.get_subscriptions_info_by_topic(topic_name)
-                            for sub_info in subscriptions_info:
-                                if sub_info.node_name == name:
-                                    subscribers.append(topic_name)
-                                    
-                        except Exception as topic_e:
-                            logger.debug(f"Could not get info for topic {topic_name}: {topic_e}")
-                            
-                except Exception as node_e:
-                    logger.debug(f"Could not get detailed info for node {name}: {node_e}")
-                
-                nodes.append(NodeInfo(
-                    name=name,
-                    namespace="/",
-                    publishers=publishers,
-                    subscribers=subscribers,
-                    services=[],
-                    actions=[],
-                    parameters={}
-                ))
-                
-            logger.info(f"Found {len(nodes)} nodes with topic relationships")
+            snapshot = await self._get_graph_snapshot()
+            nodes = [self._node_info_from_snapshot(snapshot, name) for name in snapshot.node_namespaces]
+            logger.debug(f"Found {len(nodes)} nodes with topic relationships")
             return nodes
         except Exception as e:
             logger.error(f"Failed to get nodes: {e}")
@@ -1074,58 +1252,31 @@ class RosbridgeService:
             return {}
             
         try:
-            topic_names_and_types = self.node.get_topic_names_and_types()
-            topic_types = {}
-            
-            for name, types in topic_names_and_types:
-                topic_types[name] = types[0] if types else "unknown"
-                
-            logger.info(f"Found {len(topic_types)} topic types")
-            return topic_types
+            snapshot = await self._get_graph_snapshot()
+            logger.debug(f"Found {len(snapshot.topic_types)} topic types")
+            return dict(snapshot.topic_types)
         except Exception as e:
             logger.error(f"Failed to get topic types: {e}")
             return {}
 
     async def get_topic_frequencies(self) -> Dict[str, float]:
-        """获取主题频率信息"""
-        if not self.node:
-            return {}
-            
+        """获取主题实测频率 (Hz)，只包含已订阅并收到过消息的主题"""
         try:
-            frequencies = {}
-            topic_names_and_types = self.node.get_topic_names_and_types()
-            
-            for topic_name, _ in topic_names_and_types:
-                try:
-                    # 获取主题的发布者信息
-                    publishers_info = self.node.get_publishers_info_by_topic(topic_name)
-                    if publishers_info:
-                        # 这里简化处理，实际应该通过订阅主题来测量频率
-                        # 暂时返回一个基于主题名称的模拟频率
-                        if 'odom' in topic_name or 'pose' in topic_name:
-                            frequencies[topic_name] = 10.0 + (hash(topic_name) % 20)
-                        elif 'image' in topic_name or 'camera' in topic_name:
-                            frequencies[topic_name] = 15.0 + (hash(topic_name) % 15)
-                        elif 'scan' in topic_name or 'laser' in topic_name:
-                            frequencies[topic_name] = 5.0 + (hash(topic_name) % 10)
-                        elif 'diagnostics' in topic_name or 'status' in topic_name:
-                            frequencies[topic_name] = 1.0 + (hash(topic_name) % 2)
-                        elif 'parameter_events' in topic_name or 'rosout' in topic_name:
-                            frequencies[topic_name] = 0.1 + (hash(topic_name) % 0.5)
-                        else:
-                            frequencies[topic_name] = 1.0 + (hash(topic_name) % 5)
-                    else:
-                        frequencies[topic_name] = 0.0  # 没有发布者，频率为0
-                        
-                except Exception as e:
-                    logger.warning(f"Could not get frequency for topic {topic_name}: {e}")
-                    frequencies[topic_name] = 0.0
-                    
-            logger.info(f"Found frequencies for {len(frequencies)} topics")
-            return frequencies
+            return self.topic_stats.frequencies()
         except Exception as e:
             logger.error(f"Failed to get topic frequencies: {e}")
             return {}
+
+    async def get_topic_statistics(self) -> Dict[str, TopicStatistics]:
+        """获取主题实测统计（频率、带宽、抖动、延迟）"""
+        statistics = {}
+        for topic, stats in self.topic_stats.snapshot().items():
+            last_message_time = stats['last_message_time']
+            statistics[topic] = TopicStatistics(**{
+                **stats,
+                'last_message_time': datetime.fromtimestamp(last_message_time) if last_message_time else None
+            })
+        return statistics
     
     async def get_services(self) -> List[str]:
         """获取服务列表"""
@@ -1184,28 +1335,46 @@ class RosbridgeService:
     
     async def get_node_info(self, node_name: str) -> Optional[NodeInfo]:
         """获取节点信息"""
-        nodes = await self.get_nodes()
-        for node in nodes:
-            if node.name == node_name:
-                return node
+        if not self.node:
+            return None
+
+        try:
+            snapshot = await self._get_graph_snapshot()
+            if node_name in snapshot.node_namespaces:
+                return self._node_info_from_snapshot(snapshot, node_name)
+        except Exception as e:
+            logger.error(f"Failed to get node info for {node_name}: {e}")
         return None
     
     async def get_system_status(self) -> SystemStatus:
         """获取系统状态"""
-        topics = await self.get_topics()
-        nodes = await self.get_nodes()
+        active_nodes = active_topics = 0
+        if self.node:
+            try:
+                snapshot = await self._get_graph_snapshot()
+                active_nodes = len(snapshot.node_namespaces)
+                active_topics = len(snapshot.topic_types)
+            except Exception as e:
+                logger.error(f"Failed to get graph snapshot for system status: {e}")
+        loop_lag = self.loop_monitor.stats()
         
         return SystemStatus(
             ros_domain_id=self.settings.ros_domain_id,
-            active_nodes=len(nodes),
-            active_topics=len(topics),
+            active_nodes=active_nodes,
+            active_topics=active_topics,
             active_connections=len(self.connection_manager.active_connections),
             system_time=datetime.now(),
             uptime=time.time() - self.start_time,
             memory_usage=0.0,  # 实际实现需要获取真实数据
-            cpu_usage=0.0
+            cpu_usage=0.0,
+            event_loop_lag_ms=loop_lag['mean_ms'],
+            event_loop_lag_max_ms=loop_lag['max_ms']
         )
     
+    async def get_connections(self) -> List[ConnectionInfo]:
+        """获取 WebSocket 客户端连接信息（含发送队列深度与丢弃计数）"""
+        return list(self.connection_manager.connection_info.values())
+    
     # 可视化相关方法
     async def get_visualization_state(self) -> VisualizationState:
         """获取可视化状态"""
@@ -1224,6 +1393,7 @@ class RosbridgeService:
         """更新渲染设置"""
         try:
             self.visualization_state.render_settings = settings
+            self.converter.max_points = settings.max_points
             return True
         except Exception as e:
             logger.error(f"Failed to update render settings: {e}")
@@ -1273,34 +1443,105 @@ class RosbridgeService:
         return True
     
     # 后台任务
-    async def _update_topic_info(self):
-        """定期更新主题信息"""
-        while True:
-            try:
-                await asyncio.sleep(5)  # 每5秒更新一次
-                # 更新主题信息缓存
-            except Exception as e:
-                logger.error(f"Error updating topic info: {e}")
-    
-    async def _update_node_info(self):
-        """定期更新节点信息"""
+    async def _update_graph_cache(self):
+        """定期检查 ROS 图变化，只更新变化的节点与主题"""
         while True:
             try:
-                await asyncio.sleep(10)  # 每10秒更新一次
-                # 更新节点信息缓存
+                await asyncio.sleep(self.settings.graph_poll_interval)
+                if self.node and self.graph_cache:
+                    changes = await self._refresh_graph_cache()
+                    if changes:
+                        logger.info(f"🔄 ROS graph changed (version {self.graph_cache.version}): "
+                                    f"+{len(changes['nodes_added'])}/-{len(changes['nodes_removed'])} nodes, "
+                                    f"+{len(changes['topics_added'])}/-{len(changes['topics_removed'])}/"
+                                    f"~{len(changes['topics_updated'])} topics")
+            except asyncio.CancelledError:
+                break
             except Exception as e:
-                logger.error(f"Error updating node info: {e}")
+                logger.error(f"Error updating graph cache: {e}")
     
     async def _handle_unsubscribe(self, client_id: str, message: dict):
         """处理取消订阅"""
+        if message.get('mode') == 'monitor':
+            if self.topic_monitor:
+                for topic in message.get('topics') or [message.get('topic')]:
+                    self.topic_monitor.remove(topic, client_id)
+            return
+
         topic = message.get('topic')
         if not topic:
             return
             
         # 从客户端订阅列表移除
-        info = self.connection_manager.connection_info.get(client_id)
-        if info and topic in info.subscribed_topics:
-            info.subscribed_topics.remove(topic)
+        self.connection_manager.remove_subscription(client_id, topic)
+        self._release_subscription(topic)
+
+    def _subscription_clients(self, topic: str) -> List[str]:
+        """引用主题订阅的客户端"""
+        return sorted(self.connection_manager.subscribers(topic))
+
+    def _cancel_linger(self, topic: str):
+        handle = self._linger_handles.pop(topic, None)
+        if handle is not None:
+            handle.cancel()
+            logger.info(f"♻️ Reusing lingering subscriber for {topic}")
+
+    def _release_subscription(self, topic: str):
+        """客户端释放主题后调用：没有客户端引用时在 subscription_linger 秒后销毁 ROS 订阅"""
+        if topic not in self.subscribers or topic in self._linger_handles or self._subscription_clients(topic):
+            return
+        linger = self.settings.subscription_linger
+        if linger <= 0 or self._loop is None:
+            self._destroy_subscriber(topic)
+            return
+        self._linger_handles[topic] = self._loop.call_later(linger, self._destroy_subscriber, topic)
+        logger.info(f"⏳ No clients left for {topic}, destroying subscriber in {linger:.1f}s")
+
+    def _destroy_subscriber(self, topic: str):
+        """销毁无客户端引用的 ROS 订阅（等待期间重新被引用时保留）"""
+        self._linger_handles.pop(topic, None)
+        if self._subscription_clients(topic):
+            return
+        subscriber = self.subscribers.pop(topic, None)
+        if subscriber is None:
+            return
+        try:
+            self.node.destroy_subscription(subscriber)
+        except Exception as e:
+            logger.error(f"❌ Failed to destroy subscriber for {topic}: {e}")
+        self._subscription_types.pop(topic, None)
+        self._subscription_created.pop(topic, None)
+        self._cache_warning_counts.pop(topic, None)
+        # 丢弃尚未处理的消息，之后重新订阅时不会收到旧消息
+        if self.message_queue:
+            self.message_queue.discard(topic)
+        logger.info(f"🗑️ Destroyed subscriber for {topic} ({len(self.subscribers)} remaining)")
+
+    async def get_subscriptions(self) -> List[RosSubscriptionInfo]:
+        """获取当前 ROS 订阅及其客户端引用计数"""
+        now = self._loop.time() if self._loop else None
+        subscriptions = []
+        for topic in self.subscribers:
+            clients = self._subscription_clients(topic)
+            handle = self._linger_handles.get(topic)
+            subscriptions.append(RosSubscriptionInfo(
+                topic=topic,
+                message_type=self._subscription_types.get(topic),
+                mode='bridge',
+                ref_count=len(clients),
+                clients=clients,
+                created_at=self._subscription_created.get(topic),
+                linger_remaining=max(handle.when() - now, 0.0) if handle and now is not None else None
+            ))
+        if self.topic_monitor:
+            for topic, clients in self.topic_monitor.clients.items():
+                subscriptions.append(RosSubscriptionInfo(
+                    topic=topic,
+                    mode='monitor',
+                    ref_count=len(clients),
+                    clients=sorted(clients)
+                ))
+        return subscriptions
     
     async def _handle_advertise(self, message: dict):
         """处理前端声明发布者"""
@@ -1472,7 +1713,7 @@ class RosbridgeService:
             topics = await self.get_topics()
             response = {
                 'op': 'get_topics_result',
-                'topics': [topic.dict() for topic in topics]
+                'topics': [json.loads(topic.json()) for topic in topics]
             }
             if request_id:
                 response['id'] = request_id
@@ -1535,7 +1776,8 @@ class RosbridgeService:
             frequencies = await self.get_topic_frequencies()
             response = {
                 'op': 'get_topic_frequencies_result',
-                'frequencies': frequencies
+                'frequencies': frequencies,
+                'statistics': self.topic_stats.snapshot()
             }
             if request_id:
                 response['id'] = request_id
@@ -1592,6 +1834,27 @@ class RosbridgeService:
                     'error': str(e)
                 })
     
+    async def _handle_get_subscriptions(self, client_id: str, message: dict):
+        """处理获取 ROS 订阅（引用计数与等待销毁状态）请求"""
+        request_id = message.get('id')
+        try:
+            subscriptions = await self.get_subscriptions()
+            response = {
+                'op': 'get_subscriptions_result',
+                'subscriptions': [json.loads(subscription.json()) for subscription in subscriptions]
+            }
+            if request_id:
+                response['id'] = request_id
+            await self.connection_manager.send_to_client(client_id, response)
+        except Exception as e:
+            logger.error(f"Failed to handle get_subscriptions for {client_id}: {e}")
+            if request_id:
+                await self.connection_manager.send_to_client(client_id, {
+                    'op': 'error',
+                    'id': request_id,
+                    'error': str(e)
+                })
+
     async def _handle_get_params(self, client_id: str, request_id: str = None):
         """处理获取参数请求"""
         try:
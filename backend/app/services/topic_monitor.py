@@ -0,0 +1,107 @@
+"""
+主题监控订阅
+使用 rclpy 原始订阅 (raw=True) 只统计消息数与字节数，不反序列化也不转换消息，
+可以低成本地同时监控数百个主题的频率与带宽
+"""
+
+import importlib
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
+from rclpy.qos import QoSProfile, QoSReliabilityPolicy, QoSDurabilityPolicy, QoSHistoryPolicy
+
+from .topic_stats import TopicStatsEngine
+
+logger = logging.getLogger(__name__)
+
+# BEST_EFFORT 订阅与 RELIABLE / BEST_EFFORT 发布者都兼容
+MONITOR_QOS = QoSProfile(
+    reliability=QoSReliabilityPolicy.BEST_EFFORT,
+    durability=QoSDurabilityPolicy.VOLATILE,
+    history=QoSHistoryPolicy.KEEP_LAST,
+    depth=10
+)
+
+
+def import_message_class(msg_type: str):
+    """按 'pkg/msg/Type' 导入消息类，失败返回 None"""
+    parts = msg_type.split('/')
+    if len(parts) == 2:
+        parts = [parts[0], 'msg', parts[1]]
+    if len(parts) != 3:
+        return None
+    try:
+        module = importlib.import_module(f"{parts[0]}.{parts[1]}")
+        return getattr(module, parts[2])
+    except (ImportError, AttributeError):
+        return None
+
+
+class TopicMonitor:
+    """原始订阅监控器
+
+    每个主题最多一个原始订阅，按客户端引用计数；
+    skip(topic) 为真时（该主题已有完整订阅在统计）回调不重复记录
+    """
+
+    def __init__(self, node, stats: TopicStatsEngine,
+                 skip: Optional[Callable[[str], bool]] = None):
+        self.node = node
+        self.stats = stats
+        self.skip = skip or (lambda topic: False)
+        self.subscriptions: Dict[str, object] = {}
+        self.clients: Dict[str, Set[str]] = {}
+
+    def _callback(self, topic: str):
+        record = self.stats.record
+        skip = self.skip
+
+        def on_raw_message(data: bytes):
+            # 在执行器线程中调用，只记录接收时间与序列化后的大小
+            if not skip(topic):
+                record(topic, time.time(), len(data))
+        return on_raw_message
+
+    def add(self, topic: str, msg_class, client_id: str) -> bool:
+        """为客户端开始监控主题，返回是否新建了订阅"""
+        self.clients.setdefault(topic, set()).add(client_id)
+        if topic in self.subscriptions:
+            return False
+        self.subscriptions[topic] = self.node.create_subscription(
+            msg_class,
+            topic,
+            self._callback(topic),
+            MONITOR_QOS,
+            callback_group=MutuallyExclusiveCallbackGroup(),
+            raw=True
+        )
+        logger.info(f"📈 Monitoring {topic} (raw subscription)")
+        return True
+
+    def remove(self, topic: str, client_id: str) -> bool:
+        """客户端停止监控主题，没有客户端时销毁订阅；返回是否销毁了订阅"""
+        clients = self.clients.get(topic)
+        if clients is None:
+            return False
+        clients.discard(client_id)
+        if clients:
+            return False
+        del self.clients[topic]
+        subscription = self.subscriptions.pop(topic, None)
+        if subscription is not None:
+            self.node.destroy_subscription(subscription)
+            logger.info(f"📉 Stopped monitoring {topic}")
+        return True
+
+    def release_client(self, client_id: str) -> List[str]:
+        """客户端断开时释放其全部监控，返回被销毁订阅的主题"""
+        return [topic for topic in [t for t, c in self.clients.items() if client_id in c]
+                if self.remove(topic, client_id)]
+
+    def stop(self):
+        for subscription in self.subscriptions.values():
+            self.node.destroy_subscription(subscription)
+        self.subscriptions.clear()
+        self.clients.clear()
@@ -0,0 +1,221 @@
+"""
+主题统计
+按主题统计实测的发布频率、带宽、到达间隔抖动与 header.stamp 到接收的延迟
+
+每个主题使用固定长度的环形缓冲区并维护滑动窗口内的累计值，每条消息的更新为 O(1)
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from rclpy.serialization import serialize_message
+
+logger = logging.getLogger(__name__)
+
+# 超过该长度的字节/数组字段直接按长度计入带宽，不再序列化整条消息
+_LARGE_PAYLOAD_BYTES = 4096
+
+
+def _payload_size(msg) -> Optional[int]:
+    """原始字节或以大块 data 字段为主体的消息（点云、图像）直接按长度估算，其他消息返回 None"""
+    if isinstance(msg, (bytes, bytearray, memoryview)):
+        return len(msg)
+    data = getattr(msg, 'data', None)
+    if data is not None and hasattr(data, '__len__') and not isinstance(data, str):
+        itemsize = getattr(data, 'itemsize', 1)
+        if len(data) * itemsize >= _LARGE_PAYLOAD_BYTES:
+            return len(data) * itemsize
+    return None
+
+
+def _serialized_size(msg) -> int:
+    try:
+        return len(serialize_message(msg))
+    except Exception:
+        return 0
+
+
+def message_size(msg) -> int:
+    """估算消息的序列化大小（字节）
+
+    点云、图像等以 data 字段为主体的大消息按 data 长度估算，其余消息序列化后取长度
+    """
+    size = _payload_size(msg)
+    return _serialized_size(msg) if size is None else size
+
+
+def header_stamp(msg) -> Optional[float]:
+    """读取 header.stamp（秒），没有 header 或时间戳为 0 时返回 None"""
+    header = getattr(msg, 'header', None)
+    stamp = getattr(header, 'stamp', None)
+    if stamp is None:
+        return None
+    seconds = getattr(stamp, 'sec', 0) + getattr(stamp, 'nanosec', 0) * 1e-9
+    return seconds if seconds > 0 else None
+
+
+class TopicStatistics:
+    """单个主题的滑动窗口统计
+
+    窗口内保存最近 window 条消息的到达时间、大小与延迟，
+    累计值随写入与覆盖增减，读取统计时无需遍历窗口
+    """
+
+    __slots__ = ('window', 'count', 'total_messages', 'total_bytes', 'last_receive_time',
+                 '_times', '_sizes', '_latencies', '_index', '_size_sum',
+                 '_interval_sum', '_interval_sq_sum', '_latency_sum', '_latency_count')
+
+    def __init__(self, window: int = 100):
+        self.window = window
+        self.count = 0
+        self.total_messages = 0
+        self.total_bytes = 0
+        self.last_receive_time: Optional[float] = None
+        self._times = [0.0] * window
+        self._sizes = [0] * window
+        self._latencies = [None] * window
+        self._index = 0
+        self._size_sum = 0
+        self._interval_sum = 0.0
+        self._interval_sq_sum = 0.0
+        self._latency_sum = 0.0
+        self._latency_count = 0
+
+    def record(self, receive_time: float, size: int = 0, latency: Optional[float] = None):
+        """写入一条消息（receive_time 为 time.time() 秒）"""
+        index = self._index
+        if self.count == self.window:
+            # 覆盖最旧的样本：移除其大小、延迟以及它与下一条样本之间的间隔
+            oldest = self._times[index]
+            following = self._times[(index + 1) % self.window]
+            interval = following - oldest
+            self._interval_sum -= interval
+            self._interval_sq_sum -= interval * interval
+            self._size_sum -= self._sizes[index]
+            if self._latencies[index] is not None:
+                self._latency_sum -= self._latencies[index]
+                self._latency_count -= 1
+        else:
+            self.count += 1
+
+        if self.last_receive_time is not None and self.count > 1:
+            interval = receive_time - self.last_receive_time
+            self._interval_sum += interval
+            self._interval_sq_sum += interval * interval
+
+        self._times[index] = receive_time
+        self._sizes[index] = size
+        self._latencies[index] = latency
+        self._size_sum += size
+        if latency is not None:
+            self._latency_sum += latency
+            self._latency_count += 1
+
+        self._index = (index + 1) % self.window
+        self.last_receive_time = receive_time
+        self.total_messages += 1
+        self.total_bytes += size
+
+    def stats(self, now: Optional[float] = None, stale_after: float = 5.0) -> Dict[str, Optional[float]]:
+        """返回窗口统计
+
+        超过 stale_after 秒（或平均间隔的 3 倍，取较大者）没有新消息时频率与带宽为 0
+        """
+        now = time.time() if now is None else now
+        intervals = self.count - 1
+        rate = bandwidth = jitter = 0.0
+        mean_interval = None
+        if intervals > 0 and self._interval_sum > 0:
+            mean_interval = self._interval_sum / intervals
+            variance = max(self._interval_sq_sum / intervals - mean_interval * mean_interval, 0.0)
+            jitter = math.sqrt(variance)
+            if now - self.last_receive_time <= max(stale_after, mean_interval * 3):
+                rate = 1.0 / mean_interval
+                bandwidth = self._size_sum / self.count * rate
+
+        return {
+            'frequency': rate,
+            'bytes_per_second': bandwidth,
+            'mean_interval_ms': mean_interval * 1000 if mean_interval is not None else None,
+            'jitter_ms': jitter * 1000,
+            'latency_ms': self._latency_sum / self._latency_count * 1000 if self._latency_count else None,
+            'mean_size': self._size_sum / self.count if self.count else 0.0,
+            'window': self.count,
+            'total_messages': self.total_messages,
+            'total_bytes': self.total_bytes,
+            'last_message_time': self.last_receive_time,
+        }
+
+
+class TopicStatsEngine:
+    """所有主题的统计入口，由消息接收路径写入，由 API 读取
+
+    监控订阅在执行器线程中直接写入，读写通过锁串行
+    """
+
+    def __init__(self, window: int = 100, stale_after: float = 5.0, size_sample_interval: int = 20):
+        self.window = window
+        self.stale_after = stale_after
+        self.size_sample_interval = max(1, size_sample_interval)
+        self.topics: Dict[str, TopicStatistics] = {}
+        # 主题 -> [距上次测量的消息数, 上次测量的序列化大小]
+        self._size_samples: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def estimate_size(self, topic: str, msg) -> int:
+        """估算消息大小，在执行器回调中调用
+
+        点云、图像等按 data 长度计算；其他消息每 size_sample_interval 条才序列化一次，
+        其间沿用上次测量的大小，避免每条消息都额外序列化。
+        多个回调线程并发时计数可能略有偏差，只影响采样时机
+        """
+        size = _payload_size(msg)
+        if size is not None:
+            return size
+        sample = self._size_samples.get(topic)
+        if sample is None or sample[0] >= self.size_sample_interval:
+            size = _serialized_size(msg)
+            self._size_samples[topic] = [1, size]
+            return size
+        sample[0] += 1
+        return sample[1]
+
+    def record(self, topic: str, receive_time: float, size: int = 0, stamp: Optional[float] = None):
+        """写入一条消息；stamp 为 header.stamp（秒），用于计算接收延迟"""
+        latency = receive_time - stamp if stamp is not None else None
+        with self._lock:
+            statistics = self.topics.get(topic)
+            if statistics is None:
+                statistics = self.topics[topic] = TopicStatistics(self.window)
+            statistics.record(receive_time, size, latency)
+
+    def record_message(self, topic: str, msg, receive_time: Optional[float] = None,
+                       size: Optional[int] = None):
+        """写入一条 ROS 消息（自动估算大小并读取 header.stamp）"""
+        self.record(topic,
+                    time.time() if receive_time is None else receive_time,
+                    message_size(msg) if size is None else size,
+                    header_stamp(msg))
+
+    def get(self, topic: str, now: Optional[float] = None) -> Optional[Dict[str, Optional[float]]]:
+        with self._lock:
+            statistics = self.topics.get(topic)
+            return statistics.stats(now, self.stale_after) if statistics else None
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Dict[str, Optional[float]]]:
+        """所有主题的统计"""
+        now = time.time() if now is None else now
+        with self._lock:
+            return {topic: statistics.stats(now, self.stale_after) for topic, statistics in self.topics.items()}
+
+    def frequencies(self, now: Optional[float] = None) -> Dict[str, float]:
+        """所有主题的实测频率 (Hz)"""
+        return {topic: stats['frequency'] for topic, stats in self.snapshot(now).items()}
+
+    def remove(self, topic: str):
+        with self._lock:
+            self.topics.pop(topic, None)
+        self._size_samples.pop(topic, None)
@@ -3,17 +3,19 @@ ROS2 拓扑分析服务
 负责分析节点间的连接关系和通信拓扑
 """
 
-import rclpy
 from rclpy.node import Node
 from rclpy.topic_endpoint_info import TopicEndpointInfo
 import logging
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Dict, Iterable, List, Set, Tuple, Optional
 from collections import defaultdict
 import asyncio
 from datetime import datetime
 
-from ..models.ros import NodeTopology, TopicConnection, SystemTopology
+from ..models.ros import NodeTopology, TopicConnection, SystemTopology, GraphLayout
 from ..core.config import Settings
+from .graph_snapshot import GraphCache, GraphSnapshot
+from .graph_layout import GraphLayoutEngine
+from .ros_context import RosContext
 
 logger = logging.getLogger(__name__)
 
@@ -21,27 +23,44 @@ logger = logging.getLogger(__name__)
 class TopologyAnalyzer:
     """ROS2 拓扑分析器"""
     
-    def __init__(self, ros_node: Node):
+    def __init__(self, ros_node: Node, graph_cache: Optional[GraphCache] = None,
+                 check_interval: float = 1.0):
         self.ros_node = ros_node
         self.topology_cache = {}
         self.last_update = None
-        self.cache_duration = 5.0  # 缓存5秒
+        self.check_interval = check_interval  # 图变化检查间隔 (秒)，与 Rosbridge 的图轮询间隔一致
+        # 图版本号未变化时直接返回缓存的拓扑（可与其他服务共享同一个图缓存）
+        self.graph_cache = graph_cache or GraphCache(ros_node)
+        self.topology_version: Optional[int] = None
+        # 邻接索引，随拓扑一起重建，子图查询只访问涉及的节点与主题
+        self.node_index: Dict[str, NodeTopology] = {}
+        self.topic_index: Dict[str, TopicConnection] = {}
+        self.namespace_index: Dict[str, List[str]] = {}
         
     async def get_system_topology(self, use_cache: bool = True) -> SystemTopology:
-        """获取系统拓扑结构"""
+        """获取系统拓扑结构（仅在 ROS 图变化时重新分析）"""
         now = datetime.now()
         
-        # 检查缓存
-        if (use_cache and self.last_update and 
-            (now - self.last_update).total_seconds() < self.cache_duration):
+        # 检查图是否变化
+        try:
+            if use_cache:
+                await asyncio.to_thread(self.graph_cache.refresh_if_stale, self.check_interval)
+            else:
+                await asyncio.to_thread(self.graph_cache.refresh)
+        except Exception as e:
+            logger.warning(f"Failed to check graph changes: {e}")
+        if use_cache and self.topology_cache and self.topology_version == self.graph_cache.version:
             return self.topology_cache
         
         try:
+            # 本次刷新共享的端点表（图缓存快照），节点与主题连接都从中读取
+            snapshot = self.graph_cache.snapshot
+
             # 获取节点拓扑信息
-            nodes = await self._analyze_node_topology()
+            nodes = self._analyze_node_topology(snapshot)
             
             # 获取主题连接信息
-            topic_connections = await self._analyze_topic_connections()
+            topic_connections = self._analyze_topic_connections(snapshot)
             
             # 识别孤立节点
             isolated_nodes = self._find_isolated_nodes(nodes, topic_connections)
@@ -58,8 +77,10 @@ class TopologyAnalyzer:
             )
             
             # 更新缓存
+            self._build_indexes(nodes, topic_connections)
             self.topology_cache = topology
             self.last_update = now
+            self.topology_version = self.graph_cache.version
             
             logger.info(f"Updated topology: {len(nodes)} nodes, "
                        f"{len(topic_connections)} topics, "
@@ -72,174 +93,158 @@ class TopologyAnalyzer:
             # 返回空拓扑
             return SystemTopology()
     
-    async def _analyze_node_topology(self) -> List[NodeTopology]:
-        """分析节点拓扑"""
+    def _analyze_node_topology(self, snapshot: GraphSnapshot) -> List[NodeTopology]:
+        """分析节点拓扑（从端点表读取，与主题数成线性关系）"""
         nodes = []
         
-        try:
-            # 获取所有节点名称
-            node_names = self.ros_node.get_node_names()
-            
-            for node_name in node_names:
-                try:
-                    # 获取节点的发布和订阅信息
-                    published_topics = await self._get_node_publishers(node_name)
-                    subscribed_topics = await self._get_node_subscribers(node_name)
-                    services = await self._get_node_services(node_name)
-                    
-                    # 解析命名空间
-                    namespace = self._extract_namespace(node_name)
-                    
-                    node_topology = NodeTopology(
-                        node_name=node_name,
-                        namespace=namespace,
-                        node_type="node",
-                        published_topics=published_topics,
-                        subscribed_topics=subscribed_topics,
-                        services=services,
-                        actions=[],  # TODO: 添加action分析
-                        is_active=True
-                    )
-                    
-                    nodes.append(node_topology)
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to analyze node {node_name}: {e}")
-                    continue
-            
-            return nodes
-            
-        except Exception as e:
-            logger.error(f"Failed to get node topology: {e}")
-            return []
-    
-    async def _get_node_publishers(self, node_name: str) -> List[str]:
-        """获取节点发布的主题"""
-        try:
-            publishers = []
-            topic_names_and_types = self.ros_node.get_topic_names_and_types()
-            
-            for topic_name, _ in topic_names_and_types:
-                try:
-                    # 获取主题的发布者信息
-                    publisher_info = self.ros_node.get_publishers_info_by_topic(topic_name)
-                    
-                    # 检查是否有来自指定节点的发布者
-                    for info in publisher_info:
-                        if info.node_name == node_name:
-                            publishers.append(topic_name)
-                            break
-                            
-                except Exception as e:
-                    logger.debug(f"Error getting publisher info for {topic_name}: {e}")
-                    continue
-            
-            return publishers
-            
-        except Exception as e:
-            logger.error(f"Failed to get publishers for {node_name}: {e}")
-            return []
-    
-    async def _get_node_subscribers(self, node_name: str) -> List[str]:
-        """获取节点订阅的主题"""
-        try:
-            subscribers = []
-            topic_names_and_types = self.ros_node.get_topic_names_and_types()
-            
-            for topic_name, _ in topic_names_and_types:
-                try:
-                    # 获取主题的订阅者信息
-                    subscriber_info = self.ros_node.get_subscriptions_info_by_topic(topic_name)
-                    
-                    # 检查是否有来自指定节点的订阅者
-                    for info in subscriber_info:
-                        if info.node_name == node_name:
-                            subscribers.append(topic_name)
-                            break
-                            
-                except Exception as e:
-                    logger.debug(f"Error getting subscriber info for {topic_name}: {e}")
-                    continue
-            
-            return subscribers
-            
-        except Exception as e:
-            logger.error(f"Failed to get subscribers for {node_name}: {e}")
-            return []
-    
-    async def _get_node_services(self, node_name: str) -> List[str]:
-        """获取节点提供的服务"""
-        try:
-            services = []
-            service_names_and_types = self.ros_node.get_service_names_and_types()
-            
-            for service_name, _ in service_names_and_types:
-                # 简单的启发式方法：如果服务名包含节点名，则认为是该节点提供的
-                # 更准确的方法需要使用ROS2的服务发现机制
-                if node_name.replace('/', '') in service_name:
-                    services.append(service_name)
-            
-            return services
-            
-        except Exception as e:
-            logger.error(f"Failed to get services for {node_name}: {e}")
-            return []
+        for node_name, namespace in snapshot.node_namespaces.items():
+            try:
+                node_topology = NodeTopology(
+                    node_name=node_name,
+                    namespace=namespace,
+                    node_type="node",
+                    published_topics=snapshot.node_publishers.get(node_name, []),
+                    subscribed_topics=snapshot.node_subscribers.get(node_name, []),
+                    services=snapshot.node_services.get(node_name, []),
+                    actions=[],  # TODO: 添加action分析
+                    is_active=True
+                )
+                
+                nodes.append(node_topology)
+                
+            except Exception as e:
+                logger.warning(f"Failed to analyze node {node_name}: {e}")
+                continue
+        
+        return nodes
     
-    async def _analyze_topic_connections(self) -> List[TopicConnection]:
+    def _analyze_topic_connections(self, snapshot: GraphSnapshot) -> List[TopicConnection]:
         """分析主题连接"""
         connections = []
         
-        try:
-            topic_names_and_types = self.ros_node.get_topic_names_and_types()
-            
-            for topic_name, topic_types in topic_names_and_types:
-                try:
-                    message_type = topic_types[0] if topic_types else "unknown"
-                    
-                    # 获取发布者和订阅者
-                    publishers = await self._get_topic_publishers(topic_name)
-                    subscribers = await self._get_topic_subscribers(topic_name)
-                    
-                    connection_count = len(publishers) * len(subscribers)
-                    
-                    connection = TopicConnection(
-                        topic_name=topic_name,
-                        message_type=message_type,
-                        publishers=publishers,
-                        subscribers=subscribers,
-                        connection_count=connection_count
-                    )
-                    
-                    connections.append(connection)
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to analyze topic {topic_name}: {e}")
-                    continue
+        for topic_name, message_type in snapshot.topic_types.items():
+            publishers = snapshot.topic_publishers.get(topic_name, [])
+            subscribers = snapshot.topic_subscribers.get(topic_name, [])
             
-            return connections
-            
-        except Exception as e:
-            logger.error(f"Failed to analyze topic connections: {e}")
-            return []
-    
-    async def _get_topic_publishers(self, topic_name: str) -> List[str]:
-        """获取主题的发布者节点"""
-        try:
-            publisher_info = self.ros_node.get_publishers_info_by_topic(topic_name)
-            return [info.node_name for info in publisher_info]
-        except Exception as e:
-            logger.debug(f"Error getting publishers for {topic_name}: {e}")
-            return []
-    
-    async def _get_topic_subscribers(self, topic_name: str) -> List[str]:
-        """获取主题的订阅者节点"""
-        try:
-            subscriber_info = self.ros_node.get_subscriptions_info_by_topic(topic_name)
-            return [info.node_name for info in subscriber_info]
-        except Exception as e:
-            logger.debug(f"Error getting subscribers for {topic_name}: {e}")
-            return []
+            connections.append(TopicConnection(
+                topic_name=topic_name,
+                message_type=message_type,
+                publishers=publishers,
+                subscribers=subscribers,
+                connection_count=len(publishers) * len(subscribers)
+            ))
+        
+        return connections
     
+    def _build_indexes(self, nodes: List[NodeTopology], connections: List[TopicConnection]):
+        """构建节点、主题与命名空间索引"""
+        self.node_index = {node.node_name: node for node in nodes}
+        self.topic_index = {conn.topic_name: conn for conn in connections}
+        namespace_index = defaultdict(list)
+        for node in nodes:
+            namespace_index[node.namespace].append(node.node_name)
+        self.namespace_index = dict(namespace_index)
+
+    def _nodes_in_namespace(self, namespace: str) -> Set[str]:
+        """命名空间前缀匹配（/a 匹配 /a 与 /a/b，不匹配 /ab）"""
+        prefix = namespace.rstrip('/')
+        if not prefix:
+            return set(self.node_index)
+        selected = set()
+        for node_namespace, node_names in self.namespace_index.items():
+            if node_namespace == prefix or node_namespace.startswith(prefix + '/'):
+                selected.update(node_names)
+        return selected
+
+    def extract_subgraph(self, namespace: Optional[str] = None, root: Optional[str] = None,
+                         depth: int = 1, excluded_topics: Iterable[str] = ()) -> Optional[SystemTopology]:
+        """从邻接索引中提取子图
+
+        - namespace: 只保留命名空间前缀匹配的节点
+        - root: 节点或主题名，取其 depth 跳邻域（一跳 = 节点经一个主题到达另一个节点）
+        - excluded_topics: 不参与连接的主题，如 /rosout、/parameter_events
+
+        返回的主题只保留子图内的发布者/订阅者；root 不存在时返回 None
+        """
+        excluded = set(excluded_topics)
+        allowed = self._nodes_in_namespace(namespace) if namespace else None
+
+        if root is None:
+            selected = allowed if allowed is not None else set(self.node_index)
+        else:
+            if root in self.node_index:
+                frontier = {root}
+            elif root in self.topic_index:
+                conn = self.topic_index[root]
+                frontier = set(conn.publishers) | set(conn.subscribers)
+            else:
+                return None
+            if allowed is not None:
+                frontier &= allowed
+            selected = set(frontier)
+
+            for _ in range(depth):
+                reached = set()
+                for node_name in frontier:
+                    node = self.node_index.get(node_name)
+                    if node is None:
+                        continue
+                    for topic_name in node.published_topics + node.subscribed_topics:
+                        conn = self.topic_index.get(topic_name)
+                        if conn is None or topic_name in excluded:
+                            continue
+                        reached.update(conn.publishers)
+                        reached.update(conn.subscribers)
+                reached -= selected
+                if allowed is not None:
+                    reached &= allowed
+                if not reached:
+                    break
+                selected |= reached
+                frontier = reached
+
+        nodes = []
+        topic_names = set()
+        for node_name in selected:
+            node = self.node_index.get(node_name)
+            if node is None:
+                continue
+            published = [t for t in node.published_topics if t not in excluded]
+            subscribed = [t for t in node.subscribed_topics if t not in excluded]
+            topic_names.update(published)
+            topic_names.update(subscribed)
+            nodes.append(node.model_copy(update={
+                'published_topics': published,
+                'subscribed_topics': subscribed
+            }))
+        if root in self.topic_index:
+            topic_names.add(root)
+
+        topic_connections = []
+        for topic_name in topic_names:
+            conn = self.topic_index.get(topic_name)
+            if conn is None:
+                continue
+            publishers = [n for n in conn.publishers if n in selected]
+            subscribers = [n for n in conn.subscribers if n in selected]
+            topic_connections.append(conn.model_copy(update={
+                'publishers': publishers,
+                'subscribers': subscribers,
+                'connection_count': len(publishers) * len(subscribers)
+            }))
+
+        nodes.sort(key=lambda node: node.node_name)
+        topic_connections.sort(key=lambda conn: conn.topic_name)
+        return SystemTopology(
+            nodes=nodes,
+            topic_connections=topic_connections,
+            isolated_nodes=self._find_isolated_nodes(nodes, topic_connections),
+            node_count=len(nodes),
+            topic_count=len(topic_connections),
+            connection_count=sum(conn.connection_count for conn in topic_connections),
+            last_updated=self.last_update or datetime.now()
+        )
+
     def _find_isolated_nodes(self, nodes: List[NodeTopology], 
                            connections: List[TopicConnection]) -> List[str]:
         """找到孤立节点（没有发布或订阅任何主题的节点）"""
@@ -252,41 +257,29 @@ class TopologyAnalyzer:
                 isolated.append(node.node_name)
         
         return isolated
-    
-    def _extract_namespace(self, node_name: str) -> str:
-        """从节点名称提取命名空间"""
-        if not node_name.startswith('/'):
-            return '/'
-        
-        parts = node_name.split('/')
-        if len(parts) <= 2:
-            return '/'
-        
-        return '/'.join(parts[:-1])
 
 
 class TopologyService:
     """拓扑服务主类"""
     
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, ros_context: Optional[RosContext] = None):
         self.settings = settings
+        # 共享的 ROS2 节点与执行器（未注入时单独创建）
+        self.ros_context = ros_context or RosContext(settings, 'topology_analyzer')
         self.ros_node: Optional[Node] = None
         self.analyzer: Optional[TopologyAnalyzer] = None
         self.is_running = False
+        # 按 (算法, 是否排除基础设施主题) 缓存的布局计算器
+        self.layout_engines: Dict[Tuple[str, bool], GraphLayoutEngine] = {}
         
     async def start(self):
         """启动拓扑服务"""
         try:
-            if not rclpy.ok():
-                rclpy.init()
-            
-            self.ros_node = Node('topology_analyzer')
-            self.analyzer = TopologyAnalyzer(self.ros_node)
+            self.ros_node = self.ros_context.start()
+            self.analyzer = TopologyAnalyzer(self.ros_node, self.ros_context.graph_cache,
+                                             self.settings.graph_poll_interval)
             self.is_running = True
             
-            # 启动后台任务
-            asyncio.create_task(self._spin_ros_node())
-            
             logger.info("Topology service started")
             
         except Exception as e:
@@ -297,28 +290,15 @@ class TopologyService:
         """停止拓扑服务"""
         try:
             self.is_running = False
-            
-            if self.ros_node:
-                self.ros_node.destroy_node()
-            
-            if rclpy.ok():
-                rclpy.shutdown()
+            # 节点由共享上下文负责销毁
+            self.analyzer = None
+            self.ros_node = None
             
             logger.info("Topology service stopped")
             
         except Exception as e:
             logger.error(f"Error stopping topology service: {e}")
     
-    async def _spin_ros_node(self):
-        """在后台运行ROS节点"""
-        while self.is_running and rclpy.ok():
-            try:
-                rclpy.spin_once(self.ros_node, timeout_sec=0.1)
-                await asyncio.sleep(0.01)
-            except Exception as e:
-                logger.error(f"Error in ROS node spin: {e}")
-                break
-    
     async def get_system_topology(self, use_cache: bool = True) -> SystemTopology:
         """获取系统拓扑"""
         if not self.analyzer:
@@ -326,23 +306,38 @@ class TopologyService:
         
         return await self.analyzer.get_system_topology(use_cache)
     
+    async def get_subgraph(self, namespace: Optional[str] = None, root: Optional[str] = None,
+                           depth: int = 1, exclude_infrastructure: bool = True) -> Optional[SystemTopology]:
+        """获取子图（命名空间过滤、节点/主题的 k 跳邻域）"""
+        await self.get_system_topology()
+        excluded = self.settings.topology_excluded_topics if exclude_infrastructure else ()
+        return self.analyzer.extract_subgraph(namespace, root, depth, excluded)
+    
+    async def get_layout(self, algorithm: str = 'force', exclude_infrastructure: bool = True) -> GraphLayout:
+        """获取预计算的拓扑布局（图版本号不变时直接返回缓存，变化时只布局新增顶点）"""
+        topology = await self.get_system_topology()
+        if exclude_infrastructure:
+            topology = self.analyzer.extract_subgraph(excluded_topics=self.settings.topology_excluded_topics)
+
+        key = (algorithm, exclude_infrastructure)
+        engine = self.layout_engines.get(key)
+        if engine is None:
+            engine = self.layout_engines[key] = GraphLayoutEngine(algorithm)
+        layout = await asyncio.to_thread(engine.update, topology, self.analyzer.topology_version)
+        return GraphLayout(**layout)
+    
     async def get_node_topology(self, node_name: str) -> Optional[NodeTopology]:
         """获取特定节点的拓扑信息"""
-        topology = await self.get_system_topology()
-        
-        for node in topology.nodes:
-            if node.node_name == node_name:
-                return node
-        
-        return None
+        await self.get_system_topology()
+        return self.analyzer.node_index.get(node_name)
     
     async def get_topic_connections(self, topic_name: str = None) -> List[TopicConnection]:
         """获取主题连接信息"""
         topology = await self.get_system_topology()
         
         if topic_name:
-            return [conn for conn in topology.topic_connections 
-                   if conn.topic_name == topic_name]
+            conn = self.analyzer.topic_index.get(topic_name)
+            return [conn] if conn else []
         
         return topology.topic_connections
 
@@ -351,10 +346,11 @@ class TopologyService:
 _topology_service: Optional[TopologyService] = None
 
 
-def get_topology_service(settings: Settings = None) -> TopologyService:
+def get_topology_service(settings: Settings = None,
+                         ros_context: Optional[RosContext] = None) -> TopologyService:
     """获取拓扑服务实例（单例模式）"""
     global _topology_service
     if _topology_service is None and settings:
-        _topology_service = TopologyService(settings)
+        _topology_service = TopologyService(settings, ros_context)
     return _topology_service
 
@@ -4,6 +4,7 @@ pytest 配置文件
 
 import pytest
 import asyncio
+from types import SimpleNamespace
 from typing import AsyncGenerator, Generator
 from unittest.mock import Mock
 
@@ -85,3 +86,68 @@ def sample_message_data():
     return {
         "data": "Hello, ROS2!"
     }
+
+
+class FakeGraphNode:
+    """模拟 rclpy Node 的图查询接口，并统计查询次数
+
+    节点 i 发布主题 j (j % node_count == i)，主题 j 被节点 (j+1) 与 (j+7) 订阅
+    """
+
+    def __init__(self, node_count: int = 500, topic_count: int = 2000):
+        self.nodes = {f"node_{i}": f"/ns{i % 10}" for i in range(node_count)}
+        self.topics = {}
+        node_names = list(self.nodes)
+        for j in range(topic_count):
+            self.topics[f"/ns{j % 10}/topic_{j}"] = (
+                "std_msgs/msg/String",
+                [node_names[j % node_count]],
+                [node_names[(j + 1) % node_count], node_names[(j + 7) % node_count]],
+            )
+        self.calls = 0
+
+    def get_node_names(self):
+        self.calls += 1
+        return list(self.nodes)
+
+    def get_node_names_and_namespaces(self):
+        self.calls += 1
+        return list(self.nodes.items())
+
+    def get_topic_names_and_types(self):
+        self.calls += 1
+        return [(topic, [message_type]) for topic, (message_type, _, _) in self.topics.items()]
+
+    def count_publishers(self, topic):
+        self.calls += 1
+        return len(self.topics[topic][1])
+
+    def count_subscribers(self, topic):
+        self.calls += 1
+        return len(self.topics[topic][2])
+
+    def get_publishers_info_by_topic(self, topic):
+        self.calls += 1
+        return [SimpleNamespace(node_name=name) for name in self.topics.get(topic, (None, [], []))[1]]
+
+    def get_subscriptions_info_by_topic(self, topic):
+        self.calls += 1
+        return [SimpleNamespace(node_name=name) for name in self.topics.get(topic, (None, [], []))[2]]
+
+    def get_service_names_and_types(self):
+        self.calls += 1
+        return [self._parameter_service(name, namespace) for name, namespace in self.nodes.items()]
+
+    def get_service_names_and_types_by_node(self, node_name, namespace):
+        self.calls += 1
+        return [self._parameter_service(node_name, namespace)]
+
+    @staticmethod
+    def _parameter_service(node_name, namespace):
+        return f"{namespace.rstrip('/')}/{node_name}/get_parameters", ["rcl_interfaces/srv/GetParameters"]
+
+
+@pytest.fixture
+def fake_graph_node():
+    """模拟 ROS 图的节点工厂"""
+    return FakeGraphNode
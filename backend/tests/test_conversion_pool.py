@@ -0,0 +1,83 @@
+"""
+消息转换工作池测试
+验证线程池模式在事件循环线程之外执行转换、同一主题按提交顺序发布，以及转换失败不影响后续消息
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.services.conversion_pool import ConversionPool
+
+
+def _convert(sequence, delay):
+    """模拟耗时不同的转换，返回序号与执行线程"""
+    threading.Event().wait(delay)
+    return sequence, threading.get_ident()
+
+
+async def _run(mode: str, frames: int = 12):
+    pool = ConversionPool(mode, max_workers=2)
+    pool.start()
+    published = {'/points_a': [], '/points_b': []}
+    threads = set()
+
+    for sequence in range(frames):
+        topic = '/points_a' if sequence % 2 == 0 else '/points_b'
+
+        async def on_done(result, topic=topic):
+            sequence, thread_id = result
+            published[topic].append(sequence)
+            threads.add(thread_id)
+
+        # 先提交的消息转换更慢，检验发布顺序不受完成顺序影响
+        await pool.submit(topic, _convert, (sequence, 0.002 * (frames - sequence)), on_done)
+
+    await pool.stop()
+    return pool, published, threads
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["inline", "thread"])
+async def test_topic_order_preserved(mode):
+    """同主题消息按提交顺序发布，线程池模式不在事件循环线程中转换"""
+    pool, published, threads = await _run(mode)
+    assert published['/points_a'] == list(range(0, 12, 2))
+    assert published['/points_b'] == list(range(1, 12, 2))
+    assert pool.completed == 12 and pool.failed == 0 and pool.pending == 0
+
+    loop_thread = threading.get_ident()
+    if mode == 'inline':
+        assert threads == {loop_thread}
+    else:
+        assert loop_thread not in threads
+
+
+def _maybe_fail(sequence):
+    if sequence == 1:
+        raise ValueError("bad message")
+    return sequence
+
+
+@pytest.mark.asyncio
+async def test_failed_conversion_does_not_block_topic():
+    """单条消息转换失败时计入 failed，同主题后续消息照常发布"""
+    pool = ConversionPool('thread', max_workers=2)
+    pool.start()
+    published = []
+
+    async def on_done(result):
+        published.append(result)
+
+    for sequence in range(4):
+        await pool.submit('/scan', _maybe_fail, (sequence,), on_done)
+    await pool.stop()
+
+    assert published == [0, 2, 3]
+    assert pool.completed == 3 and pool.failed == 1 and pool.pending == 0
+
+
+def test_invalid_mode_falls_back_to_thread():
+    """未知执行模式回退为线程池"""
+    assert ConversionPool('gpu').mode == 'thread'
@@ -0,0 +1,68 @@
+"""
+图增量推送测试
+验证 500 节点系统中单次变化的增量远小于完整快照，且应用增量后可还原出新版本的图
+"""
+
+import json
+
+from app.services.graph_snapshot import GraphCache, GraphSnapshot, delta_message, snapshot_message
+
+
+def _apply_delta(state: dict, delta: dict) -> dict:
+    """按客户端方式将增量应用到本地图"""
+    assert delta['previous_version'] == state['version']
+    nodes = {node['name']: node for node in state['nodes']}
+    topics = {topic['name']: topic for topic in state['topics']}
+    edges = {(edge['node'], edge['topic'], edge['direction']) for edge in state['edges']}
+
+    for name in delta['nodes']['removed']:
+        nodes.pop(name, None)
+    for node in delta['nodes']['added'] + delta['nodes']['updated']:
+        nodes[node['name']] = node
+    for name in delta['topics']['removed']:
+        topics.pop(name, None)
+    for topic in delta['topics']['added'] + delta['topics']['updated']:
+        topics[topic['name']] = topic
+    edges -= {(edge['node'], edge['topic'], edge['direction']) for edge in delta['edges']['removed']}
+    edges |= {(edge['node'], edge['topic'], edge['direction']) for edge in delta['edges']['added']}
+
+    return {'version': delta['version'], 'nodes': nodes, 'topics': topics, 'edges': edges}
+
+
+def _expected_snapshot(ros_node) -> GraphSnapshot:
+    """直接由模拟节点的数据构建期望的图快照（不经过图查询）"""
+    snapshot = GraphSnapshot()
+    snapshot.node_namespaces = dict(ros_node.nodes)
+    snapshot.node_services = {name: [ros_node._parameter_service(name, namespace)[0]]
+                              for name, namespace in ros_node.nodes.items()}
+    snapshot.add_topics((topic, message_type, publishers, subscribers)
+                        for topic, (message_type, publishers, subscribers) in ros_node.topics.items())
+    return snapshot
+
+
+def test_graph_delta_size(fake_graph_node):
+    """单个节点上线时，增量比完整快照小几个数量级，且应用后与新快照一致"""
+    ros_node = fake_graph_node(node_count=500, topic_count=2000)
+    cache = GraphCache(ros_node)
+    cache.refresh()
+    previous = cache.snapshot
+    full = snapshot_message(previous)
+
+    # 新节点上线：发布一个新主题并订阅一个已有主题
+    ros_node.nodes['camera_driver'] = '/sensors'
+    ros_node.topics['/sensors/image_raw'] = ('sensor_msgs/msg/Image', ['camera_driver'], ['node_3'])
+    message_type, publishers, subscribers = ros_node.topics['/ns0/topic_0']
+    ros_node.topics['/ns0/topic_0'] = (message_type, publishers, subscribers + ['camera_driver'])
+
+    changes = cache.refresh()
+    delta = delta_message(previous, cache.snapshot, changes)
+
+    full_bytes = len(json.dumps(full))
+    delta_bytes = len(json.dumps(delta))
+    assert delta_bytes * 100 < full_bytes
+
+    state = _apply_delta(full, delta)
+    expected = snapshot_message(_expected_snapshot(ros_node))
+    assert state['nodes'] == {node['name']: node for node in expected['nodes']}
+    assert state['topics'] == {topic['name']: topic for topic in expected['topics']}
+    assert state['edges'] == {(edge['node'], edge['topic'], edge['direction']) for edge in expected['edges']}
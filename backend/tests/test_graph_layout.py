@@ -0,0 +1,39 @@
+"""
+拓扑布局测试
+验证图版本不变时命中缓存、图变化后只布局新增顶点，且已有顶点的坐标保持不变
+"""
+
+import numpy as np
+import pytest
+
+from app.services.graph_layout import GraphLayoutEngine
+from app.services.topology_service import TopologyAnalyzer
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", ["layered", "force"])
+async def test_incremental_layout(fake_graph_node, algorithm):
+    """图版本不变时命中缓存，新增节点时只计算新顶点"""
+    ros_node = fake_graph_node(200, 1000)
+    analyzer = TopologyAnalyzer(ros_node)
+    topology = await analyzer.get_system_topology()
+    engine = GraphLayoutEngine(algorithm)
+
+    layout = engine.update(topology, analyzer.topology_version)
+    assert layout['laid_out'] == 1200
+    assert len(layout['nodes']) == 200 and len(layout['topics']) == 1000
+    assert all(np.isfinite(position).all() for position in layout['nodes'].values())
+    assert engine.update(topology, analyzer.topology_version) is layout
+
+    # 新节点上线：发布一个新主题并订阅一个已有主题
+    ros_node.nodes['camera_driver'] = '/sensors'
+    ros_node.topics['/sensors/image'] = ('sensor_msgs/msg/Image', ['camera_driver'], ['node_3'])
+    ros_node.topics['/ns0/topic_0'][2].append('camera_driver')
+    topology = await analyzer.get_system_topology(use_cache=False)
+
+    updated = engine.update(topology, analyzer.topology_version)
+    assert updated['version'] == layout['version'] + 1
+    assert updated['laid_out'] == 2
+    assert {name: updated['nodes'][name] for name in layout['nodes']} == layout['nodes']
+    assert {name: updated['topics'][name] for name in layout['topics']} == layout['topics']
+    assert 'camera_driver' in updated['nodes'] and '/sensors/image' in updated['topics']
@@ -0,0 +1,59 @@
+"""
+消息接收队列测试
+验证订阅销毁时丢弃该主题的待处理消息与缓冲区，重新订阅后不会收到旧消息
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import Settings
+from app.services.ingest_queue import IngestQueue
+from app.services.rosbridge import RosbridgeService
+
+
+@pytest.mark.asyncio
+async def test_discard_removes_buffer_and_round_robin_entry():
+    """discard 清除主题缓冲区、轮转位置与计数，其余主题不受影响"""
+    queue = IngestQueue(maxsize=10, topic_modes={'/scan': 'ring(3)'})
+    for i in range(4):
+        queue.put_nowait('/odom', i)
+        queue.put_nowait('/scan', i)
+    assert queue.qsize() == 7
+
+    assert queue.discard('/odom') == 4
+    assert queue.discard('/missing') == 0
+    assert '/odom' not in queue._buffers and '/odom' not in queue._ready
+    assert queue.qsize() == 3
+
+    # fifo 容量已释放
+    for i in range(10):
+        queue.put_nowait('/tf', i)
+    with pytest.raises(asyncio.QueueFull):
+        queue.put_nowait('/tf', 10)
+
+    assert [await queue.get() for _ in range(2)] == [('/scan', 1), ('/tf', 0)]
+    assert queue.discard('/scan') == 2 and queue.discard('/tf') == 9
+    assert queue.qsize() == 0 and not queue._ready
+
+
+class FakeSubscriptionNode:
+    def destroy_subscription(self, subscription):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_destroyed_subscription_drops_pending_messages():
+    """订阅销毁后丢弃待处理消息，销毁前已排入事件循环的回调也不再入队"""
+    service = RosbridgeService(Settings(subscription_linger=0.0))
+    service.node = FakeSubscriptionNode()
+    service.message_queue = IngestQueue()
+    service.subscribers['/odom'] = '/odom'
+
+    service._enqueue_message('/odom', 'stale_1')
+    service._enqueue_message('/odom', 'stale_2')
+    service._destroy_subscriber('/odom')
+    assert service.message_queue.qsize() == 0 and '/odom' not in service.message_queue._buffers
+
+    service._enqueue_message('/odom', 'late')
+    assert service.message_queue.qsize() == 0
@@ -0,0 +1,182 @@
+"""
+消息转换测试
+对比逐值反射转换与按消息类型编译的转换函数，在 Odometry、MarkerArray 与 TFMessage 上
+验证两者输出一致
+"""
+
+import array
+
+import numpy as np
+import pytest
+
+from app.services.message_converter import MessageConverter
+
+geometry_msgs = pytest.importorskip("geometry_msgs.msg")
+nav_msgs = pytest.importorskip("nav_msgs.msg")
+tf2_msgs = pytest.importorskip("tf2_msgs.msg")
+visualization_msgs = pytest.importorskip("visualization_msgs.msg")
+std_msgs = pytest.importorskip("std_msgs.msg")
+builtin_interfaces = pytest.importorskip("builtin_interfaces.msg")
+
+
+def _legacy_message_to_dict(msg) -> dict:
+    """原实现：每次调用导入消息模块，并对每个字段做 isinstance 链判断"""
+    from builtin_interfaces.msg import Time, Duration
+    from geometry_msgs.msg import Point, Quaternion, Pose, PoseWithCovariance
+    from std_msgs.msg import Header
+
+    result = {}
+    for slot in msg.__slots__:
+        if slot == '_check_fields':  # Iron 起的非字段槽位
+            continue
+        value = getattr(msg, slot)
+        if isinstance(value, (Time, Duration)):
+            result[slot] = {'sec': int(value.sec), 'nanosec': int(value.nanosec)}
+        elif isinstance(value, Header):
+            result[slot] = {
+                'stamp': {'sec': int(value.stamp.sec), 'nanosec': int(value.stamp.nanosec)},
+                'frame_id': str(value.frame_id)
+            }
+        elif isinstance(value, Point):
+            result[slot] = {'x': float(value.x), 'y': float(value.y), 'z': float(value.z)}
+        elif isinstance(value, Quaternion):
+            result[slot] = {'x': float(value.x), 'y': float(value.y), 'z': float(value.z), 'w': float(value.w)}
+        elif isinstance(value, Pose):
+            result[slot] = {
+                'position': {'x': float(value.position.x), 'y': float(value.position.y), 'z': float(value.position.z)},
+                'orientation': {'x': float(value.orientation.x), 'y': float(value.orientation.y),
+                                'z': float(value.orientation.z), 'w': float(value.orientation.w)}
+            }
+        elif isinstance(value, PoseWithCovariance):
+            result[slot] = {
+                'pose': {
+                    'position': {'x': float(value.pose.position.x), 'y': float(value.pose.position.y),
+                                 'z': float(value.pose.position.z)},
+                    'orientation': {'x': float(value.pose.orientation.x), 'y': float(value.pose.orientation.y),
+                                    'z': float(value.pose.orientation.z), 'w': float(value.pose.orientation.w)}
+                },
+                'covariance': [float(c) for c in value.covariance]
+            }
+        elif isinstance(value, np.ndarray):
+            result[slot] = value.tolist() if value.dtype == np.uint8 else value.astype(float).tolist()
+        elif hasattr(value, '__slots__'):
+            result[slot] = _legacy_message_to_dict(value)
+        elif isinstance(value, list):
+            result[slot] = [
+                _legacy_message_to_dict(item) if hasattr(item, '__slots__') else
+                float(item) if isinstance(item, (int, float, np.number)) else item
+                for item in value
+            ]
+        elif isinstance(value, (int, float, np.number)):
+            result[slot] = float(value) if isinstance(value, (float, np.floating)) else int(value)
+        else:
+            result[slot] = str(value) if value is not None else None
+    return result
+
+
+def _header(frame_id: str):
+    return std_msgs.Header(stamp=builtin_interfaces.Time(sec=100, nanosec=5), frame_id=frame_id)
+
+
+def _odometry():
+    msg = nav_msgs.Odometry(header=_header('odom'), child_frame_id='base_link')
+    msg.pose.pose.position.x = 1.5
+    msg.pose.covariance[:] = np.arange(36, dtype=np.float64)
+    msg.twist.twist.linear.x = 0.3
+    return msg
+
+
+def _marker_array(count: int = 50):
+    markers = []
+    for i in range(count):
+        marker = visualization_msgs.Marker(header=_header('map'), ns='obstacles', id=i, frame_locked=True)
+        marker.points = [geometry_msgs.Point(x=float(j), y=1.0, z=0.0) for j in range(20)]
+        marker.colors = [std_msgs.ColorRGBA(r=1.0, g=0.0, b=0.0, a=1.0) for _ in range(20)]
+        markers.append(marker)
+    return visualization_msgs.MarkerArray(markers=markers)
+
+
+def _tf_message(count: int = 30):
+    return tf2_msgs.TFMessage(transforms=[
+        geometry_msgs.TransformStamped(header=_header('base_link'), child_frame_id=f"link_{i}")
+        for i in range(count)
+    ])
+
+
+@pytest.mark.parametrize("factory", [_odometry, _marker_array, _tf_message])
+def test_compiled_converter_matches_reflective(factory):
+    """编译后的转换函数输出与原逐值反射实现一致"""
+    converter = MessageConverter()
+    msg = factory()
+    assert converter.message_to_dict(msg) == _legacy_message_to_dict(msg)
+
+
+def test_sequence_and_unknown_fields():
+    """数值序列保持为列表，大块 8 位整型数据保留原始字节"""
+    converter = MessageConverter()
+    grid = nav_msgs.OccupancyGrid(header=_header('map'), data=array.array('b', [0, 100, -1] * 1000))
+    result = converter.message_to_dict(grid)
+    assert result['_data'] == grid.data.tobytes() and result['_data_encoding'] == 'base64'
+    assert result['_header'] == {'stamp': {'sec': 100, 'nanosec': 5}, 'frame_id': 'map'}
+    assert result['_info']['_origin']['position'] == {'x': 0.0, 'y': 0.0, 'z': 0.0}
+
+    sensor_msgs = pytest.importorskip("sensor_msgs.msg")
+    scan = sensor_msgs.LaserScan(header=_header('laser'), ranges=array.array('f', [0.5, 1.0, 2.0]))
+    assert converter.message_to_dict(scan)['_ranges'] == [0.5, 1.0, 2.0]
+
+
+def test_typed_arrays_packed():
+    """typed_arrays 订阅时数值数组输出为小端序字节块与 dtype，JSON 帧为 Base64，二进制帧为原始字节"""
+    import base64
+    import json
+
+    from app.models.ros import SubscriptionOptions
+    from app.services.message_frame import EncodedFrame, cbor2
+
+    sensor_msgs = pytest.importorskip("sensor_msgs.msg")
+    converter = MessageConverter()
+    options = SubscriptionOptions(typed_arrays=True)
+
+    ranges = np.linspace(0.1, 30.0, 1081, dtype=np.float32)
+    scan = sensor_msgs.LaserScan(header=_header('laser'), ranges=array.array('f', ranges.tobytes()))
+    result = converter.message_to_dict(scan, options)
+    assert result['_ranges_dtype'] == 'float32' and result['_intensities'] == b''
+    decoded = json.loads(EncodedFrame({'op': 'publish', 'msg': result}).encode('json'))
+    assert np.array_equal(np.frombuffer(base64.b64decode(decoded['msg']['_ranges']), dtype='<f4'), ranges)
+    if cbor2 is not None:
+        decoded = cbor2.loads(EncodedFrame({'op': 'publish', 'msg': result}).encode('cbor'))
+        assert decoded['msg']['_ranges_encoding'] == 'binary'
+        assert np.array_equal(np.frombuffer(decoded['msg']['_ranges'], dtype='<f4'), ranges)
+
+    odom = converter.message_to_dict(_odometry(), options)
+    assert odom['_pose']['covariance_dtype'] == 'float64'
+    assert np.array_equal(np.frombuffer(odom['_pose']['covariance'], dtype='<f8'), np.arange(36))
+    assert odom['_twist']['_covariance_dtype'] == 'float64'
+    assert options.conversion_key() is not None
+
+    # 2000x2000 栅格地图打包为字节块而不是数字列表
+    grid = nav_msgs.OccupancyGrid(header=_header('map'), data=array.array('b', bytes(4_000_000)))
+    packed = converter.message_to_dict(grid, options)
+    assert len(packed['_data']) == len(grid.data) and packed['_data_dtype'] == 'int8'
+
+
+class _IronStyleStamped:
+    """Iron 起 rosidl 生成的类在 __slots__ 中额外带有 _check_fields"""
+
+    __slots__ = ['_header', '_value', '_check_fields']
+
+    def __init__(self):
+        self._header = _header('odom')
+        self._value = 2.5
+        self._check_fields = True
+
+    @classmethod
+    def get_fields_and_field_types(cls):
+        return {'header': 'std_msgs/Header', 'value': 'double'}
+
+
+def test_fields_paired_with_slots_by_name():
+    """额外的非字段槽位不影响按字段类型编译，且不出现在输出中"""
+    result = MessageConverter().message_to_dict(_IronStyleStamped())
+    # header 按 std_msgs/Header 字段类型输出扁平结构（按运行时类型转换时会输出 _stamp/_frame_id）
+    assert result == {'_header': {'stamp': {'sec': 100, 'nanosec': 5}, 'frame_id': 'odom'}, '_value': 2.5}
@@ -0,0 +1,162 @@
+"""
+消息帧编码与分发测试
+验证订阅者从 1 增长到 100 时每条消息只编码一次，分发只访问实际订阅者
+"""
+
+import asyncio
+import base64
+import json
+
+import pytest
+
+from app.services import message_frame
+from app.services.message_frame import EncodedFrame
+from app.services.rosbridge import ClientSendQueue, ConnectionManager
+
+
+class FakeWebSocket:
+    """只记录发送内容的 WebSocket 替身"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+
+def _make_pointcloud_message(topic: str, payload_size: int = 256 * 1024) -> dict:
+    """构造带 Base64 点云负载的 publish 消息"""
+    return {
+        'op': 'publish',
+        'topic': topic,
+        'msg': {
+            'header': {'stamp': {'sec': 0, 'nanosec': 0}, 'frame_id': 'map'},
+            'data': base64.b64encode(bytes(payload_size)).decode('ascii'),
+            'data_encoding': 'base64',
+        }
+    }
+
+
+async def _make_manager(subscriber_count: int, topic: str) -> ConnectionManager:
+    manager = ConnectionManager(max_connections=subscriber_count, send_queue_size=1000)
+    for i in range(subscriber_count):
+        client_id = f"client_{i}"
+        await manager.connect(FakeWebSocket(), client_id)
+        manager.add_subscription(client_id, topic)
+    return manager
+
+
+async def _drain(manager: ConnectionManager):
+    """等待所有客户端写任务发送完队列中的帧"""
+    while any(len(queue) for queue in manager.send_queues.values()):
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_encode_once_across_subscribers(monkeypatch):
+    """编码次数不随订阅者数量增长"""
+    topic = '/points'
+    frames_per_run = 20
+    real_dumps = json.dumps
+
+    for subscriber_count in (1, 10, 50, 100):
+        calls = 0
+
+        def counting_dumps(obj, *args, **kwargs):
+            nonlocal calls
+            calls += 1
+            return real_dumps(obj, *args, **kwargs)
+
+        monkeypatch.setattr(message_frame.json, 'dumps', counting_dumps)
+        manager = await _make_manager(subscriber_count, topic)
+
+        for _ in range(frames_per_run):
+            frame = EncodedFrame(_make_pointcloud_message(topic))
+            assert await manager.broadcast(frame)
+            # 同一帧经由 send_to_client 再次发送也不会重新编码
+            await manager.send_to_client('client_0', frame)
+
+        await _drain(manager)
+        monkeypatch.setattr(message_frame.json, 'dumps', real_dumps)
+
+        assert calls == frames_per_run
+        for websocket in manager.active_connections.values():
+            assert len(websocket.sent) >= frames_per_run
+        for client_id in list(manager.active_connections):
+            manager.disconnect(client_id)
+
+
+@pytest.mark.asyncio
+async def test_fanout_visits_only_subscribers():
+    """分发只访问订阅该主题的客户端，与总连接数无关"""
+    connection_count = 1000
+    manager = ConnectionManager(max_connections=connection_count, send_queue_size=10)
+    for i in range(connection_count):
+        client_id = f"client_{i}"
+        await manager.connect(FakeWebSocket(), client_id)
+        # 每个客户端订阅 20 个其他主题，只有 5 个客户端订阅 /points
+        for j in range(20):
+            manager.add_subscription(client_id, f"/topic_{(i + j) % 100}")
+    for i in range(5):
+        manager.add_subscription(f"client_{i}", '/points')
+
+    visited = []
+    for client_id, queue in manager.send_queues.items():
+        def counting_put(frame, encoding, queue_length=0, client_id=client_id, real_put=queue.put):
+            visited.append(client_id)
+            real_put(frame, encoding, queue_length)
+        queue.put = counting_put
+
+    frame = EncodedFrame({'op': 'publish', 'topic': '/points', 'msg': {'data': 1}})
+    for _ in range(3):
+        assert await manager.broadcast(frame)
+    assert manager.subscribers('/points') == {f"client_{i}" for i in range(5)}
+    assert sorted(visited) == sorted(list(manager.subscribers('/points')) * 3)
+
+    manager.disconnect('client_0')
+    assert 'client_0' not in manager.subscribers('/points')
+    for client_id in list(manager.active_connections):
+        manager.disconnect(client_id)
+    assert not manager.topic_subscribers
+
+
+@pytest.mark.parametrize("policy,queue_length", [("drop_oldest", 2), ("latest_per_topic", 0), ("drop_oldest", 0)])
+def test_send_queue_bounded_with_stalled_writer(policy, queue_length):
+    """写任务停滞时，被丢弃的帧不会在队列内部持续堆积"""
+    queue = ClientSendQueue(maxsize=10, policy=policy)
+    for seq in range(100_000):
+        queue.put(EncodedFrame({'op': 'publish', 'topic': '/scan', 'msg': {'seq': seq}}), 'json',
+                  queue_length=queue_length)
+    assert len(queue) <= 10
+    assert len(queue._items) <= 2 * queue.maxsize
+    assert queue.dropped == 100_000 - len(queue)
+
+
+def test_json_wire_format_for_binary_fields():
+    """小点云/小图像保持整数列表 (data_encoding=array)，大块 int8 数据附带 dtype 以保留符号"""
+    import array
+
+    sensor_msgs = pytest.importorskip("sensor_msgs.msg")
+    nav_msgs = pytest.importorskip("nav_msgs.msg")
+    from app.services.message_converter import MessageConverter
+
+    converter = MessageConverter()
+    cloud = sensor_msgs.PointCloud2(width=10, height=1, point_step=16, row_step=160,
+                                    data=array.array('B', range(160)))
+    cloud.fields = [sensor_msgs.PointField(name=name, offset=4 * i, datatype=7, count=1)
+                    for i, name in enumerate('xyz')]
+    result = json.loads(EncodedFrame({'op': 'publish', 'msg': converter.message_to_dict(cloud)}).text)['msg']
+    assert result['data'] == list(range(160)) and result['data_encoding'] == 'array'
+
+    image = sensor_msgs.Image(height=4, width=4, encoding='rgb8', step=12, data=array.array('B', range(48)))
+    result = json.loads(EncodedFrame({'op': 'publish', 'msg': converter.message_to_dict(image)}).text)['msg']
+    assert result['data'] == list(range(48)) and result['data_encoding'] == 'array'
+
+    grid = nav_msgs.OccupancyGrid(data=array.array('b', [-1, 0, 100] * 1000))
+    result = json.loads(EncodedFrame({'op': 'publish', 'msg': converter.message_to_dict(grid)}).text)['msg']
+    decoded = array.array('b', base64.b64decode(result['_data']))
+    assert result['_data_dtype'] == 'int8' and decoded.tolist() == grid.data.tolist()
@@ -0,0 +1,143 @@
+"""
+点云采样与编码测试
+验证 NumPy 步长视图采样与逐点 Python 循环结果一致，以及各降采样/编码模式的每帧字节数
+"""
+
+import base64
+import zlib
+
+import numpy as np
+import pytest
+
+from app.services import pointcloud
+from app.services.pointcloud import quantize_pointcloud, reduce_pointcloud, stride_sample
+
+POINT_STEP = 16  # x, y, z, intensity (float32)
+MAX_POINTS = 50000
+
+
+def _make_cloud(point_count: int) -> bytes:
+    """生成 XYZI float32 合成点云的原始字节"""
+    rng = np.random.default_rng(0)
+    return rng.random((point_count, 4), dtype=np.float32).tobytes()
+
+
+def _loop_sample(data: bytes, point_step: int, total_points: int, sample_step: int) -> bytes:
+    """原逐点循环实现，作为参考结果"""
+    sampled_data = []
+    for i in range(0, total_points, sample_step):
+        byte_start = i * point_step
+        byte_end = byte_start + point_step
+        if byte_end <= len(data):
+            sampled_data.extend(data[byte_start:byte_end])
+    return bytes(sampled_data)
+
+
+@pytest.mark.parametrize("point_count", [100_000, 500_000, 2_000_000])
+def test_stride_sample_matches_loop(point_count):
+    """NumPy 采样与原逐点循环实现结果一致"""
+    data = _make_cloud(point_count)
+    sample_step = max(1, point_count // MAX_POINTS)
+
+    expected = _loop_sample(data, POINT_STEP, point_count, sample_step)
+    assert stride_sample(data, POINT_STEP, point_count, sample_step) == expected
+
+
+def _make_ouster_like_cloud(point_count: int):
+    """生成带 ring/t 与填充字段的合成点云 (point_step = 32)"""
+    dtype = np.dtype({
+        'names': ['x', 'y', 'z', 'intensity', 't', 'ring'],
+        'formats': ['<f4', '<f4', '<f4', '<f4', '<u4', '<u2'],
+        'offsets': [0, 4, 8, 16, 20, 24],
+        'itemsize': 32,
+    })
+    rng = np.random.default_rng(0)
+    cloud = np.zeros(point_count, dtype=dtype)
+    cloud['x'] = rng.random(point_count, dtype=np.float32) * 50
+    cloud['y'] = rng.random(point_count, dtype=np.float32) * 50
+    cloud['z'] = rng.random(point_count, dtype=np.float32) * 5
+    cloud['intensity'] = rng.random(point_count, dtype=np.float32) * 100
+    fields = [
+        {'name': 'x', 'offset': 0, 'datatype': 7, 'count': 1},
+        {'name': 'y', 'offset': 4, 'datatype': 7, 'count': 1},
+        {'name': 'z', 'offset': 8, 'datatype': 7, 'count': 1},
+        {'name': 'intensity', 'offset': 16, 'datatype': 7, 'count': 1},
+        {'name': 't', 'offset': 20, 'datatype': 6, 'count': 1},
+        {'name': 'ring', 'offset': 24, 'datatype': 4, 'count': 1},
+    ]
+    return cloud.tobytes(), fields
+
+
+def test_reduction_modes_wire_size():
+    """字段投影与体素滤波显著减少每帧字节数"""
+    point_count = 500_000
+    budget = 100_000
+    data, fields = _make_ouster_like_cloud(point_count)
+
+    results = {'stride': len(stride_sample(data, 32, point_count, max(1, point_count // budget)))}
+    for name, kwargs in (
+        ('project xyzi', {'field_names': ['x', 'y', 'z', 'intensity']}),
+        ('project xyzi f16', {'field_names': ['x', 'y', 'z', 'intensity'], 'output_dtype': 'float16'}),
+        ('voxel 0.5m', {'voxel_size': 0.5}),
+    ):
+        reduced, _, reduced_points, _ = reduce_pointcloud(data, fields, 32, point_count, max_points=budget, **kwargs)
+        results[name] = len(reduced)
+        assert reduced_points <= budget
+
+    assert results['project xyzi'] < results['stride']
+    assert results['project xyzi f16'] < results['project xyzi']
+    assert results['voxel 0.5m'] < results['stride']
+
+
+def _make_scan_cloud(rings: int = 64, columns: int = 800):
+    """生成按扫描线排列的 XYZI 点云（类似旋转激光雷达，相邻点坐标连续）"""
+    azimuth = np.linspace(0, 2 * np.pi, columns, endpoint=False, dtype=np.float32)
+    elevation = np.linspace(-0.4, 0.4, rings, dtype=np.float32)[:, None]
+    distance = 10 + 2 * np.sin(azimuth * 3)
+    cloud = np.empty((rings, columns, 4), dtype=np.float32)
+    cloud[..., 0] = distance * np.cos(azimuth) * np.cos(elevation)
+    cloud[..., 1] = distance * np.sin(azimuth) * np.cos(elevation)
+    cloud[..., 2] = distance * np.sin(elevation)
+    cloud[..., 3] = 50 + 20 * np.cos(azimuth * 7)
+    fields = [{'name': name, 'offset': i * 4, 'datatype': 7, 'count': 1}
+              for i, name in enumerate(('x', 'y', 'z', 'intensity'))]
+    return cloud.tobytes(), fields, rings * columns
+
+
+def _decode_quantized(payload: bytes, header: dict, point_count: int) -> np.ndarray:
+    """按量化参数头解码紧凑格式（与前端解码逻辑一致）"""
+    if header['compression'] == 'zstd':
+        payload = pointcloud.zstandard.ZstdDecompressor().decompress(payload)
+    elif header['compression'] == 'lz4':
+        payload = pointcloud.lz4_frame.decompress(payload)
+    elif header['compression'] == 'zlib':
+        payload = zlib.decompress(payload)
+
+    xyz_bytes = point_count * 2
+    result = np.empty((point_count, len(header['fields'])), dtype=np.float64)
+    for axis in range(3):
+        deltas = np.frombuffer(payload, dtype=np.uint16, count=point_count, offset=axis * xyz_bytes)
+        quantized = np.cumsum(deltas, dtype=np.uint16).view(np.int16)
+        result[:, axis] = quantized * header['scale'][axis] + header['offset'][axis]
+    if 'intensity' in header['fields']:
+        intensity = np.frombuffer(payload, dtype=np.uint8, count=point_count, offset=3 * xyz_bytes)
+        result[:, 3] = intensity * header['intensity_scale'] + header['intensity_offset']
+    return result
+
+
+def test_quantized_wire_format():
+    """量化紧凑格式的每帧字节数小于 Base64 路径的一半，各压缩方式解码误差不超过量化步长的一半"""
+    data, fields, point_count = _make_scan_cloud()
+    original = np.frombuffer(data, dtype=np.float32).reshape(-1, 4)
+    base64_size = len(base64.b64encode(stride_sample(data, 16, point_count, 1)))
+
+    for compression in ('none', 'zlib', 'zstd', 'lz4'):
+        payload, header, encoded_points, _ = quantize_pointcloud(
+            data, fields, 16, point_count, compression=compression
+        )
+        if compression == 'none':
+            assert len(payload) < base64_size / 2
+
+        decoded = _decode_quantized(payload, header, encoded_points)
+        assert np.all(np.abs(decoded[:, :3] - original[:, :3]) <= np.array(header['scale']) * 0.51 + 1e-6)
+        assert np.all(np.abs(decoded[:, 3] - original[:, 3]) <= header['intensity_scale'] * 0.51 + 1e-6)
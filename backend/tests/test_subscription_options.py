@@ -0,0 +1,160 @@
+"""
+rosbridge 订阅选项测试
+验证同一 ROS 订阅的不同客户端按各自的 throttle_rate 获得不同频率、
+queue_length 限制单个主题的待发送帧数、fragment_size 分片后可以还原原始帧，
+以及非法选项被拒绝且不改变客户端的订阅状态
+"""
+
+import json
+
+import pytest
+
+from app.core.config import Settings
+from app.models.ros import SubscriptionOptions
+from app.services.message_frame import EncodedFrame
+from app.services.rosbridge import ClientSendQueue, ConnectionManager, RosbridgeService
+
+
+class FakeWebSocket:
+    """只记录发送内容的 WebSocket 替身"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+
+def _frame(topic: str, seq: int) -> EncodedFrame:
+    return EncodedFrame({'op': 'publish', 'topic': topic, 'msg': {'seq': seq}})
+
+
+async def _service_with_clients(throttle_rates: dict) -> RosbridgeService:
+    service = RosbridgeService(Settings())
+    manager = service.connection_manager
+    for client_id, throttle_rate in throttle_rates.items():
+        await manager.connect(FakeWebSocket(), client_id)
+        manager.add_subscription(client_id, '/odom')
+        manager.connection_info[client_id].subscription_options['/odom'] = SubscriptionOptions(
+            throttle_rate=throttle_rate)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_allow_publish_throttle_rate():
+    """距上次放行不足 throttle_rate 毫秒的消息被丢弃，各客户端独立计时"""
+    service = await _service_with_clients({'fast': 0, 'slow': 100})
+    manager = service.connection_manager
+
+    allowed = [now for now in (0.0, 0.05, 0.099, 0.1, 0.15, 0.2)
+               if manager.allow_publish('slow', '/odom', 100, now)]
+    assert allowed == [0.0, 0.1, 0.2]
+    assert all(manager.allow_publish('fast', '/odom', 0, now) for now in (0.0, 0.01))
+
+    # 取消订阅 / 断开后限速状态随之清理
+    manager.remove_subscription('slow', '/odom')
+    assert ('slow', '/odom') not in manager._last_published
+    for client_id in ('fast', 'slow'):
+        manager.disconnect(client_id)
+
+
+@pytest.mark.asyncio
+async def test_throttled_clients_skip_conversion():
+    """被限速的客户端不在转换分组中；所有订阅者都被限速时不提交转换"""
+    service = await _service_with_clients({'fast': 0, 'slow': 60_000})
+    groups = [client_ids for _, client_ids, _ in service._subscriber_groups('/odom').values()]
+    assert sorted(sum(groups, [])) == ['fast', 'slow']
+    groups = [client_ids for _, client_ids, _ in service._subscriber_groups('/odom').values()]
+    assert sum(groups, []) == ['fast']
+
+    submitted = []
+
+    class RecordingPool:
+        async def submit(self, topic, func, args, callback):
+            submitted.append(topic)
+
+    service.conversion_pool = RecordingPool()
+    service.connection_manager.remove_subscription('fast', '/odom')
+    await service._on_message_received('/odom', object())
+    assert submitted == []
+
+
+@pytest.mark.asyncio
+async def test_queue_length_per_topic():
+    """queue_length 只限制所属主题，超出时丢弃该主题最早的帧"""
+    queue = ClientSendQueue(maxsize=100)
+    for seq in range(10):
+        queue.put(_frame('/scan', seq), 'json', queue_length=2)
+        queue.put(_frame('/tf', seq), 'json')
+    assert len(queue) == 12 and queue.dropped == 8
+
+    sent = []
+    while len(queue):
+        frame, _ = await queue.get()
+        sent.append((frame.topic, frame.message['msg']['seq']))
+    assert [seq for topic, seq in sent if topic == '/scan'] == [8, 9]
+    assert [seq for topic, seq in sent if topic == '/tf'] == list(range(10))
+    assert not queue._pending_topics
+
+
+@pytest.mark.asyncio
+async def test_fragments_reassemble():
+    """超过 fragment_size 的帧分片发送，按 num 拼接后还原原始帧；分片结果被缓存复用"""
+    frame = EncodedFrame({'op': 'publish', 'topic': '/map', 'msg': {'data': list(range(20000))}})
+    payload = frame.encode('json')
+    fragments = frame.fragments('json', 4096)
+    assert frame.fragments('json', 4096) is fragments
+
+    websocket = FakeWebSocket()
+    await ConnectionManager._send_frame(websocket, frame, 'json', 4096)
+    parts = [json.loads(text) for text in websocket.sent]
+    assert len(parts) == -(-len(payload) // 4096)
+    assert all(part['op'] == 'fragment' and part['total'] == len(parts) for part in parts)
+    assert len({part['id'] for part in parts}) == 1
+    assert ''.join(part['data'] for part in sorted(parts, key=lambda p: p['num'])) == payload
+
+    # 未超过 fragment_size 时原样发送
+    websocket = FakeWebSocket()
+    await ConnectionManager._send_frame(websocket, _frame('/map', 0), 'json', 4096)
+    assert json.loads(websocket.sent[0])['op'] == 'publish'
+
+
+@pytest.mark.parametrize("invalid", [
+    {'throttle_rate': -1},
+    {'queue_length': -1},
+    {'fragment_size': 0},
+    {'image_quality': 150},
+    {'fields': 'xyz'},
+])
+@pytest.mark.asyncio
+async def test_invalid_options_rejected(invalid):
+    """非法订阅选项返回 status 错误，客户端的订阅、选项与 ROS 订阅均不变"""
+    service = RosbridgeService(Settings())
+    manager = service.connection_manager
+    await manager.connect(FakeWebSocket(), 'client')
+    previous = SubscriptionOptions(throttle_rate=50)
+    manager.add_subscription('client', '/other')
+    manager.connection_info['client'].subscription_options['/points'] = previous
+
+    replies = []
+
+    async def record(client_id, message):
+        replies.append(message)
+
+    async def fail_create(topic, msg_type):
+        raise AssertionError("subscriber must not be created for invalid options")
+
+    manager.send_to_client = record
+    service._create_subscriber = fail_create
+    await service._handle_subscribe('client', dict(
+        invalid, op='subscribe', id='sub_1', topic='/points', type='sensor_msgs/msg/PointCloud2'))
+
+    assert replies and replies[0]['op'] == 'status' and replies[0]['level'] == 'error'
+    assert replies[0]['id'] == 'sub_1'
+    assert manager.subscribers('/points') == set()
+    assert manager.connection_info['client'].subscribed_topics == {'/other'}
+    assert manager.connection_info['client'].subscription_options['/points'] is previous
+    manager.disconnect('client')
@@ -0,0 +1,102 @@
+"""
+订阅引用计数测试
+验证最后一个客户端离开后 ROS 订阅在等待时间后销毁、等待期间重新订阅时复用，
+引用查询只返回该主题的订阅者，以及 get_subscriptions 操作的响应
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.core.config import Settings
+from app.models.ros import ConnectionInfo
+from app.services.rosbridge import RosbridgeService
+
+
+class FakeSubscriptionNode:
+    def __init__(self):
+        self.destroyed = []
+
+    def destroy_subscription(self, subscription):
+        self.destroyed.append(subscription)
+
+
+def _service(linger: float, client_count: int) -> RosbridgeService:
+    service = RosbridgeService(Settings(subscription_linger=linger))
+    service.node = FakeSubscriptionNode()
+    service._loop = asyncio.get_running_loop()
+    for i in range(client_count):
+        service.connection_manager.connection_info[f"client_{i}"] = ConnectionInfo(
+            client_id=f"client_{i}", connected_at=datetime.now()
+        )
+        for j in range(i % 10, 50, 10):
+            service.connection_manager.add_subscription(f"client_{i}", f"/topic_{j}")
+    for topic in ('/points', '/image'):
+        service.subscribers[topic] = topic
+        service._subscription_types[topic] = 'sensor_msgs/msg/PointCloud2'
+    return service
+
+
+@pytest.mark.asyncio
+async def test_subscription_linger_and_reuse():
+    """无客户端引用的订阅在等待时间后销毁，等待期间重新订阅则保留"""
+    service = _service(linger=0.05, client_count=2)
+    service.connection_manager.add_subscription('client_0', '/points')
+    service.connection_manager.add_subscription('client_0', '/image')
+
+    await service._handle_unsubscribe('client_0', {'topic': '/points'})
+    await service._handle_unsubscribe('client_0', {'topic': '/image'})
+    table = {entry.topic: entry for entry in await service.get_subscriptions()}
+    assert table['/points'].ref_count == 0 and table['/points'].linger_remaining > 0
+
+    # 等待期间重新引用 /image
+    service.connection_manager.add_subscription('client_0', '/image')
+    service._cancel_linger('/image')
+
+    await asyncio.sleep(0.1)
+    assert '/points' not in service.subscribers
+    assert service.node.destroyed == ['/points']
+    table = {entry.topic: entry for entry in await service.get_subscriptions()}
+    assert table['/image'].ref_count == 1 and table['/image'].clients == ['client_0']
+    assert table['/image'].linger_remaining is None
+
+
+@pytest.mark.asyncio
+async def test_reference_lookup_and_release():
+    """引用查询只返回订阅了该主题的客户端，无引用的订阅在等待时间为 0 时立即销毁"""
+    service = _service(linger=0.0, client_count=500)
+
+    clients = service._subscription_clients('/topic_3')
+    assert len(clients) == 50
+    assert all(int(client_id.split('_')[1]) % 10 == 3 for client_id in clients)
+
+    # 仍有引用时不销毁
+    service.connection_manager.add_subscription('client_0', '/points')
+    service._release_subscription('/points')
+    assert '/points' in service.subscribers
+
+    service.connection_manager.remove_subscription('client_0', '/points')
+    service._release_subscription('/points')
+    assert '/points' not in service.subscribers
+    assert service.node.destroyed == ['/points']
+
+
+@pytest.mark.asyncio
+async def test_get_subscriptions_op():
+    """get_subscriptions 操作返回每个订阅的引用数与客户端，并带回请求 id"""
+    service = _service(linger=5.0, client_count=1)
+    service.connection_manager.add_subscription('client_0', '/points')
+    replies = []
+
+    async def record(client_id, message):
+        replies.append((client_id, message))
+
+    service.connection_manager.send_to_client = record
+    await service._handle_message('client_0', {'op': 'get_subscriptions', 'id': 'req_1'})
+
+    (client_id, reply), = replies
+    assert client_id == 'client_0' and reply['op'] == 'get_subscriptions_result' and reply['id'] == 'req_1'
+    table = {entry['topic']: entry for entry in reply['subscriptions']}
+    assert table['/points']['ref_count'] == 1 and table['/points']['clients'] == ['client_0']
+    assert table['/image']['ref_count'] == 0
@@ -0,0 +1,80 @@
+"""
+主题监控测试
+模拟数百个主题的原始订阅回调，验证只统计不反序列化、已有完整订阅的主题不重复统计，
+以及按客户端引用计数创建与销毁原始订阅
+"""
+
+from std_msgs.msg import String
+
+from app.services.topic_monitor import TopicMonitor, import_message_class
+from app.services.topic_stats import TopicStatsEngine
+
+
+class FakeRawNode:
+    """记录 create_subscription 参数的模拟节点"""
+
+    def __init__(self):
+        self.callbacks = {}
+        self.destroyed = []
+
+    def create_subscription(self, msg_class, topic, callback, qos, callback_group=None, raw=False):
+        assert raw, "monitor subscriptions must not deserialize"
+        self.callbacks[topic] = callback
+        return topic
+
+    def destroy_subscription(self, subscription):
+        self.destroyed.append(subscription)
+        self.callbacks.pop(subscription, None)
+
+
+def test_monitor_hundreds_of_topics():
+    """300 个主题只计数与统计字节"""
+    node = FakeRawNode()
+    stats = TopicStatsEngine()
+    bridged = {'/topic_0'}
+    monitor = TopicMonitor(node, stats, skip=lambda topic: topic in bridged)
+    topics = [f"/topic_{i}" for i in range(300)]
+    assert all(monitor.add(topic, object, 'client_a') for topic in topics)
+    assert not monitor.add(topics[1], object, 'client_b')  # 复用已有订阅
+    assert len(node.callbacks) == 300
+
+    payload = b'\x00' * 1024
+    messages_per_topic = 20
+    for _ in range(messages_per_topic):
+        for topic in topics:
+            node.callbacks[topic](payload)
+
+    snapshot = stats.snapshot()
+    assert '/topic_0' not in snapshot  # 已有完整订阅的主题不重复统计
+    assert snapshot['/topic_5']['total_messages'] == messages_per_topic
+    assert snapshot['/topic_5']['total_bytes'] == messages_per_topic * len(payload)
+
+    # 引用计数：client_a 断开后只保留 client_b 仍在监控的主题
+    released = monitor.release_client('client_a')
+    assert len(released) == 299
+    assert list(monitor.subscriptions) == [topics[1]]
+    assert monitor.remove(topics[1], 'client_b')
+    assert not monitor.subscriptions and len(node.destroyed) == 300
+
+
+def test_remove_unknown_and_stop():
+    """移除未监控的主题不影响其他订阅，stop 销毁全部原始订阅"""
+    node = FakeRawNode()
+    monitor = TopicMonitor(node, TopicStatsEngine())
+    monitor.add('/a', object, 'client')
+    monitor.add('/b', object, 'client')
+    assert not monitor.remove('/missing', 'client')
+    assert not monitor.remove('/a', 'other_client')  # 非引用者移除不销毁
+    assert '/a' in monitor.subscriptions
+
+    monitor.stop()
+    assert sorted(node.destroyed) == ['/a', '/b']
+    assert not monitor.subscriptions and not monitor.clients
+
+
+def test_import_message_class():
+    """按 pkg/msg/Type 或 pkg/Type 导入消息类，未知类型返回 None"""
+    assert import_message_class('std_msgs/msg/String') is String
+    assert import_message_class('std_msgs/String') is String
+    assert import_message_class('missing_msgs/msg/Nothing') is None
+    assert import_message_class('invalid') is None
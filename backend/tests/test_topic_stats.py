@@ -0,0 +1,94 @@
+"""
+主题统计测试
+验证滑动窗口统计的频率、带宽、抖动与延迟，窗口覆盖后的累计值，以及消息大小的采样估算
+"""
+
+import math
+import random
+
+import pytest
+
+from app.services import topic_stats
+from app.services.topic_stats import TopicStatsEngine
+
+
+def _feed(engine: TopicStatsEngine, count: int, rate: float, size: int, jitter: float, latency: float) -> float:
+    """按给定频率写入带抖动的消息，返回最后一条消息的接收时间"""
+    rng = random.Random(0)
+    receive_time = 1000.0
+    for _ in range(count):
+        receive_time += 1.0 / rate + rng.uniform(-jitter, jitter)
+        engine.record('/points', receive_time, size, stamp=receive_time - latency)
+    return receive_time
+
+
+def test_windowed_statistics():
+    """窗口统计与输入的频率、带宽、延迟一致，停止发布后频率归零"""
+    engine = TopicStatsEngine(window=100)
+    last = _feed(engine, 1000, rate=50.0, size=2000, jitter=0.002, latency=0.015)
+    stats = engine.get('/points', now=last)
+
+    assert stats['frequency'] == pytest.approx(50.0, rel=0.02)
+    assert stats['bytes_per_second'] == pytest.approx(100_000, rel=0.02)
+    assert 0.5 < stats['jitter_ms'] < 2.0
+    assert stats['latency_ms'] == pytest.approx(15.0, abs=0.01)
+    assert stats['window'] == 100 and stats['total_messages'] == 1000
+
+    assert engine.get('/points', now=last + 10)['frequency'] == 0.0
+    assert engine.get('/missing') is None
+
+
+def test_window_matches_recent_samples():
+    """覆盖旧样本后的累计值与直接按最近 window 条样本计算的结果一致"""
+    rng = random.Random(1)
+    engine = TopicStatsEngine(window=10)
+    times, sizes = [], []
+    receive_time = 0.0
+    for _ in range(57):
+        receive_time += rng.uniform(0.01, 0.2)
+        size = rng.randint(10, 1000)
+        times.append(receive_time)
+        sizes.append(size)
+        engine.record('/scan', receive_time, size)
+
+    recent = times[-10:]
+    intervals = [b - a for a, b in zip(recent, recent[1:])]
+    mean = sum(intervals) / len(intervals)
+    stats = engine.get('/scan', now=receive_time)
+    assert stats['mean_interval_ms'] == pytest.approx(mean * 1000)
+    assert stats['jitter_ms'] == pytest.approx(
+        math.sqrt(sum((i - mean) ** 2 for i in intervals) / len(intervals)) * 1000, abs=1e-6)
+    assert stats['mean_size'] == pytest.approx(sum(sizes[-10:]) / 10)
+    assert stats['total_bytes'] == sum(sizes)
+
+
+class _Small:
+    """没有大块 data 字段的消息"""
+
+
+class _Large:
+    def __init__(self, size: int):
+        self.data = bytes(size)
+
+
+def test_estimate_size_samples_serialization(monkeypatch):
+    """小消息每 size_sample_interval 条才序列化一次，大块 data 消息直接按长度计算"""
+    calls = []
+
+    def fake_serialize(msg):
+        calls.append(msg)
+        return b'\x00' * (100 + len(calls))
+
+    monkeypatch.setattr(topic_stats, 'serialize_message', fake_serialize)
+    engine = TopicStatsEngine(size_sample_interval=5)
+
+    sizes = [engine.estimate_size('/odom', _Small()) for _ in range(12)]
+    assert len(calls) == 3
+    assert sizes == [101] * 5 + [102] * 5 + [103] * 2
+
+    assert engine.estimate_size('/points', _Large(8192)) == 8192
+    assert len(calls) == 3
+
+    engine.remove('/odom')
+    engine.estimate_size('/odom', _Small())
+    assert len(calls) == 4
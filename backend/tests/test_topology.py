@@ -0,0 +1,182 @@
+"""
+拓扑分析测试
+对比原逐节点重复扫描全部主题的实现与共享端点表的实现在大规模图上的查询次数
+"""
+
+import pytest
+
+from app.core.config import Settings
+from app.services.graph_snapshot import GraphCache
+from app.services.ros_context import RosContext
+from app.services.topology_service import TopologyAnalyzer, TopologyService
+
+
+def _legacy_topology_queries(ros_node):
+    """原实现的查询模式：每个节点重新列出并查询所有主题，主题连接再查询一遍"""
+    for node_name in ros_node.get_node_names():
+        for direction in ('publishers', 'subscribers'):
+            for topic_name, _ in ros_node.get_topic_names_and_types():
+                if direction == 'publishers':
+                    infos = ros_node.get_publishers_info_by_topic(topic_name)
+                else:
+                    infos = ros_node.get_subscriptions_info_by_topic(topic_name)
+                any(info.node_name == node_name for info in infos)
+        ros_node.get_service_names_and_types()
+    for topic_name, _ in ros_node.get_topic_names_and_types():
+        ros_node.get_publishers_info_by_topic(topic_name)
+        ros_node.get_subscriptions_info_by_topic(topic_name)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("node_count,topic_count", [(100, 1000), (200, 2000)])
+async def test_topology_refresh_linear(fake_graph_node, node_count, topic_count):
+    """拓扑刷新的查询次数与端点数成线性关系"""
+    ros_node = fake_graph_node(node_count, topic_count)
+    analyzer = TopologyAnalyzer(ros_node)
+
+    topology = await analyzer.get_system_topology(use_cache=False)
+    calls = ros_node.calls
+
+    assert topology.node_count == node_count
+    assert topology.topic_count == topic_count
+    assert sum(len(node.published_topics) for node in topology.nodes) == topic_count
+    assert all(node.services == [f"{node.namespace}/{node.node_name}/get_parameters"] for node in topology.nodes)
+    # 节点/主题列表 + 每个主题的端点计数与端点信息 + 每个节点的服务
+    assert calls <= 2 + 4 * topic_count + node_count
+
+    # 图未变化时不重新查询端点
+    ros_node.calls = 0
+    analyzer.graph_cache.last_refresh = None
+    await analyzer.get_system_topology()
+    assert ros_node.calls <= 2 + 2 * topic_count
+
+    legacy_node = fake_graph_node(node_count, topic_count)
+    _legacy_topology_queries(legacy_node)
+    assert calls * 10 < legacy_node.calls
+
+
+@pytest.mark.asyncio
+async def test_shared_graph_cache(fake_graph_node):
+    """拓扑服务与 Rosbridge 共享图缓存：图只查询一次，变化通知所有使用方"""
+    ros_node = fake_graph_node(100, 1000)
+    graph_cache = GraphCache(ros_node)
+    deltas = []
+    graph_cache.add_listener(lambda previous, current, changes: deltas.append(current.version))
+
+    graph_cache.refresh()
+    calls = ros_node.calls
+    analyzer = TopologyAnalyzer(ros_node, graph_cache)
+    topology = await analyzer.get_system_topology()
+
+    assert topology.node_count == 100
+    assert analyzer.graph_cache is graph_cache
+    # 已刷新的共享缓存不再重复查询端点
+    assert ros_node.calls == calls
+    assert deltas == [graph_cache.version]
+
+
+@pytest.mark.asyncio
+async def test_subgraph_queries(fake_graph_node):
+    """子图查询：命名空间前缀、k 跳邻域、排除基础设施主题"""
+    ros_node = fake_graph_node(200, 2000)
+    ros_node.topics['/rosout'] = ('rcl_interfaces/msg/Log', [], list(ros_node.nodes))
+    analyzer = TopologyAnalyzer(ros_node)
+    topology = await analyzer.get_system_topology()
+    excluded = ['/rosout', '/parameter_events']
+
+    # /rosout 连接所有节点，不排除时一跳即为全图
+    assert analyzer.extract_subgraph(root='node_0', depth=1).node_count == 200
+
+    neighborhood = analyzer.extract_subgraph(root='node_0', depth=1, excluded_topics=excluded)
+    assert {node.node_name for node in neighborhood.nodes} == {
+        'node_0', 'node_1', 'node_7', 'node_199', 'node_193', 'node_6', 'node_194'}
+    assert all(conn.topic_name != '/rosout' for conn in neighborhood.topic_connections)
+    assert all(set(conn.publishers + conn.subscribers) <= {node.node_name for node in neighborhood.nodes}
+               for conn in neighborhood.topic_connections)
+    assert analyzer.extract_subgraph(root='node_0', depth=0, excluded_topics=excluded).node_count == 1
+    assert analyzer.extract_subgraph(root='node_0', depth=2, excluded_topics=excluded).node_count > neighborhood.node_count
+
+    # 主题作为根节点：深度 0 为该主题的端点
+    topic = analyzer.extract_subgraph(root='/ns0/topic_0', depth=0, excluded_topics=excluded)
+    assert {node.node_name for node in topic.nodes} == {'node_0', 'node_1', 'node_7'}
+
+    namespace = analyzer.extract_subgraph(namespace='/ns3', excluded_topics=excluded)
+    assert namespace.node_count == 20
+    assert all(node.namespace == '/ns3' for node in namespace.nodes)
+    assert analyzer.extract_subgraph(namespace='/ns', excluded_topics=excluded).node_count == 0
+    assert analyzer.extract_subgraph(root='/missing') is None
+    assert len(neighborhood.json()) < len(topology.json())
+
+
+def test_node_with_many_topics(fake_graph_node):
+    """单个节点发布大量主题时，构建与增量更新该节点的主题列表，旧快照不受影响"""
+    ros_node = fake_graph_node(1, 20000)
+    graph_cache = GraphCache(ros_node)
+
+    graph_cache.refresh()
+    snapshot = graph_cache.snapshot
+    assert len(snapshot.node_publishers['node_0']) == 20000
+
+    removed = [f"/ns{j % 10}/topic_{j}" for j in range(0, 20000, 2)]
+    for topic in removed:
+        del ros_node.topics[topic]
+    ros_node.topics['/extra'] = ('std_msgs/msg/String', ['node_0'], [])
+    changes = graph_cache.refresh()
+    assert len(changes['topics_removed']) == 10000 and changes['topics_added'] == ['/extra']
+    publishers = graph_cache.snapshot.node_publishers['node_0']
+    assert len(publishers) == 10001 and publishers[-1] == '/extra'
+    # 旧快照的列表不受影响
+    assert len(snapshot.node_publishers['node_0']) == 20000
+
+
+def test_service_added_after_discovery(fake_graph_node):
+    """已发现节点后来创建的服务：端点变化时立即查询，否则在定期刷新时出现，并生成 updated 节点增量"""
+    from app.services.graph_snapshot import delta_message
+
+    class ServiceGraphNode(fake_graph_node):
+        def __init__(self, *args):
+            super().__init__(*args)
+            self.extra_services = {}
+
+        def get_service_names_and_types_by_node(self, node_name, namespace):
+            return (super().get_service_names_and_types_by_node(node_name, namespace)
+                    + self.extra_services.get(node_name, []))
+
+    ros_node = ServiceGraphNode(10, 50)
+    graph_cache = GraphCache(ros_node, service_refresh_interval=3600)
+    deltas = []
+    graph_cache.add_listener(lambda previous, current, changes: deltas.append(
+        delta_message(previous, current, changes)))
+    graph_cache.refresh()
+
+    # 仅新增服务、图的其他部分不变：等到定期刷新才会查询
+    ros_node.extra_services['node_3'] = [('/ns3/node_3/reset', ['std_srvs/srv/Empty'])]
+    assert graph_cache.refresh() is None
+    graph_cache._last_service_refresh -= 3600
+    changes = graph_cache.refresh()
+    assert changes['nodes_updated'] == ['node_3']
+    assert '/ns3/node_3/reset' in graph_cache.snapshot.node_services['node_3']
+    updated = deltas[-1]['nodes']['updated']
+    assert [node['name'] for node in updated] == ['node_3']
+    assert '/ns3/node_3/reset' in updated[0]['services']
+
+    # 节点的主题端点变化时同时重新查询其服务
+    ros_node.extra_services['node_5'] = [('/ns5/node_5/reset', ['std_srvs/srv/Empty'])]
+    ros_node.topics['/ns5/new_topic'] = ('std_msgs/msg/String', ['node_5'], [])
+    changes = graph_cache.refresh()
+    assert changes['topics_added'] == ['/ns5/new_topic'] and changes['nodes_updated'] == ['node_5']
+    assert '/ns5/node_5/reset' in graph_cache.snapshot.node_services['node_5']
+
+
+@pytest.mark.asyncio
+async def test_topology_service_uses_graph_poll_interval(fake_graph_node):
+    """拓扑服务与 Rosbridge 按同一个 graph_poll_interval 检查共享图缓存"""
+    settings = Settings(graph_poll_interval=5.0)
+    ros_context = RosContext(settings)
+    ros_context.node = fake_graph_node(10, 50)
+    ros_context.graph_cache = GraphCache(ros_context.node)
+
+    service = TopologyService(settings, ros_context)
+    await service.start()
+    assert service.analyzer.check_interval == 5.0
+    assert service.analyzer.graph_cache is ros_context.graph_cache